@@ -15,8 +15,12 @@ const getBasicStats = async (req, res) => {
 
 const getDetailedStats = async (req, res) => {
     console.log("Received request to /api/activities/detailed-stats");
+    // Forward the raw query string, so repeated parameters (e.g. `filter`) reach the backend as is
+    const query = req.originalUrl.split("?")[1];
     try {
-        const response = await axios.get(`${backendUrl}/api/v1/activities/detailed-stats`);
+        const response = await axios.get(
+            `${backendUrl}/api/v1/activities/detailed-stats${query ? `?${query}` : ""}`
+        );
         res.json(response.data);
     } catch (error) {
         res.status(error.response ? error.response.status : 500).json({
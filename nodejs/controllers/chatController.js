@@ -13,6 +13,25 @@ const postChat = async (req, res) => {
     }
 };
 
+const streamChat = async (req, res) => {
+    console.log("Received request to /api/chat/stream-question");
+    try {
+        const response = await axios.post(`${backendUrl}/api/v1/chat/stream`, req.body, {
+            responseType: 'stream',
+        });
+        res.setHeader('Content-Type', 'text/event-stream');
+        res.setHeader('Cache-Control', 'no-cache');
+        res.setHeader('Connection', 'keep-alive');
+        res.flushHeaders();
+        response.data.pipe(res);
+    } catch (error) {
+        res.status(error.response ? error.response.status : 500).json({
+            message: error.message,
+        });
+    }
+};
+
 module.exports = {
     postChat,
+    streamChat,
 };
@@ -3,5 +3,6 @@ const router = express.Router();
 const chatController = require('../controllers/chatController');
 
 router.post('/process-question', chatController.postChat);
+router.post('/stream-question', chatController.streamChat);
 
 module.exports = router;
@@ -4,12 +4,39 @@ AUTHOR: Jacob Montgomery
 OVERVIEW: This file will drive the front-end webpage.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from os import getenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from uvicorn import run
 
 from routes.activities import activities_router
 from routes.chat import chat_router
+from routes.webhooks import webhook_processor, webhooks_router
+from services.metrics import registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the Strava webhook workers, and the background Strava sync scheduler (if enabled),
+    for the app's lifetime.
+    """
+    webhook_processor.start()
+    scheduler = None
+    if getenv("STRAVA_SYNC_ENABLED", "false").lower() == "true":
+        from services.sync_scheduler import SyncScheduler
+
+        # Shares the webhook's token cache, so an athlete's tokens are exchanged once
+        scheduler = SyncScheduler(token_cache=webhook_processor.token_cache)
+        scheduler.start()
+    yield
+    if scheduler:
+        scheduler.stop(timeout_s=5)
+    webhook_processor.stop(timeout_s=5)
+
 
 app = FastAPI(
     title="API Documentation",
@@ -18,6 +45,7 @@ app = FastAPI(
     docs_url="/docs",  # Custom URL for Swagger UI
     redoc_url="/redoc",  # Custom URL for ReDoc
     openapi_url="/openapi.json",  # Custom OpenAPI schema URL
+    lifespan=lifespan,
 )
 
 app.include_router(
@@ -30,6 +58,28 @@ app.include_router(
     prefix="/api/v1",
     tags=["Chat"],
 )
+app.include_router(
+    router=webhooks_router,
+    prefix="/api/v1",
+    tags=["Webhooks"],
+)
+
+
+@app.get(
+    "/metrics",
+    summary="Exposes the app's metrics.",
+    description="Exposes the chat pipeline's and the Strava sync's metrics in the Prometheus text format.",
+    response_class=Response,
+    include_in_schema=False,
+)
+async def get_metrics() -> Response:
+    """
+    Renders the app's metrics for a Prometheus scrape.
+
+    :return The metrics, in the Prometheus text exposition format.
+    """
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
 
 # Enable CORS
 app.add_middleware(
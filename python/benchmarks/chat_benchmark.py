@@ -0,0 +1,301 @@
+"""
+Benchmarks the chat pipeline end to end: a question corpus is sent through `ChatService.process`
+at a configurable concurrency, against the configured database (seed a local one with
+`seed_activities.py`) and LLM backend (the offline stand-in, by default).
+
+Reports the end-to-end and per-stage latency percentiles, the throughput, how requests were
+answered (fast path, locally rendered, LLM-synthesized, or a follow-up question), and the
+retry and repair rates.
+
+Run from the `python` directory:
+
+    python -m benchmarks.chat_benchmark --requests 500 --concurrency 16
+    python -m benchmarks.chat_benchmark --backend record --cassette cassettes/chat.jsonl
+    python -m benchmarks.chat_benchmark --backend replay --cassette cassettes/chat.jsonl
+"""
+
+from argparse import ArgumentParser, Namespace
+from asyncio import Semaphore, gather, run
+from contextvars import ContextVar
+from os import environ
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from numpy import percentile
+
+PERCENTILES = [50, 90, 95, 99]
+# The sample of the request being processed (set per request task, read by the pipeline listener)
+current_sample: ContextVar[dict[str, Any]] = ContextVar("current_sample")
+
+
+def parse_args() -> Namespace:
+    """
+    Parses the command-line arguments.
+
+    :return: The arguments.
+    """
+    parser = ArgumentParser(description="Benchmarks the chat pipeline.")
+    parser.add_argument(
+        "--questions",
+        default=str(Path(__file__).with_name("questions.txt")),
+        help="The question corpus (one question per line)",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--warmup", type=int, default=0, help="Requests sent (and not measured) first"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["local", "record", "replay", "openai"],
+        default="local",
+        help="The LLM backend (see `services.llm_backends`)",
+    )
+    parser.add_argument("--cassette", help="The cassette path (record/replay)")
+    parser.add_argument(
+        "--latency-ms", type=float, help="The local backend's latency per request"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        help="The share of questions the local backend first answers with a broken query",
+    )
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help=(
+            "Disable the query and result caches and the few-shot examples (every request "
+            "runs the whole pipeline); always the case when recording or replaying"
+        ),
+    )
+    parser.add_argument(
+        "--synthesize",
+        action="store_true",
+        help="Have the LLM write every TAG answer (rather than rendering them locally)",
+    )
+    return parser.parse_args()
+
+
+def configure(args: Namespace) -> None:
+    """
+    Configures the services through their environment variables. This has to happen before
+    they're imported, since their default instances are created at import time.
+
+    :param args: The arguments.
+
+    :return: None
+    """
+    environ["OPENAI_BACKEND"] = args.backend
+    if args.backend in ("local", "replay"):
+        environ.setdefault("OPENAI_API_KEY", "unused")  # The clients require one
+    if args.cassette:
+        environ["OPENAI_CASSETTE_PATH"] = args.cassette
+    if args.latency_ms is not None:
+        environ["LOCAL_LLM_LATENCY_MS"] = str(args.latency_ms)
+    if args.error_rate is not None:
+        environ["LOCAL_LLM_ERROR_RATE"] = str(args.error_rate)
+    if args.cold or args.backend in ("record", "replay"):
+        # A cassette replays only the prompts it recorded, and the few-shot examples and cached
+        # queries depend on which requests finished first, so they're left out of the prompts
+        environ["TAG_FEW_SHOT_K"] = "0"
+        environ["TAG_QUERY_CACHE_TTL_S"] = "0"
+        environ["TAG_RESULT_CACHE_TTL_S"] = "0"
+    environ.setdefault("TAG_MAX_CONCURRENCY", str(args.concurrency))
+
+
+def load_questions(path: str) -> list[str]:
+    """
+    Loads the question corpus.
+
+    :param path: The corpus path.
+
+    :return: The questions.
+    """
+    with open(path, encoding="utf-8") as corpus:
+        lines = [line.strip() for line in corpus]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def classify(sample: dict[str, Any], response: Any) -> str:
+    """
+    Classifies how a request was answered.
+
+    :param sample: The request's sample.
+    :param response: The response payload.
+
+    :return: "fast_path", "follow_up", "synthesized", or "rendered".
+    """
+    state = sample.get("state")
+    if state is None:
+        return "fast_path"
+    if response.meta.executed_query is None:
+        return "follow_up"
+    return "synthesized" if "synthesis" in state.timings else "rendered"
+
+
+async def run_benchmark(
+    chat_service: Any,
+    questions: list[str],
+    requests: int,
+    concurrency: int,
+    synthesize: bool,
+) -> tuple[list[dict[str, Any]], float]:
+    """
+    Sends the questions (round-robin) through the chat service.
+
+    :param chat_service: The chat service.
+    :param questions: The question corpus.
+    :param requests: The number of requests.
+    :param concurrency: The number of requests in flight at once.
+    :param synthesize: Whether to have the LLM write every TAG answer.
+
+    :return: The request samples and the wall-clock duration (in seconds).
+    """
+    semaphore = Semaphore(concurrency)
+
+    async def send(index: int) -> dict[str, Any]:
+        question = questions[index % len(questions)]
+        sample: dict[str, Any] = {"question": question}
+        current_sample.set(sample)
+        async with semaphore:
+            start = perf_counter()
+            try:
+                response = await chat_service.process(
+                    user_question={"role": "user", "content": question},
+                    messages=[],
+                    synthesize=synthesize,
+                )
+                sample["outcome"] = classify(sample, response)
+            except Exception as e:
+                sample["outcome"] = "error"
+                sample["error"] = type(e).__name__
+            sample["latency"] = perf_counter() - start
+        return sample
+
+    start = perf_counter()
+    samples = await gather(*(send(index) for index in range(requests)))
+    return samples, perf_counter() - start
+
+
+def format_percentiles(name: str, values: list[float]) -> str:
+    """
+    Formats a row of latency percentiles (in milliseconds).
+
+    :param name: The row's name.
+    :param values: The latencies (in seconds).
+
+    :return: The formatted row.
+    """
+    cells = " ".join(
+        f"{value * 1000:>9.1f}" for value in percentile(values, PERCENTILES)
+    )
+    return f"{name:<16}{len(values):>7} {cells} {max(values) * 1000:>9.1f}"
+
+
+def report(samples: list[dict[str, Any]], duration: float, chat_service: Any) -> str:
+    """
+    Builds the benchmark report.
+
+    :param samples: The request samples.
+    :param duration: The wall-clock duration (in seconds).
+    :param chat_service: The chat service (for the cassette counters).
+
+    :return: The report.
+    """
+    lines = [
+        f"Requests: {len(samples)} in {duration:.2f}s "
+        f"({len(samples) / duration:.1f} req/s)",
+        "",
+        f"{'Latency (ms)':<16}{'count':>7} "
+        + " ".join(f"{f'p{p}':>9}" for p in PERCENTILES)
+        + f" {'max':>9}",
+    ]
+
+    outcomes: dict[str, list[float]] = {}
+    for sample in samples:
+        outcomes.setdefault(sample["outcome"], []).append(sample["latency"])
+    lines.append(format_percentiles("end-to-end", [s["latency"] for s in samples]))
+    for outcome, latencies in sorted(outcomes.items()):
+        lines.append(format_percentiles(f"  {outcome}", latencies))
+
+    states = [sample["state"] for sample in samples if "state" in sample]
+    stages: dict[str, list[float]] = {}
+    for state in states:
+        for stage, seconds in state.timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    if stages:
+        lines.append("TAG stages")
+        for stage, seconds in stages.items():
+            lines.append(format_percentiles(f"  {stage}", seconds))
+
+    lines.append("")
+    lines.append(
+        "Outcomes: "
+        + ", ".join(
+            f"{outcome}={len(latencies)} ({len(latencies) / len(samples):.1%})"
+            for outcome, latencies in sorted(outcomes.items())
+        )
+    )
+    errors: dict[str, int] = {}
+    for sample in samples:
+        if "error" in sample:
+            errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+    if errors:
+        lines.append(
+            "Errors: " + ", ".join(f"{name}={count}" for name, count in errors.items())
+        )
+    if states:
+        retried = sum(1 for state in states if state.attempts > 1 or state.repairs)
+        lines.append(
+            f"TAG pipelines: {len(states)}, retried={retried} ({retried / len(states):.1%}), "
+            f"repairs/pipeline={sum(state.repairs for state in states) / len(states):.2f}, "
+            f"errors/pipeline={sum(len(state.errors) for state in states) / len(states):.2f}"
+        )
+        tokens: dict[str, int] = {}
+        for state in states:
+            for kinds in state.usage.values():
+                for kind, count in kinds.items():
+                    tokens[kind] = tokens.get(kind, 0) + count
+        lines.append(
+            "LLM tokens/pipeline: "
+            + ", ".join(
+                f"{kind}={count / len(states):.0f}" for kind, count in tokens.items()
+            )
+        )
+    backend = chat_service.retriever.openai_service.backend
+    if hasattr(backend, "hits"):
+        lines.append(f"Cassette: hits={backend.hits}, misses={backend.misses}")
+    return "\n".join(lines)
+
+
+async def main(args: Namespace) -> None:
+    """
+    Runs the benchmark and prints the report.
+
+    :param args: The arguments.
+
+    :return: None
+    """
+    # Imported here, after `configure`, since the default service instances read the environment
+    from services.chat import ChatService
+
+    chat_service = ChatService()
+    chat_service.retriever.pipeline_listeners.append(
+        lambda state: current_sample.get({}).__setitem__("state", state)
+    )
+    questions = load_questions(args.questions)
+    if args.warmup:
+        await run_benchmark(
+            chat_service, questions, args.warmup, args.concurrency, args.synthesize
+        )
+    samples, duration = await run_benchmark(
+        chat_service, questions, args.requests, args.concurrency, args.synthesize
+    )
+    print(report(samples, duration, chat_service))
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure(arguments)
+    run(main(arguments))
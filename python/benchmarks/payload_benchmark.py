@@ -0,0 +1,122 @@
+"""
+Benchmarks the encodings of the `/activities/detailed-stats` payload, without a database: the
+former one (ORM entities' `__dict__`s through a response model and FastAPI's JSON encoder)
+against the columnar `{headers, rows}` payload serialized with orjson, and an Arrow IPC stream
+(if pyarrow is installed). The former encoding's time includes building the ORM entities, and
+the others start from row tuples, as the Core `select()` returns them.
+
+Run from the `python` directory:
+
+    python -m benchmarks.payload_benchmark --activities 10000
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from json import dumps
+from random import Random
+from time import perf_counter
+from typing import Any, Callable
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from benchmarks.seed_activities import build_activity
+from models.athlete import Activity
+from services.activity_export import encode_arrow, pyarrow
+
+COLUMNS = list(Activity.__table__.columns.keys())
+
+
+class DictActivities(BaseModel):
+    """
+    The former payload: every row as a dict (repeating every key).
+    """
+
+    headers: list[str]
+    activities: list[dict[str, Any]]
+
+
+def encode_dicts(activities: list[Activity]) -> bytes:
+    """
+    Encodes ORM entities the former way (their `__dict__`s, without the SQLAlchemy state that
+    the JSON encoder can't handle).
+
+    :param activities: The activities.
+
+    :return: The encoded payload.
+    """
+    rows = [
+        {key: value for key, value in activity.__dict__.items() if key[0] != "_"}
+        for activity in activities
+    ]
+    headers = list({key for row in rows for key in row})
+    payload = DictActivities(headers=headers, activities=rows)
+    return dumps(jsonable_encoder({"data": payload})).encode("utf-8")
+
+
+def encode_columnar(rows: list[tuple]) -> bytes:
+    """
+    Encodes row tuples as the columnar payload.
+
+    :param rows: The rows.
+
+    :return: The encoded payload.
+    """
+    return orjson.dumps({"data": {"headers": COLUMNS, "rows": rows}})
+
+
+def time_encoding(encode: Callable[[], bytes], repeat: int) -> tuple[float, int]:
+    """
+    Times an encoding (the best of several runs).
+
+    :param encode: The encoding.
+    :param repeat: The number of runs.
+
+    :return: The best run's seconds, and the payload's size in bytes.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        payload = encode()
+        best = min(best, perf_counter() - start)
+    return best, len(payload)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmarks the activities payload encodings.")
+    parser.add_argument("--activities", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = Random(args.seed)
+    start = datetime(2024, 1, 1, 6)
+    values = [
+        build_activity(
+            rng=rng,
+            activity_id=index,
+            athlete_id=1,
+            start=start + timedelta(hours=index),
+        )
+        for index in range(args.activities)
+    ]
+    rows = [tuple(value[name] for name in COLUMNS) for value in values]
+
+    encodings = {
+        "orm + dicts": lambda: encode_dicts([Activity(**value) for value in values]),
+        "columnar": lambda: encode_columnar(rows),
+    }
+    if pyarrow is not None:
+        encodings["arrow"] = lambda: b"".join(encode_arrow(COLUMNS, [rows]))
+
+    print(f"Encoding {args.activities} activities (best of {args.repeat})")
+    print(f"{'encoding':<12} {'ms':>9} {'MB':>8} {'speedup':>8} {'smaller':>8}")
+    baseline = None
+    for name, encode in encodings.items():
+        elapsed, size = time_encoding(encode, repeat=args.repeat)
+        baseline = baseline or (elapsed, size)
+        print(
+            f"{name:<12} {elapsed * 1000:>9.1f} {size / 1e6:>8.2f} "
+            f"{baseline[0] / elapsed:>7.1f}x {baseline[1] / size:>7.1f}x"
+        )
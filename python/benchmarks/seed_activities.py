@@ -0,0 +1,182 @@
+"""
+Seeds a local Postgres database with deterministic, synthetic athletes and activities, for
+benchmarking the chat endpoint (see `chat_benchmark.py`).
+
+Run from the `python` directory (with the DB_* environment variables pointing at a local
+database):
+
+    python -m benchmarks.seed_activities --athletes 20 --activities 500
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, time, timedelta
+from random import Random
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from models.athlete import Base, Athlete, Activity
+from services.database import DatabaseService
+
+ATHLETE_NAMES = [
+    "Jacob", "Emma", "Liam", "Olivia", "Noah", "Ava", "Mason", "Sophia", "Ethan", "Mia",
+    "Lucas", "Harper", "Logan", "Ella", "Owen", "Grace", "Caleb", "Chloe", "Henry", "Zoe",
+]  # fmt: skip
+WEEK_DAYS = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+# Run type (see `Activity.wkt_type`) -> (name, distance range in miles, pace range in s/mi)
+RUN_TYPES = {
+    0: ("Easy Run", (3.0, 8.0), (480, 600)),
+    1: ("Race", (3.1, 26.2), (330, 450)),
+    2: ("Long Run", (10.0, 22.0), (450, 570)),
+    3: ("Workout", (5.0, 10.0), (390, 480)),
+}
+
+
+def to_time(seconds: int) -> time:
+    """
+    Converts a number of seconds to a time of day (e.g., a duration as HH:MM:SS).
+
+    :param seconds: The number of seconds (less than a day).
+
+    :return: The time.
+    """
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def build_activity(rng: Random, activity_id: int, athlete_id: int, start: datetime):
+    """
+    Builds a synthetic activity.
+
+    :param rng: The random number generator.
+    :param activity_id: The activity's ID.
+    :param athlete_id: The athlete's ID.
+    :param start: The activity's start time.
+
+    :return: The activity's column values.
+    """
+    wkt_type = rng.choices(list(RUN_TYPES), weights=[70, 5, 12, 13])[0]
+    name, (min_mi, max_mi), (min_pace, max_pace) = RUN_TYPES[wkt_type]
+    distance_mi = round(rng.uniform(min_mi, max_mi), 2)
+    pace_s = rng.randint(min_pace, max_pace)
+    moving_time_s = int(distance_mi * pace_s)
+    return {
+        "activity_id": activity_id,
+        "athlete_id": athlete_id,
+        "name": name,
+        "moving_time": to_time(moving_time_s),
+        "moving_time_s": moving_time_s,
+        "distance_mi": distance_mi,
+        "pace_min_mi": to_time(pace_s),
+        "avg_speed_ft_s": round(5280 / pace_s, 2),
+        "full_datetime": start,
+        "time": start.time(),
+        "week_day": WEEK_DAYS[start.weekday()],
+        "month": start.month,
+        "day": start.day,
+        "year": start.year,
+        "spm_avg": round(rng.uniform(160, 185), 1),
+        "hr_avg": round(rng.uniform(130, 175), 1),
+        "wkt_type": wkt_type,
+        "description": None,
+        "total_elev_gain_ft": round(rng.uniform(0, 60) * distance_mi, 1),
+        "manual": False,
+        "max_speed_ft_s": round(5280 / pace_s * rng.uniform(1.1, 1.5), 2),
+        "calories": round(distance_mi * rng.uniform(95, 115)),
+        "achievement_count": rng.randint(0, 5),
+        "kudos_count": rng.randint(0, 30),
+        "comment_count": rng.randint(0, 5),
+        "athlete_count": rng.randint(1, 4),
+        "rpe": rng.randint(1, 10),
+        "rating": rng.randint(1, 10),
+        "avg_power": rng.randint(220, 340),
+        "sleep_rating": rng.randint(1, 10),
+    }
+
+
+def seed(
+    db_service: DatabaseService,
+    athletes: int,
+    activities: int,
+    days: int,
+    random_seed: int,
+    batch_size: int = 1000,
+) -> int:
+    """
+    Creates the schema and tables (if needed) and inserts the synthetic data (skipping existing rows).
+
+    :param db_service: The database service.
+    :param athletes: The number of athletes.
+    :param activities: The number of activities per athlete.
+    :param days: The number of days (ending today) the activities are spread over.
+    :param random_seed: The random seed (the same seed always produces the same data).
+    :param batch_size: The number of activities inserted per statement.
+
+    :return: The number of activities generated.
+    """
+    rng = Random(random_seed)
+    with db_service.engine.begin() as connection:
+        connection.execute(text("CREATE SCHEMA IF NOT EXISTS strava_api"))
+    Base.metadata.create_all(db_service.engine)
+
+    session = db_service.get_session()
+    try:
+        athlete_rows = [
+            {
+                "athlete_id": athlete_id,
+                "athlete_name": f"{ATHLETE_NAMES[(athlete_id - 1) % len(ATHLETE_NAMES)]}"
+                + (f" {athlete_id}" if athlete_id > len(ATHLETE_NAMES) else ""),
+                "refresh_token": "seeded",
+                "email": f"athlete{athlete_id}@example.com",
+            }
+            for athlete_id in range(1, athletes + 1)
+        ]
+        session.execute(insert(Athlete).values(athlete_rows).on_conflict_do_nothing())
+
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        batch, upserted = [], 0
+        for athlete_id in range(1, athletes + 1):
+            for index in range(activities):
+                start = today - timedelta(
+                    days=rng.randint(0, days - 1), seconds=-rng.randint(5, 20) * 3600
+                )
+                batch.append(
+                    build_activity(
+                        rng=rng,
+                        activity_id=athlete_id * 1_000_000 + index,
+                        athlete_id=athlete_id,
+                        start=start,
+                    )
+                )
+                if len(batch) == batch_size:
+                    session.execute(
+                        insert(Activity).values(batch).on_conflict_do_nothing()
+                    )
+                    upserted, batch = upserted + len(batch), []
+        if batch:
+            session.execute(insert(Activity).values(batch).on_conflict_do_nothing())
+            upserted += len(batch)
+        session.commit()
+        return upserted
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        db_service.close_session()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Seeds a local database for benchmarking.")
+    parser.add_argument("--athletes", type=int, default=20)
+    parser.add_argument("--activities", type=int, default=500, help="Per athlete")
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    count = seed(
+        db_service=DatabaseService(),
+        athletes=args.athletes,
+        activities=args.activities,
+        days=args.days,
+        random_seed=args.seed,
+    )
+    print(f"Seeded {args.athletes} athletes and {count} activities.")
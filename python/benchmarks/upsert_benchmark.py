@@ -0,0 +1,124 @@
+"""
+Benchmarks the activity upsert paths against a local Postgres database: the per-row
+`upsert_activity`, and the bulk `upsert_activities` via multi-row statements and via COPY.
+
+Each path upserts the same synthetic activities three times: into an empty table (inserts),
+again unchanged (no-op conflicts), and with every row modified (updates). Run from the `python`
+directory (with the DB_* environment variables pointing at a local, disposable database):
+
+    python -m benchmarks.upsert_benchmark --activities 5000
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from random import Random
+from time import perf_counter
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+
+from benchmarks.seed_activities import build_activity
+from dao.strava_activities import StravaActivitiesDao
+from models.athlete import Base, Athlete, Activity
+from services.database import DatabaseService
+
+# Far above the seeded IDs, so the benchmark's rows can be cleared without touching them
+ATHLETE_ID = 999_999
+FIRST_ACTIVITY_ID = 9_000_000_000
+
+
+def build_activities(count: int, random_seed: int) -> list[dict]:
+    """
+    Builds the benchmark's synthetic activities.
+
+    :param count: The number of activities.
+    :param random_seed: The random seed.
+
+    :return: The activities' column values.
+    """
+    rng = Random(random_seed)
+    start = datetime(2024, 1, 1, 6)
+    return [
+        build_activity(
+            rng=rng,
+            activity_id=FIRST_ACTIVITY_ID + index,
+            athlete_id=ATHLETE_ID,
+            start=start + timedelta(hours=index * 7),
+        )
+        for index in range(count)
+    ]
+
+
+def reset(db_service: DatabaseService) -> None:
+    """
+    Creates the tables (if needed) and the benchmark's athlete, and clears its activities.
+
+    :param db_service: The database service.
+
+    :return: None
+    """
+    with db_service.engine.begin() as connection:
+        connection.execute(text("CREATE SCHEMA IF NOT EXISTS strava_api"))
+    Base.metadata.create_all(db_service.engine)
+    with db_service.engine.begin() as connection:
+        connection.execute(
+            insert(Athlete)
+            .values(
+                athlete_id=ATHLETE_ID,
+                athlete_name="Upsert Benchmark",
+                refresh_token="benchmark",
+                email="upsert-benchmark@example.com",
+            )
+            .on_conflict_do_nothing()
+        )
+        connection.execute(delete(Activity).where(Activity.athlete_id == ATHLETE_ID))
+
+
+def run_path(dao: StravaActivitiesDao, path: str, rows: list[dict]) -> float:
+    """
+    Upserts the rows through one of the upsert paths.
+
+    :param dao: The activities DAO.
+    :param path: The path ("per-row", "multi-row", or "copy").
+    :param rows: The activity rows.
+
+    :return: The elapsed seconds.
+    """
+    start = perf_counter()
+    if path == "per-row":
+        for row in rows:
+            dao.upsert_activity(row)
+    else:
+        dao.copy_threshold = 0 if path == "copy" else len(rows) + 1
+        dao.upsert_activities(rows)
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmarks the activity upsert paths.")
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--paths", nargs="+", default=["per-row", "multi-row", "copy"])
+    args = parser.parse_args()
+
+    db_service = DatabaseService()
+    dao = StravaActivitiesDao(db_service=db_service, batch_size=args.batch_size)
+    dao.logger.setLevel("WARNING")
+    rows = build_activities(count=args.activities, random_seed=args.seed)
+    modified = [{**row, "kudos_count": row["kudos_count"] + 1} for row in rows]
+
+    print(f"Upserting {len(rows)} activities (batch size {args.batch_size})")
+    print(f"{'path':<10} {'phase':<10} {'seconds':>9} {'rows/s':>10}")
+    for path in args.paths:
+        reset(db_service)
+        for phase, phase_rows in (
+            ("insert", rows),
+            ("unchanged", rows),
+            ("update", modified),
+        ):
+            elapsed = run_path(dao=dao, path=path, rows=phase_rows)
+            print(
+                f"{path:<10} {phase:<10} {elapsed:>9.2f} {len(phase_rows) / elapsed:>10.0f}"
+            )
+    reset(db_service)
@@ -0,0 +1,174 @@
+"""
+Simulates Strava's push subscription against a running server: the callback validation
+handshake, then bursts of activity events the way Strava sends them (a create, often followed by
+a few quick edits, some deletes, and retried duplicates).
+
+Reports the handshake's result, the event acknowledgement latency (Strava expects a response
+within two seconds), and, once the queue drains, how many events were coalesced and how the
+activities were processed. Run from the `python` directory, with the server running (and the
+same STRAVA_WEBHOOK_VERIFY_TOKEN and STRAVA_WEBHOOK_SUBSCRIPTION_ID):
+
+    python -m benchmarks.webhook_simulator --activities 50 --owner-id 12345
+
+Events for an athlete that isn't in `strava_api.athletes` are acknowledged and skipped, so the
+queueing and coalescing can be exercised without any Strava API calls.
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from random import Random
+from time import perf_counter, sleep, time
+
+import requests
+from numpy import percentile
+
+PERCENTILES = [50, 90, 99]
+
+
+def build_events(
+    rng: Random,
+    activities: int,
+    owner_id: int,
+    subscription_id: int,
+    max_updates: int,
+    delete_rate: float,
+    duplicate_rate: float,
+) -> list[dict]:
+    """
+    Builds a burst of push events for new activities, in a realistic (interleaved) order.
+
+    :param rng: The random number generator.
+    :param activities: The number of new activities.
+    :param owner_id: The athlete's ID.
+    :param subscription_id: The push subscription's ID.
+    :param max_updates: The most edits per activity.
+    :param delete_rate: The share of activities deleted after being created.
+    :param duplicate_rate: The share of events Strava retries (delivers twice).
+
+    :return: The events.
+    """
+    streams = []
+    for index in range(activities):
+        activity_id = 9_500_000_000 + int(time()) % 100_000 * 1000 + index
+        stream = [("create", {})]
+        for _ in range(rng.randint(0, max_updates)):
+            stream.append(
+                rng.choice(
+                    [
+                        ("update", {"title": f"Run {activity_id} (edited)"}),
+                        ("update", {"type": "Run"}),
+                        ("update", {"private": "true"}),
+                    ]
+                )
+            )
+        if rng.random() < delete_rate:
+            stream.append(("delete", {}))
+        streams.append([(activity_id, aspect, updates) for aspect, updates in stream])
+
+    # Interleave the activities' streams, keeping each one's own order
+    events = []
+    while streams:
+        stream = rng.choice(streams)
+        activity_id, aspect, updates = stream.pop(0)
+        if not stream:
+            streams.remove(stream)
+        event = {
+            "object_type": "activity",
+            "object_id": activity_id,
+            "aspect_type": aspect,
+            "owner_id": owner_id,
+            "subscription_id": subscription_id,
+            "event_time": int(time()),
+            "updates": updates,
+        }
+        events.append(event)
+        if rng.random() < duplicate_rate:
+            events.append(event)
+    return events
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Simulates Strava push events.")
+    parser.add_argument("--url", default="http://localhost:5000/api/v1/strava/webhook")
+    parser.add_argument(
+        "--verify-token", default=getenv("STRAVA_WEBHOOK_VERIFY_TOKEN", "")
+    )
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--owner-id", type=int, default=1)
+    parser.add_argument(
+        "--subscription-id",
+        type=int,
+        default=int(getenv("STRAVA_WEBHOOK_SUBSCRIPTION_ID", "1")),
+    )
+    parser.add_argument("--max-updates", type=int, default=3)
+    parser.add_argument("--delete-rate", type=float, default=0.1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    handshake = requests.get(
+        args.url,
+        params={
+            "hub.mode": "subscribe",
+            "hub.challenge": "simulated-challenge",
+            "hub.verify_token": args.verify_token,
+        },
+        timeout=10,
+    )
+    print(f"Handshake: HTTP {handshake.status_code} {handshake.text}")
+
+    events = build_events(
+        rng=Random(args.seed),
+        activities=args.activities,
+        owner_id=args.owner_id,
+        subscription_id=args.subscription_id,
+        max_updates=args.max_updates,
+        delete_rate=args.delete_rate,
+        duplicate_rate=args.duplicate_rate,
+    )
+    before = requests.get(f"{args.url}/stats", timeout=10).json()["data"]
+
+    def send(event: dict) -> float:
+        start = perf_counter()
+        requests.post(args.url, json=event, timeout=10).raise_for_status()
+        return perf_counter() - start
+
+    # Each activity's events must arrive in order, so they're sent one activity batch at a time
+    start = perf_counter()
+    latencies = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for offset in range(0, len(events), args.concurrency):
+            batch = events[offset : offset + args.concurrency]
+            if len({event["object_id"] for event in batch}) < len(batch):
+                latencies += [send(event) for event in batch]
+            else:
+                latencies += list(executor.map(send, batch))
+    elapsed = perf_counter() - start
+    print(
+        f"Sent {len(events)} events for {args.activities} activities in {elapsed:.2f}s "
+        f"({len(events) / elapsed:.0f} events/s)"
+    )
+    print(
+        "Acknowledgement latency: "
+        + ", ".join(
+            f"p{p}={percentile(latencies, p) * 1000:.1f}ms" for p in PERCENTILES
+        )
+    )
+
+    drain_start = perf_counter()
+    while True:
+        stats = requests.get(f"{args.url}/stats", timeout=10).json()["data"]
+        if not stats["queued"] and not stats["in_progress"]:
+            break
+        sleep(0.1)
+    processed = {
+        outcome: count - before["processed"].get(outcome, 0)
+        for outcome, count in stats["processed"].items()
+    }
+    print(f"Queue drained {perf_counter() - drain_start:.2f}s after the last event")
+    print(
+        f"Coalesced {stats['coalesced'] - before['coalesced']} of "
+        f"{stats['received'] - before['received']} events; processed: {processed}"
+    )
@@ -0,0 +1,12 @@
+from os import environ
+
+# The DAOs create their database engine when they're imported (without connecting), so the
+# tests get placeholder database settings where none are configured
+for name, value in {
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+}.items():
+    environ.setdefault(name, value)
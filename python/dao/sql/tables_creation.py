@@ -1,4 +1,5 @@
 from models.athlete import Base, Athlete, Activity
+from models.sync import SyncBase, AthleteSyncState
 from services.database import DatabaseService
 
 # Create the database service
@@ -8,6 +9,10 @@ engine = db_service.engine
 # Create the tables
 try:
     Base.metadata.create_all(engine)
+    SyncBase.metadata.create_all(engine)
+    # `create_all` skips existing tables, along with any indexes added to them since
+    for index in Activity.__table__.indexes:
+        index.create(engine, checkfirst=True)
     print("Tables created successfully!")
 except Exception as e:
     print(f"Error creating a table: {e}")
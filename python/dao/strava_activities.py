@@ -1,20 +1,146 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from json import dumps, loads
+from os import getenv
+from typing import Iterator
+from sqlalchemy import (
+    String,
+    and_,
+    cast,
+    column,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+)
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
 
 from models.athlete import Activity
+from services.cache import data_versions
 from services.database import DatabaseService
 from utils.simple_logger import SimpleLogger
 
 
+def to_csv_field(value) -> str:
+    """
+    Formats a value as a CSV field for COPY, quoting everything but numbers so that an unquoted
+    empty field always means NULL (and a quoted one, an empty string).
+
+    Args:
+        value: The value.
+
+    Returns:
+        The CSV field.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (bool, int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def encode_cursor(sort_by: str, descending: bool, value, activity_id: int) -> str:
+    """
+    Encodes a keyset cursor: the position of a page's last row in the sort order.
+
+    Args:
+        sort_by: The sort column.
+        descending: Whether the sort order is descending.
+        value: The last row's sort column value.
+        activity_id: The last row's activity ID (the tiebreaker).
+
+    Returns:
+        The opaque (URL-safe) cursor.
+    """
+    if isinstance(value, (date, time)):
+        value = value.isoformat()
+    payload = dumps([sort_by, descending, value, activity_id], separators=(",", ":"))
+    return urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool) -> tuple:
+    """
+    Decodes a keyset cursor, checking that it belongs to the requested sort order.
+
+    Args:
+        cursor: The cursor.
+        sort_by: The sort column.
+        descending: Whether the sort order is descending.
+
+    Returns:
+        The last row's sort column value and activity ID.
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another sort order.
+    """
+    try:
+        payload = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, cursor_descending, value, activity_id = loads(payload)
+    except Exception:
+        raise ValueError("Malformed cursor.")
+    if (cursor_sort_by, cursor_descending) != (sort_by, descending):
+        raise ValueError("The cursor belongs to a different sort order.")
+    python_type = Activity.__table__.columns[sort_by].type.python_type
+    if value is not None and python_type in (datetime, date, time):
+        value = python_type.fromisoformat(value)
+    return value, int(activity_id)
+
+
+def check_columns(names: list[str]) -> None:
+    """
+    Checks that activity column names exist (they come from API requests).
+
+    Args:
+        names: The column names.
+
+    Raises:
+        ValueError: If a column is unknown.
+    """
+    unknown = set(names) - set(Activity.__table__.columns.keys())
+    if unknown:
+        raise ValueError(f"Unknown activity columns: {', '.join(sorted(unknown))}.")
+
+
 class StravaActivitiesDao:
     """
     Responsible for managing Strava activity data in the database.
     """
 
-    def __init__(self, db_service: DatabaseService = DatabaseService()):
+    def __init__(
+        self,
+        db_service: DatabaseService = DatabaseService(),
+        batch_size: int = None,
+        copy_threshold: int = None,
+        stream_chunk_size: int = None,
+    ):
         """
         :param db_service: An instance of DatabaseService for session management.
+        :param batch_size: The number of rows per multi-row upsert statement (SQLAlchemy's
+            `insertmanyvalues_page_size`).
+        :param copy_threshold: The number of rows from which bulk upserts go through COPY instead.
+        :param stream_chunk_size: The number of rows fetched at a time when streaming activities.
         """
         self.db_service = db_service
+        # Postgres allows 65,535 bind parameters per statement (~2,000 activities' worth)
+        self.batch_size: int = (
+            int(getenv("ACTIVITY_UPSERT_BATCH_SIZE", "500"))
+            if batch_size is None
+            else batch_size
+        )
+        self.copy_threshold: int = (
+            int(getenv("ACTIVITY_UPSERT_COPY_THRESHOLD", "5000"))
+            if copy_threshold is None
+            else copy_threshold
+        )
+        self.stream_chunk_size: int = (
+            int(getenv("ACTIVITY_STREAM_CHUNK_SIZE", "1000"))
+            if stream_chunk_size is None
+            else stream_chunk_size
+        )
         self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
 
     def upsert_activity(self, activity_data: dict) -> int:
@@ -46,6 +172,7 @@ class StravaActivitiesDao:
             )
             result = session.execute(stmt)
             session.commit()
+            data_versions.bump(Activity.__table__.fullname)
             row_count = result.rowcount
             if row_count > 0:
                 self.logger.debug(f"Activity successfully upserted.")
@@ -57,6 +184,150 @@ class StravaActivitiesDao:
         finally:
             self.db_service.close_session()
 
+    def upsert_activities(self, activities_data: list[dict]) -> dict[str, int] | None:
+        """
+        Upserts activity records into the database in bulk, in a single transaction.
+
+        Moderate batches go through multi-row INSERT ... ON CONFLICT DO UPDATE statements, and
+        large ones (from `copy_threshold` rows) are COPY'd into a temporary staging table and
+        merged with one set-based INSERT ... SELECT. Either way, rows identical to the stored
+        ones are left untouched. As with `upsert_activity`, only the given columns are written.
+
+        Args:
+            activities_data: A list of dictionaries containing activity details (later entries
+                win for repeated activity IDs).
+
+        Returns:
+            The number of rows inserted, updated, and left unchanged (or None if the upsert failed).
+        """
+        # A statement can't upsert the same row twice
+        rows = list(
+            {
+                activity_data["activity_id"]: activity_data
+                for activity_data in activities_data
+            }.values()
+        )
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not rows:
+            return counts
+        # Rows with different columns can't share a statement
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+
+        use_copy = len(rows) >= self.copy_threshold
+        self.logger.info(
+            "Upserting %s activities (%s)",
+            len(rows),
+            "COPY" if use_copy else "multi-row",
+        )
+        session = self.db_service.get_session()
+        try:
+            for columns, group in groups.items():
+                if use_copy:
+                    inserted = self.copy_merge_activities(session, columns, group)
+                else:
+                    # One cached statement, executed many: SQLAlchemy batches the rows into
+                    # multi-row VALUES pages itself, keeping the RETURNING rows
+                    inserted = (
+                        session.execute(
+                            self.with_upsert(insert(Activity), columns),
+                            group,
+                            execution_options={
+                                "insertmanyvalues_page_size": self.batch_size
+                            },
+                        )
+                        .scalars()
+                        .all()
+                    )
+                counts["inserted"] += sum(inserted)
+                counts["updated"] += len(inserted) - sum(inserted)
+                counts["unchanged"] += len(group) - len(inserted)
+            session.commit()
+            data_versions.bump(Activity.__table__.fullname)
+            self.logger.info(f"Activities upserted: {counts}")
+            return counts
+        except Exception as e:
+            session.rollback()
+            self.logger.error("Error upserting activities: %s", e, exc_info=True)
+            return None
+        finally:
+            self.db_service.close_session()
+
+    @staticmethod
+    def with_upsert(stmt, columns: tuple[str, ...]):
+        """
+        Turns an INSERT into an upsert that only rewrites rows whose values changed, and returns
+        whether each written row was inserted (rather than updated).
+
+        Args:
+            stmt: The INSERT statement.
+            columns: The inserted columns.
+
+        Returns:
+            The upsert statement.
+        """
+        updated = [name for name in columns if name != "activity_id"]
+        stored = Activity.__table__.c
+        return stmt.on_conflict_do_update(
+            index_elements=["activity_id"],
+            set_={name: stmt.excluded[name] for name in updated},
+            where=or_(
+                *(
+                    stored[name].is_distinct_from(stmt.excluded[name])
+                    for name in updated
+                )
+            ),
+        ).returning(
+            # xmax is only set on updated row versions
+            literal_column("xmax = 0")
+        )
+
+    def copy_merge_activities(
+        self, session: Session, columns: tuple[str, ...], rows: list[dict]
+    ) -> list[bool]:
+        """
+        Upserts activities by COPYing them into a temporary staging table and merging it into
+        the activities table (within the session's transaction).
+
+        Args:
+            session: The session (whose transaction the staging table is dropped with).
+            columns: The rows' columns.
+            rows: The activity rows.
+
+        Returns:
+            Whether each written row was inserted (rather than updated).
+        """
+        staging = "activities_staging"
+        column_list = ", ".join(columns)
+        session.execute(text(f"DROP TABLE IF EXISTS pg_temp.{staging}"))
+        session.execute(
+            text(
+                f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {Activity.__table__.fullname} WITH NO DATA"
+            )
+        )
+
+        buffer = StringIO(
+            "".join(
+                ",".join(to_csv_field(row[name]) for name in columns) + "\n"
+                for row in rows
+            )
+        )
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+        stmt = insert(Activity).from_select(
+            list(columns),
+            select(*(column(name) for name in columns)).select_from(table(staging)),
+        )
+        return session.execute(self.with_upsert(stmt, columns)).scalars().all()
+
     def get_activity(self, activity_id: int) -> Activity:
         """
         Retrieves an activity by its ID.
@@ -77,12 +348,41 @@ class StravaActivitiesDao:
         finally:
             self.db_service.close_session()
 
-    def update_activity(self, activity_id: int, **kwargs) -> bool:
+    def get_activities_by_ids(self, activity_ids: list[int]) -> list[Activity]:
+        """
+        Retrieves the stored activities among the given IDs.
+
+        Args:
+            activity_ids: The activity IDs.
+
+        Returns:
+            A list of Activity objects (IDs that aren't stored are left out).
+        """
+        if not activity_ids:
+            return []
+        self.logger.debug("Fetching %s activities by ID", len(activity_ids))
+        session = self.db_service.get_session()
+        try:
+            return (
+                session.query(Activity)
+                .filter(Activity.activity_id.in_(activity_ids))
+                .all()
+            )
+        except Exception as e:
+            self.logger.error("Error fetching activities: %s", e, exc_info=True)
+            raise
+        finally:
+            self.db_service.close_session()
+
+    def update_activity(
+        self, activity_id: int, athlete_id: int | None = None, **kwargs
+    ) -> bool:
         """
         Updates fields of an activity with the specified ID.
 
         Args:
             activity_id: The ID of the activity to update.
+            athlete_id: Only update the activity if it belongs to this athlete.
 
         Returns:
             A boolean indicating whether or not the activity was updated.
@@ -90,8 +390,12 @@ class StravaActivitiesDao:
         self.logger.info("Updating activity with ID %s", activity_id)
         session = self.db_service.get_session()
         try:
-            session.query(Activity).filter_by(activity_id=activity_id).update(kwargs)
+            query = session.query(Activity).filter_by(activity_id=activity_id)
+            if athlete_id is not None:
+                query = query.filter_by(athlete_id=athlete_id)
+            query.update(kwargs)
             session.commit()
+            data_versions.bump(Activity.__table__.fullname)
             return True
         except Exception as e:
             session.rollback()
@@ -100,12 +404,13 @@ class StravaActivitiesDao:
         finally:
             self.db_service.close_session()
 
-    def delete_activity(self, activity_id: int) -> bool:
+    def delete_activity(self, activity_id: int, athlete_id: int | None = None) -> bool:
         """
         Deletes an activity by its ID.
 
         Args:
             activity_id: The ID of the activity to delete.
+            athlete_id: Only delete the activity if it belongs to this athlete.
 
         Returns:
             A boolean indicating whether the activity was deleted or not.
@@ -113,8 +418,12 @@ class StravaActivitiesDao:
         self.logger.info("Deleting activity with ID %s", activity_id)
         session = self.db_service.get_session()
         try:
-            session.query(Activity).filter_by(activity_id=activity_id).delete()
+            query = session.query(Activity).filter_by(activity_id=activity_id)
+            if athlete_id is not None:
+                query = query.filter_by(athlete_id=athlete_id)
+            query.delete()
             session.commit()
+            data_versions.bump(Activity.__table__.fullname)
             return True
         except Exception as e:
             session.rollback()
@@ -150,18 +459,207 @@ class StravaActivitiesDao:
             self.logger.error(f"Error fetching basic stats: {e}")
             raise
 
-    def get_detailed_activities(self) -> list[Activity] | None:
+    def get_activities_page(
+        self,
+        athlete_id: int | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        filters: dict[str, str] | None = None,
+        sort_by: str = "full_datetime",
+        descending: bool = True,
+        columns: list[str] | None = None,
+        cursor: str | None = None,
+        page_size: int = 100,
+    ) -> tuple[list[tuple], str | None]:
         """
-        Acquires a list of detailed activities to display to the "Database" page.
+        Acquires a page of activities, filtered, sorted and projected by the database.
+
+        Pages are keyset-paginated on (sort column, activity_id): each page starts right after
+        the previous page's last row, so a page costs the same however deep it is. NULLs sort
+        as the largest values (Postgres's default), so one index serves both directions.
+
+        Args:
+            athlete_id: Only this athlete's activities (all athletes', if not given).
+            start_date: Only activities on or after this date.
+            end_date: Only activities on or before this date.
+            filters: Column -> text to look for in it (case-insensitive).
+            sort_by: The sort column.
+            descending: Whether to sort in descending order.
+            columns: The columns to return (all of them, if not given).
+            cursor: The previous page's next cursor (the first page, if not given).
+            page_size: The most activities to return.
+
+        Returns:
+            The activities as row tuples (of the requested columns, in order), and the cursor
+            for the next page (None on the last page).
+
+        Raises:
+            ValueError: If a column is unknown, or the cursor is invalid.
         """
-        self.logger.info("Acquiring a list of detailed activities")
+        table_columns = Activity.__table__.columns
+        columns = list(columns or table_columns.keys())
+        check_columns([sort_by, *columns, *(filters or {})])
+
+        sort_column = table_columns[sort_by]
+        id_column = table_columns["activity_id"]
+        # The cursor's columns are selected even if they weren't requested
+        selected = list(dict.fromkeys([*columns, sort_by, "activity_id"]))
+        stmt = self.filter_activities(
+            select(*(table_columns[name] for name in selected)),
+            athlete_id=athlete_id,
+            start_date=start_date,
+            end_date=end_date,
+            filters=filters,
+        )
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, sort_by, descending)
+            if last_value is None:
+                # Past the non-NULL values (ascending) or still among the NULLs (descending)
+                after = and_(
+                    sort_column.is_(None),
+                    id_column < last_id if descending else id_column > last_id,
+                )
+                if descending:
+                    after = or_(after, sort_column.is_not(None))
+            else:
+                last = tuple_(sort_column, id_column)
+                # Compared in the column's own type (e.g., a REAL isn't equal to its value
+                # as a double precision literal, so ties would be skipped or repeated)
+                bound = tuple_(cast(last_value, sort_column.type), last_id)
+                after = (
+                    last < bound
+                    if descending
+                    else or_(last > bound, sort_column.is_(None))
+                )
+            stmt = stmt.where(after)
+        stmt = stmt.order_by(
+            *(
+                (sort_column.desc().nulls_first(), id_column.desc())
+                if descending
+                else (sort_column.asc().nulls_last(), id_column.asc())
+            )
+        ).limit(page_size + 1)
+
+        self.logger.info("Acquiring a page of up to %s activities", page_size)
         session = self.db_service.get_session()
         try:
-            activities = session.query(Activity).all()
-            return activities
+            rows = session.execute(stmt).all()
         except Exception as e:
             session.rollback()
-            self.logger.error(f"Error acquiring the list of detailed activities: {e}")
-            return None
+            self.logger.error(
+                "Error acquiring a page of activities: %s", e, exc_info=True
+            )
+            raise
         finally:
             self.db_service.close_session()
+
+        # The extra row only tells whether there's another page
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                sort_by,
+                descending,
+                last[selected.index(sort_by)],
+                last[selected.index("activity_id")],
+            )
+        return [tuple(row[: len(columns)]) for row in rows], next_cursor
+
+    @staticmethod
+    def filter_activities(
+        stmt,
+        athlete_id: int | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        filters: dict[str, str] | None = None,
+    ):
+        """
+        Adds the activity filters shared by the "Database" page and the export to a SELECT.
+
+        Args:
+            stmt: The SELECT statement.
+            athlete_id: Only this athlete's activities (all athletes', if not given).
+            start_date: Only activities on or after this date.
+            end_date: Only activities on or before this date.
+            filters: Column -> text to look for in it (case-insensitive).
+
+        Returns:
+            The filtered SELECT statement.
+        """
+        if athlete_id is not None:
+            stmt = stmt.where(Activity.athlete_id == athlete_id)
+        if start_date is not None:
+            stmt = stmt.where(Activity.full_datetime >= start_date)
+        if end_date is not None:
+            stmt = stmt.where(Activity.full_datetime < end_date + timedelta(days=1))
+        for name, value in (filters or {}).items():
+            stmt = stmt.where(
+                cast(Activity.__table__.columns[name], String).icontains(
+                    value, autoescape=True
+                )
+            )
+        return stmt
+
+    def stream_activities(
+        self,
+        athlete_id: int | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        filters: dict[str, str] | None = None,
+        columns: list[str] | None = None,
+    ) -> Iterator[list[tuple]]:
+        """
+        Streams the activities matching the filters, oldest first, in chunks of
+        `stream_chunk_size` rows. The rows come through a server-side cursor, so memory use
+        doesn't grow with the number of activities.
+
+        The arguments are checked right away, but the query only runs once iteration starts, on
+        a connection of its own (iteration may hop threads, which the scoped session can't).
+        Closing the iterator early releases the connection.
+
+        Args:
+            athlete_id: Only this athlete's activities (all athletes', if not given).
+            start_date: Only activities on or after this date.
+            end_date: Only activities on or before this date.
+            filters: Column -> text to look for in it (case-insensitive).
+            columns: The columns to return (all of them, if not given).
+
+        Returns:
+            An iterator over chunks of row tuples (in the order of `columns`).
+
+        Raises:
+            ValueError: If a column is unknown.
+        """
+        table_columns = Activity.__table__.columns
+        columns = list(columns or table_columns.keys())
+        check_columns([*columns, *(filters or {})])
+        stmt = self.filter_activities(
+            select(*(table_columns[name] for name in columns)),
+            athlete_id=athlete_id,
+            start_date=start_date,
+            end_date=end_date,
+            filters=filters,
+        ).order_by(Activity.full_datetime, Activity.activity_id)
+        return self.iter_chunks(stmt)
+
+    def iter_chunks(self, stmt) -> Iterator[list[tuple]]:
+        """
+        Runs a SELECT through a server-side cursor, yielding its rows a chunk at a time.
+
+        Args:
+            stmt: The SELECT statement.
+
+        Returns:
+            An iterator over chunks of row tuples.
+        """
+        self.logger.info("Streaming activities")
+        rows = 0
+        with self.db_service.engine.connect() as connection:
+            result = connection.execution_options(
+                yield_per=self.stream_chunk_size
+            ).execute(stmt)
+            for partition in result.partitions():
+                rows += len(partition)
+                yield [tuple(row) for row in partition]
+        self.logger.info("Streamed %s activities", rows)
@@ -1,7 +1,8 @@
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.dialects.postgresql import insert
 
-from models.athlete import Athlete
+from models.athlete import Athlete, Activity
+from services.cache import data_versions
 from services.database import DatabaseService
 from utils.simple_logger import SimpleLogger
 
@@ -54,6 +55,7 @@ class StravaAthleteDao:
             )
             result = session.execute(stmt)
             session.commit()
+            data_versions.bump(Athlete.__table__.fullname)
             row_count = result.rowcount
             self.logger.info(f"{row_count} rows were updated")
             return row_count
@@ -87,6 +89,23 @@ class StravaAthleteDao:
         finally:
             self.db_service.close_session()
 
+    def get_athletes(self) -> list[Athlete]:
+        """
+        Retrieves all athletes.
+
+        Returns:
+            A list of Athlete objects.
+        """
+        self.logger.debug("Fetching all athletes")
+        session = self.db_service.get_session()
+        try:
+            return session.query(Athlete).order_by(Athlete.athlete_id).all()
+        except Exception as e:
+            self.logger.error("Error getting athletes: %s", e, exc_info=True)
+            raise
+        finally:
+            self.db_service.close_session()
+
     def get_athlete_id(self, athlete_name: str) -> int:
         """
         Retrieves an athlete's ID by their name.
@@ -151,6 +170,7 @@ class StravaAthleteDao:
                 athlete.email = email
 
             session.commit()
+            data_versions.bump(Athlete.__table__.fullname)
             self.logger.info("Athlete with ID %s updated", athlete_id)
             return True
         except Exception as e:
@@ -180,6 +200,8 @@ class StravaAthleteDao:
 
             session.delete(athlete)
             session.commit()
+            # Deleting an athlete cascades to their activities
+            data_versions.bump(Athlete.__table__.fullname, Activity.__table__.fullname)
             self.logger.info("Athlete with ID %s deleted", athlete_id)
             return True
         except Exception as e:
@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from models.sync import AthleteSyncState
+from services.database import DatabaseService
+from utils.simple_logger import SimpleLogger
+
+
+class StravaSyncStateDao:
+    """
+    Responsible for managing athletes' activity sync state in the database.
+    """
+
+    def __init__(self, db_service: DatabaseService = DatabaseService()):
+        """
+        :param db_service: An instance of DatabaseService for session management.
+        """
+        self.db_service = db_service
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def get_sync_state(self, athlete_id: int) -> AthleteSyncState | None:
+        """
+        Retrieves an athlete's sync state.
+
+        Args:
+            athlete_id: The athlete's ID.
+
+        Returns:
+            An AthleteSyncState object (or None if the athlete has never been synced).
+        """
+        self.logger.debug("Fetching sync state for athlete with ID %s", athlete_id)
+        session = self.db_service.get_session()
+        try:
+            return (
+                session.query(AthleteSyncState).filter_by(athlete_id=athlete_id).first()
+            )
+        except Exception as e:
+            self.logger.error("Error fetching sync state: %s", e, exc_info=True)
+            raise
+        finally:
+            self.db_service.close_session()
+
+    def upsert_sync_state(
+        self,
+        athlete_id: int,
+        last_activity_at: datetime | None,
+        pending_activity_ids: list[int],
+        last_status: str,
+    ) -> int:
+        """
+        Inserts or updates an athlete's sync state (upsert), stamped with the current time.
+
+        Args:
+            athlete_id: The athlete's ID.
+            last_activity_at: The start time of the newest activity listed so far (the watermark).
+            pending_activity_ids: The IDs of the activities still to be fetched and stored.
+            last_status: The sync's outcome (complete, partial, or failed).
+
+        Returns:
+            The number of rows inserted or updated.
+        """
+        self.logger.info("Upserting sync state for athlete with ID %s", athlete_id)
+        values = {
+            "last_activity_at": last_activity_at,
+            "pending_activity_ids": pending_activity_ids,
+            "last_synced_at": datetime.now(timezone.utc),
+            "last_status": last_status,
+        }
+        session = self.db_service.get_session()
+        try:
+            stmt = (
+                insert(AthleteSyncState)
+                .values(athlete_id=athlete_id, **values)
+                .on_conflict_do_update(index_elements=["athlete_id"], set_=values)
+            )
+            result = session.execute(stmt)
+            session.commit()
+            return result.rowcount
+        except Exception as e:
+            session.rollback()
+            self.logger.error("Error upserting sync state: %s", e, exc_info=True)
+            return 0
+        finally:
+            self.db_service.close_session()
+
+    def add_pending_activity_ids(self, athlete_id: int, activity_ids: list[int]) -> int:
+        """
+        Appends activities to an athlete's pending list, for their next sync to pick up (e.g.,
+        a pushed activity that couldn't be fetched).
+
+        Args:
+            athlete_id: The athlete's ID.
+            activity_ids: The IDs of the activities.
+
+        Returns:
+            The number of rows inserted or updated.
+        """
+        self.logger.info(
+            "Adding %s pending activities for athlete with ID %s",
+            len(activity_ids),
+            athlete_id,
+        )
+        session = self.db_service.get_session()
+        try:
+            stmt = insert(AthleteSyncState).values(
+                athlete_id=athlete_id, pending_activity_ids=activity_ids
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["athlete_id"],
+                set_={
+                    "pending_activity_ids": func.array_cat(
+                        AthleteSyncState.pending_activity_ids,
+                        stmt.excluded.pending_activity_ids,
+                    )
+                },
+            )
+            result = session.execute(stmt)
+            session.commit()
+            return result.rowcount
+        except Exception as e:
+            session.rollback()
+            self.logger.error("Error adding pending activities: %s", e, exc_info=True)
+            return 0
+        finally:
+            self.db_service.close_session()
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from dao.strava_activities import StravaActivitiesDao, decode_cursor, encode_cursor
+
+COLUMN = "strava_api.activities.distance_mi"
+ID_COLUMN = "strava_api.activities.activity_id"
+
+
+class FakeDatabaseService:
+    """
+    Stands in for the database: records the statements executed, and returns the given rows.
+    """
+
+    def __init__(self, rows: list[tuple] = None):
+        self.rows = rows or []
+        self.statements = []
+
+    def get_session(self):
+        return self
+
+    def close_session(self):
+        pass
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def compile_page_query(descending: bool, last_value) -> tuple[str, str, dict]:
+    """
+    Compiles the statement of the page after the given row, for Postgres.
+
+    :param descending: Whether the sort order is descending.
+    :param last_value: The previous page's last sort column value.
+
+    :return: The WHERE clause, the ORDER BY clause, and the bound parameters.
+    """
+    db_service = FakeDatabaseService()
+    StravaActivitiesDao(db_service=db_service).get_activities_page(
+        sort_by="distance_mi",
+        descending=descending,
+        columns=["name"],
+        cursor=encode_cursor("distance_mi", descending, last_value, 42),
+        page_size=10,
+    )
+    compiled = db_service.statements[0].compile(dialect=postgresql.dialect())
+    where, order_by = (
+        " ".join(str(compiled).split()).split(" WHERE ")[1].split(" ORDER BY ")
+    )
+    return where, order_by.split(" LIMIT ")[0], compiled.params
+
+
+@pytest.mark.parametrize(
+    "descending, last_value, where",
+    [
+        (
+            True,
+            None,
+            f"{COLUMN} IS NULL AND {ID_COLUMN} < %(activity_id_1)s OR {COLUMN} IS NOT NULL",
+        ),
+        (
+            True,
+            5.0,
+            f"({COLUMN}, {ID_COLUMN}) < (CAST(%(param_1)s AS FLOAT), %(param_2)s)",
+        ),
+        (False, None, f"{COLUMN} IS NULL AND {ID_COLUMN} > %(activity_id_1)s"),
+        (
+            False,
+            5.0,
+            f"({COLUMN}, {ID_COLUMN}) > (CAST(%(param_1)s AS FLOAT), %(param_2)s) "
+            f"OR {COLUMN} IS NULL",
+        ),
+    ],
+)
+def test_page_query_starts_after_the_cursor(descending, last_value, where):
+    compiled_where, order_by, params = compile_page_query(descending, last_value)
+
+    assert compiled_where == where
+    if descending:
+        assert order_by == f"{COLUMN} DESC NULLS FIRST, {ID_COLUMN} DESC"
+    else:
+        assert order_by == f"{COLUMN} ASC NULLS LAST, {ID_COLUMN} ASC"
+    assert 42 in params.values()
+    assert last_value is None or last_value in params.values()
+
+
+def test_next_cursor_points_at_the_last_row_returned():
+    # The rows hold the requested column, then the sort column and the ID
+    rows = [("Easy", 3.1, 3), ("Long", None, 2), ("Tempo", 5.0, 1)]
+    dao = StravaActivitiesDao(db_service=FakeDatabaseService(rows))
+
+    page, next_cursor = dao.get_activities_page(
+        sort_by="distance_mi", descending=False, columns=["name"], page_size=2
+    )
+
+    assert page == [("Easy",), ("Long",)]
+    assert decode_cursor(next_cursor, "distance_mi", False) == (None, 2)
+
+
+def test_last_page_has_no_next_cursor():
+    dao = StravaActivitiesDao(db_service=FakeDatabaseService([("Easy", 3.1, 3)]))
+
+    assert dao.get_activities_page(columns=["name"], page_size=2)[1] is None
+
+
+@pytest.mark.parametrize(
+    "sort_by, descending", [("distance_mi", False), ("full_datetime", True)]
+)
+def test_decode_cursor_rejects_another_sort_order(sort_by, descending):
+    cursor = encode_cursor("distance_mi", True, 5.0, 42)
+
+    with pytest.raises(ValueError, match="different sort order"):
+        decode_cursor(cursor, sort_by, descending)
+
+
+def test_decode_cursor_rejects_a_malformed_cursor():
+    with pytest.raises(ValueError, match="Malformed cursor"):
+        decode_cursor("not-a-cursor", "distance_mi", True)
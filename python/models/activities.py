@@ -1,33 +1,30 @@
 from pydantic import BaseModel
 from typing import Any
-from .athlete import Activity as DBActivity
 
 
 class DetailedActivities(BaseModel):
+    """
+    A page of activities, in columnar form (each key is sent once, not once per row).
+
+    :param headers: The column names.
+    :param rows: The activities' values, in the order of `headers`.
+    """
+
     headers: list[str]
-    activities: list[dict[str, Any]]
-
-    @classmethod
-    def model_validate(
-        cls, detailed_activities: list[DBActivity]
-    ) -> "DetailedActivities":
-        """
-        Validates the DetailedActivities model.
-
-        :param data: The data to validate.
-
-        :return: The validated DetailedActivities model.
-        """
-
-        headers = list(
-            {
-                key
-                for activity in detailed_activities
-                for key in activity.__dict__.keys()
-            }
-        )
-
-        return cls(
-            headers=headers,
-            activities=[activity.__dict__ for activity in detailed_activities],
-        )
+    rows: list[list[Any]]
+
+
+class ActivitiesPageMeta(BaseModel):
+    """
+    The metadata of a page of activities.
+
+    :param next_cursor: The cursor for the next page (None on the last page).
+    :param page_size: The most activities per page.
+    :param sort_by: The sort column.
+    :param descending: Whether the sort order is descending.
+    """
+
+    next_cursor: str | None
+    page_size: int
+    sort_by: str
+    descending: bool
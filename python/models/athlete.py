@@ -9,23 +9,94 @@ from sqlalchemy import (
     Text,
     ForeignKey,
     BigInteger,
+    Table,
+    Index,
 )
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 Base = declarative_base()
 
 
+def describe_column(column: Column) -> str:
+    """
+    Converts a column's metadata to an LLM-interpretable description line.
+
+    :param column: The table column.
+
+    :return: The column description (e.g., "- athlete_id (BIGINT, PK): Unique identifier...").
+    """
+    column_type = column.type.compile(dialect=postgresql.dialect()).replace(
+        " WITHOUT TIME ZONE", ""
+    )
+    attributes = [column_type]
+    if column.primary_key:
+        attributes.append("PK")
+    for foreign_key in column.foreign_keys:
+        attributes.append(f"FK -> {foreign_key.target_fullname}")
+    if column.unique:
+        attributes.append("UNIQUE")
+    if not column.primary_key:
+        attributes.append("NULL" if column.nullable else "NOT NULL")
+    return f"- {column.name} ({', '.join(attributes)}): {column.comment}"
+
+
+def describe_table(table: Table, column_names: list[str] | None = None) -> str:
+    """
+    Converts a table's metadata to an LLM-interpretable schema description.
+
+    :param table: The table.
+    :param column_names: The columns to describe (all of them, if not given).
+
+    :return: The schema description.
+    """
+    columns = [
+        column
+        for column in table.columns
+        if column_names is None or column.name in column_names
+    ]
+    notes = [f"- Primary Key: {', '.join(table.primary_key.columns.keys())}"]
+    for column in columns:
+        for foreign_key in column.foreign_keys:
+            notes.append(
+                f"- Foreign Key: {column.name} references {foreign_key.target_fullname}"
+            )
+    notes += table.info.get("notes", [])
+    for column in columns:
+        notes += column.info.get("notes", [])
+
+    column_lines = "\n".join(describe_column(column) for column in columns)
+    note_lines = "\n".join(notes)
+    return (
+        f"Table: {table.fullname}\n"
+        f"Description: {table.comment}\n\n"
+        f"Columns:\n{column_lines}\n\n"
+        f"Notes:\n{note_lines}"
+    )
+
+
 class Athlete(Base):
     """
     Represents a single Strava athlete corresponding to the 'athlete' database table.
     """
 
     __tablename__ = "athletes"
-    __table_args__ = {"schema": "strava_api"}  # Schema defined as `strava_api`
+    __table_args__ = {
+        "schema": "strava_api",  # Schema defined as `strava_api`
+        "comment": (
+            "This table stores information about Strava athletes, including their "
+            "identifiers, authentication tokens, and contact details."
+        ),
+    }
 
     # Primary key
-    athlete_id = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    athlete_id = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+        comment="Unique identifier for the athlete.",
+    )
 
     # The athlete's activities (mapped to the 'activity' table)
     activities: Mapped[list["Activity"]] = relationship(
@@ -33,9 +104,25 @@ class Athlete(Base):
     )
 
     # Athlete details
-    athlete_name = Column(String, nullable=False)
-    refresh_token = Column(String, nullable=False)
-    email = Column(String, unique=True, nullable=False)
+    athlete_name = Column(
+        String,
+        nullable=False,
+        comment="Name of the athlete.",
+        info={"keywords": ["name", "who", "athlete", "runner"], "always_include": True},
+    )
+    refresh_token = Column(
+        String,
+        nullable=False,
+        comment="OAuth refresh token for authentication.",
+        info={"keywords": ["token", "refresh", "oauth"]},
+    )
+    email = Column(
+        String,
+        unique=True,
+        nullable=False,
+        comment="Athlete's email address (must be unique).",
+        info={"keywords": ["email", "contact"]},
+    )
 
     def __repr__(self):
         return (
@@ -48,22 +135,7 @@ class Athlete(Base):
         Converts the Athlete SQLAlchemy model to an LLM-interpretable schema description.
         """
 
-        schema_description = f"""
-        Table: strava_api.athletes
-        Description: This table stores information about Strava athletes, including their identifiers, 
-        authentication tokens, and contact details.
-
-        Columns:
-        - athlete_id (BIGINT, PK): Unique identifier for the athlete.
-        - athlete_name (STRING, NOT NULL): Name of the athlete.
-        - refresh_token (STRING, NOT NULL): OAuth refresh token for authentication.
-        - email (STRING, UNIQUE, NOT NULL): Athlete's email address (must be unique).
-
-        Notes:
-        - Primary Key: athlete_id
-        """
-
-        return schema_description.strip()
+        return describe_table(self.__table__)
 
 
 class Activity(Base):
@@ -72,52 +144,269 @@ class Activity(Base):
     """
 
     __tablename__ = "activities"
-    __table_args__ = {"schema": "strava_api"}  # To use the `strava_api` schema
+    __table_args__ = (
+        # Keyset pagination of the "Database" page (see `get_activities_page`)
+        Index("ix_activities_full_datetime", "full_datetime", "activity_id"),
+        Index(
+            "ix_activities_athlete_full_datetime",
+            "athlete_id",
+            "full_datetime",
+            "activity_id",
+        ),
+        {
+            "schema": "strava_api",  # To use the `strava_api` schema
+            "comment": (
+                "This table stores Strava run activities, including metadata about the "
+                "activity, performance metrics, and engagement details."
+            ),
+        },
+    )
 
     # Primary and foreign keys
-    activity_id = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    activity_id = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+        comment="Unique identifier for the activity.",
+    )
     athlete_id = mapped_column(
-        BigInteger, ForeignKey("strava_api.athletes.athlete_id"), nullable=False
+        BigInteger,
+        ForeignKey("strava_api.athletes.athlete_id"),
+        nullable=False,
+        comment="Athlete associated with the activity.",
     )
     athlete: Mapped["Athlete"] = relationship("Athlete", back_populates="activities")
 
     # Activity metadata
-    name = Column(String, nullable=False)
-    moving_time = Column(Time, nullable=False)  # HH:MM:SS
-    moving_time_s = Column(Integer, nullable=False)  # Moving time in seconds
-    distance_mi = Column(Float, nullable=False)
-    pace_min_mi = Column(Time, nullable=True)  # HH:MM:SS
-    avg_speed_ft_s = Column(Float(precision=2), nullable=False)  # Average speed in ft/s
+    name = Column(
+        String,
+        nullable=False,
+        comment="Name of the activity.",
+        info={"keywords": ["name", "title", "called"]},
+    )
+    moving_time = Column(
+        Time,
+        nullable=False,
+        comment="Time spent moving (HH:MM:SS).",
+        info={"keywords": ["time", "duration", "hour", "minute", "long", "longest"]},
+    )  # HH:MM:SS
+    moving_time_s = Column(
+        Integer,
+        nullable=False,
+        comment="Moving time in seconds.",
+        info={"keywords": ["time", "duration", "hour", "minute", "second", "total"]},
+    )  # Moving time in seconds
+    distance_mi = Column(
+        Float,
+        nullable=False,
+        comment="Distance covered in miles.",
+        info={
+            "keywords": [
+                "distance",
+                "mile",
+                "mileage",
+                "far",
+                "long",
+                "longest",
+                "shortest",
+                "total",
+                "km",
+                "kilometer",
+                "marathon",
+            ]
+        },
+    )
+    pace_min_mi = Column(
+        Time,
+        nullable=True,
+        comment="Average pace in minutes per mile.",
+        info={"keywords": ["pace", "fast", "fastest", "slow", "slowest", "quick"]},
+    )  # HH:MM:SS
+    avg_speed_ft_s = Column(
+        Float(precision=2),
+        nullable=False,
+        comment="Average speed in feet per second.",
+        info={"keywords": ["speed", "fast", "fastest", "slow", "slowest"]},
+    )  # Average speed in ft/s
 
     # Date and time fields
-    full_datetime = Column(DateTime, nullable=True)  # MM/DD/YY HH:MM:SS
-    time = Column(Time, nullable=False)  # HH:MM:SS
-    week_day = Column(String, nullable=False)  # MON-SUN
-    month = Column(Integer, nullable=False)  # 1-12
-    day = Column(Integer, nullable=False)  # 1-31
-    year = Column(Integer, nullable=False)  # e.g. 2024
+    full_datetime = Column(
+        DateTime,
+        nullable=True,
+        comment="Full timestamp of the activity.",
+        info={"always_include": True},
+    )  # MM/DD/YY HH:MM:SS
+    time = Column(
+        Time,
+        nullable=False,
+        comment="Time of day when the activity took place.",
+        info={
+            "keywords": [
+                "morning",
+                "afternoon",
+                "evening",
+                "night",
+                "clock",
+                "am",
+                "pm",
+            ]
+        },
+    )  # HH:MM:SS
+    week_day = Column(
+        String,
+        nullable=False,
+        comment="Day of the week (e.g., MON-SUN).",
+        info={
+            "keywords": [
+                "weekday",
+                "weekend",
+                "monday",
+                "tuesday",
+                "wednesday",
+                "thursday",
+                "friday",
+                "saturday",
+                "sunday",
+            ]
+        },
+    )  # MON-SUN
+    month = Column(
+        Integer,
+        nullable=False,
+        comment="Month of the year (1-12).",
+        info={"keywords": ["month", "monthly"]},
+    )  # 1-12
+    day = Column(
+        Integer,
+        nullable=False,
+        comment="Day of the month (1-31).",
+        info={"keywords": ["day", "daily"]},
+    )  # 1-31
+    year = Column(
+        Integer,
+        nullable=False,
+        comment="Year of the activity (e.g., 2024).",
+        info={"keywords": ["year", "yearly", "annual"]},
+    )  # e.g. 2024
 
     # Additional activity metrics
-    spm_avg = Column(Float, nullable=True)
-    hr_avg = Column(Float, nullable=True)
-    wkt_type = Column(Integer, nullable=True)
-    description = Column(Text, nullable=True)
-    total_elev_gain_ft = Column(Float, nullable=True)
-    manual = Column(Boolean, nullable=False)
-    max_speed_ft_s = Column(Float, nullable=True)
-    calories = Column(Float, nullable=True)
+    spm_avg = Column(
+        Float,
+        nullable=True,
+        comment="Average steps per minute.",
+        info={"keywords": ["cadence", "step", "spm", "stride"]},
+    )
+    hr_avg = Column(
+        Float,
+        nullable=True,
+        comment="Average heart rate during the activity.",
+        info={"keywords": ["heart", "hr", "bpm", "pulse"]},
+    )
+    wkt_type = Column(
+        Integer,
+        nullable=True,
+        comment="The run type classification (0 = default, 1 = race, 2 = long run, 3 = workout).",
+        info={
+            "notes": [
+                "- The 'wkt_type' column, regardless of the value, represents a run of some form.",
+                "    - If a user asks for a specific type of run, consider filtering by this column in the SQL generation. Otherwise, ignore it.",
+            ],
+            "keywords": [
+                "race",
+                "workout",
+                "long",
+                "type",
+                "kind",
+                "tempo",
+                "interval",
+                "easy",
+            ],
+        },
+    )
+    description = Column(
+        Text,
+        nullable=True,
+        comment="Additional notes or description of the activity.",
+        info={"keywords": ["description", "note", "wrote", "mention", "say", "said"]},
+    )
+    total_elev_gain_ft = Column(
+        Float,
+        nullable=True,
+        comment="Total elevation gain in feet.",
+        info={
+            "keywords": ["elevation", "climb", "hill", "hilly", "vert", "gain", "feet"]
+        },
+    )
+    manual = Column(
+        Boolean,
+        nullable=False,
+        comment="Whether the activity was manually logged.",
+        info={"keywords": ["manual", "manually", "logged"]},
+    )
+    max_speed_ft_s = Column(
+        Float,
+        nullable=True,
+        comment="Maximum speed in feet per second.",
+        info={"keywords": ["max", "maximum", "top", "speed", "sprint"]},
+    )
+    calories = Column(
+        Float,
+        nullable=True,
+        comment="Calories burned during the activity.",
+        info={"keywords": ["calorie", "burn", "burned", "energy"]},
+    )
 
     # Engagement metrics
-    achievement_count = Column(Integer, nullable=True)
-    kudos_count = Column(Integer, nullable=True)
-    comment_count = Column(Integer, nullable=True)
-    athlete_count = Column(Integer, nullable=True)
+    achievement_count = Column(
+        Integer,
+        nullable=True,
+        comment="Number of achievements earned.",
+        info={"keywords": ["achievement", "pr", "record", "trophy"]},
+    )
+    kudos_count = Column(
+        Integer,
+        nullable=True,
+        comment="Number of kudos received.",
+        info={"keywords": ["kudo", "kudos", "like", "popular"]},
+    )
+    comment_count = Column(
+        Integer,
+        nullable=True,
+        comment="Number of comments received.",
+        info={"keywords": ["comment"]},
+    )
+    athlete_count = Column(
+        Integer,
+        nullable=True,
+        comment="Number of athletes involved in the activity.",
+        info={"keywords": ["group", "partner", "together", "company", "alone", "solo"]},
+    )
 
     # User ratings and performance
-    rpe = Column(Integer, nullable=True)  # 1-10
-    rating = Column(Integer, nullable=True)  # 1-10
-    avg_power = Column(Integer, nullable=True)  # e.g., 305
-    sleep_rating = Column(Integer, nullable=True)  # 1-10
+    rpe = Column(
+        Integer,
+        nullable=True,
+        comment="Rate of perceived exertion (1-10).",
+        info={"keywords": ["rpe", "effort", "exertion", "hard", "hardest", "easy"]},
+    )  # 1-10
+    rating = Column(
+        Integer,
+        nullable=True,
+        comment="User rating of the activity (1-10).",
+        info={"keywords": ["rating", "rated", "best", "worst", "enjoy"]},
+    )  # 1-10
+    avg_power = Column(
+        Integer,
+        nullable=True,
+        comment="Average power output in watts.",
+        info={"keywords": ["power", "watt"]},
+    )  # e.g., 305
+    sleep_rating = Column(
+        Integer,
+        nullable=True,
+        comment="Sleep rating on the day of activity (1-10).",
+        info={"keywords": ["sleep", "rest", "rested", "tired"]},
+    )  # 1-10
 
     def __repr__(self):
         return (
@@ -168,48 +457,4 @@ class Activity(Base):
         Converts the Activity SQLAlchemy model to an LLM-interpretable schema description.
         """
 
-        schema_description = f"""
-        Table: strava_api.activities
-        Description: This table stores Strava run activities, including metadata about the activity, 
-        performance metrics, and engagement details.
-
-        Columns:
-        - activity_id (BIGINT, PK): Unique identifier for the activity.
-        - athlete_id (BIGINT, FK -> strava_api.athletes.athlete_id, NOT NULL): Athlete associated with the activity.
-        - name (STRING, NOT NULL): Name of the activity.
-        - moving_time (TIME, NOT NULL): Time spent moving (HH:MM:SS).
-        - moving_time_s (INTEGER, NOT NULL): Moving time in seconds.
-        - distance_mi (FLOAT, NOT NULL): Distance covered in miles.
-        - pace_min_mi (TIME, NULL): Average pace in minutes per mile.
-        - avg_speed_ft_s (FLOAT(2), NOT NULL): Average speed in feet per second.
-        - full_datetime (DATETIME, NULL): Full timestamp of the activity.
-        - time (TIME, NOT NULL): Time of day when the activity took place.
-        - week_day (STRING, NOT NULL): Day of the week (e.g., MON-SUN).
-        - month (INTEGER, NOT NULL): Month of the year (1-12).
-        - day (INTEGER, NOT NULL): Day of the month (1-31).
-        - year (INTEGER, NOT NULL): Year of the activity (e.g., 2024).
-        - spm_avg (FLOAT, NULL): Average steps per minute.
-        - hr_avg (FLOAT, NULL): Average heart rate during the activity.
-        - wkt_type (INTEGER, NULL): The run type classification (0 = default, 1 = race, 2 = long run, 3 = workout).
-        - description (TEXT, NULL): Additional notes or description of the activity.
-        - total_elev_gain_ft (FLOAT, NULL): Total elevation gain in feet.
-        - manual (BOOLEAN, NOT NULL): Whether the activity was manually logged.
-        - max_speed_ft_s (FLOAT, NULL): Maximum speed in feet per second.
-        - calories (FLOAT, NULL): Calories burned during the activity.
-        - achievement_count (INTEGER, NULL): Number of achievements earned.
-        - kudos_count (INTEGER, NULL): Number of kudos received.
-        - comment_count (INTEGER, NULL): Number of comments received.
-        - athlete_count (INTEGER, NULL): Number of athletes involved in the activity.
-        - rpe (INTEGER, NULL): Rate of perceived exertion (1-10).
-        - rating (INTEGER, NULL): User rating of the activity (1-10).
-        - avg_power (INTEGER, NULL): Average power output in watts.
-        - sleep_rating (INTEGER, NULL): Sleep rating on the day of activity (1-10).
-        
-        Notes: 
-        - Primary Key: activity_id
-        - Foreign Key: athlete_id references strava_api.athletes.athlete_id
-        - The 'wkt_type' column, regardless of the value, represents a run of some form.
-            - If a user asks for a specific type of run, consider filtering by this column in the SQL generation. Otherwise, ignore it.
-        """
-
-        return schema_description.strip()
+        return describe_table(self.__table__)
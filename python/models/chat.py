@@ -43,9 +43,19 @@ class ChatRequestMeta(BaseModel):
     A model representing a chat request's metadata.
 
     :param completion_id: The conversation's completion ID (if an existing chat).
+    :param synthesize: Whether to have the LLM write the answer (rather than a local rendering).
+    :param include_metrics: Whether to include the pipeline's timings and token usage in the response.
     """
 
     completion_id: Annotated[int, "The user conversation's completion ID."] = None
+    synthesize: Annotated[
+        bool,
+        "Whether to have the LLM write the answer (rather than a local rendering).",
+    ] = False
+    include_metrics: Annotated[
+        bool,
+        "Whether to include the pipeline's timings and token usage in the response.",
+    ] = False
 
 
 class ChatResponse(BaseModel):
@@ -58,15 +68,42 @@ class ChatResponse(BaseModel):
     response: Annotated[OpenAIMessage, "The AI response to a user question."]
 
 
+class PipelineMetrics(BaseModel):
+    """
+    A model representing a TAG pipeline run's timings and token usage.
+
+    :param timings: The seconds spent per stage (summed across attempts).
+    :param tokens: The LLM tokens used per call (generation, repair, synthesis) and kind.
+    :param attempts: The number of queries generated (or reused from the cache).
+    :param repairs: The number of repair attempts.
+    :param rows: The number of rows the executed query returned.
+    :param total: The seconds the pipeline took.
+    """
+
+    timings: Annotated[dict[str, float], "The seconds spent per stage."] = {}
+    tokens: Annotated[
+        dict[str, dict[str, int]], "The LLM tokens used per call and kind."
+    ] = {}
+    attempts: Annotated[int, "The number of queries generated."] = 0
+    repairs: Annotated[int, "The number of repair attempts."] = 0
+    rows: Annotated[int, "The number of rows the executed query returned."] = None
+    total: Annotated[float, "The seconds the pipeline took."] = 0.0
+
+
 class ChatResponseMeta(BaseModel):
     """
     A model representing the metadata for a chat response.
 
     :param completion_id: The completion ID.
+    :param executed_query: The query that was executed.
+    :param metrics: The pipeline's timings and token usage (if requested).
     """
 
     completion_id: Annotated[str, "The completion ID of the user-bot exchange."] = None
     executed_query: Annotated[str, "The query that was executed."] = None
+    metrics: Annotated[
+        PipelineMetrics, "The pipeline's timings and token usage (if requested)."
+    ] = None
 
 
 class GeneratedQueryOutput(BaseModel):
@@ -76,3 +113,65 @@ class GeneratedQueryOutput(BaseModel):
         str,
         "Follow-up questions to ask the user--in the case of a LOW confidence level--to gain clarity on the request.",
     ] = None
+
+
+class RepairedQueryOutput(BaseModel):
+    query: Annotated[str, "The corrected SQL query."]
+
+
+class CacheStats(BaseModel):
+    """
+    A model representing a cache's counters.
+
+    :param hits: The number of hits.
+    :param similar_hits: The number of similar-question hits (generated-query cache only).
+    :param misses: The number of misses.
+    :param stale: The number of entries found stale and evicted (result cache only).
+    :param size: The number of cached entries.
+    :param hit_rate: The share of lookups that were hits.
+    """
+
+    hits: Annotated[int, "The number of hits."] = 0
+    similar_hits: Annotated[int, "The number of similar-question hits."] = 0
+    misses: Annotated[int, "The number of misses."] = 0
+    stale: Annotated[int, "The number of entries found stale and evicted."] = 0
+    size: Annotated[int, "The number of cached entries."] = 0
+    hit_rate: Annotated[float, "The share of lookups that were hits."] = 0.0
+
+
+class ChatCacheStats(BaseModel):
+    """
+    A model representing the chat pipeline's cache statistics.
+
+    :param query_cache: The generated-query cache's counters.
+    :param result_cache: The query-result cache's counters.
+    """
+
+    query_cache: Annotated[CacheStats, "The generated-query cache's counters."]
+    result_cache: Annotated[CacheStats, "The query-result cache's counters."]
+
+
+class RepairStats(BaseModel):
+    """
+    A model representing the TAG pipeline's SQL repair statistics.
+
+    :param pipelines: The number of pipelines that produced a query.
+    :param first_try: The number of pipelines whose first query succeeded.
+    :param repaired: The number of pipelines that succeeded after repairing their query.
+    :param exhausted: The number of pipelines that used up their repair budget.
+    :param repair_attempts: The total number of repair attempts.
+    :param repairs_used: The number of pipelines by the number of repairs they used.
+    """
+
+    pipelines: Annotated[int, "The number of pipelines that produced a query."] = 0
+    first_try: Annotated[
+        int, "The number of pipelines whose first query succeeded."
+    ] = 0
+    repaired: Annotated[
+        int, "The number of pipelines that succeeded after a repair."
+    ] = 0
+    exhausted: Annotated[int, "The number of pipelines that used up their budget."] = 0
+    repair_attempts: Annotated[int, "The total number of repair attempts."] = 0
+    repairs_used: Annotated[
+        dict[str, int], "The number of pipelines by the number of repairs they used."
+    ] = {}
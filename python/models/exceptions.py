@@ -19,3 +19,9 @@ class QueryExecutionException(BaseHTTPException):
 
     message: str = "An error occurred while executing the query."
     status_code: int = 500
+
+
+class QueryValidationException(BaseHTTPException):
+
+    message: str = "The generated query failed validation."
+    status_code: int = 500
@@ -0,0 +1,62 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import mapped_column
+
+# Bookkeeping tables live on their own metadata, so they're never described to (or queryable
+# by) the TAG pipeline, which reads every table of `models.athlete.Base`
+SyncBase = declarative_base()
+
+
+class AthleteSyncState(SyncBase):
+    """
+    Represents an athlete's activity sync progress, corresponding to the 'athlete_sync_state'
+    database table.
+    """
+
+    __tablename__ = "athlete_sync_state"
+    __table_args__ = {
+        "schema": "strava_api",  # To use the `strava_api` schema
+        "comment": (
+            "This table stores each athlete's activity sync watermark and the activities "
+            "still to be fetched, so a sync resumes where the last one stopped."
+        ),
+    }
+
+    # Primary key (references strava_api.athletes.athlete_id, on another metadata)
+    athlete_id = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+        comment="The athlete whose sync this is.",
+    )
+
+    # Sync progress
+    last_activity_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="Start time of the newest activity listed by a sync (the watermark).",
+    )
+    pending_activity_ids = Column(
+        postgresql.ARRAY(BigInteger),
+        nullable=False,
+        default=list,
+        comment="Activities listed, but not yet fetched and stored (e.g., due to the rate limit).",
+    )
+    last_synced_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="When the last sync finished.",
+    )
+    last_status = Column(
+        String,
+        nullable=True,
+        comment="The last sync's outcome (complete, partial, or failed).",
+    )
+
+    def __repr__(self):
+        return (
+            f"<AthleteSyncState(athlete_id={self.athlete_id}, "
+            f"last_activity_at={self.last_activity_at}, "
+            f"pending_activity_ids={len(self.pending_activity_ids or [])})>"
+        )
@@ -0,0 +1,56 @@
+from pydantic import BaseModel, Field
+from typing import Any, Literal
+
+
+class StravaWebhookEvent(BaseModel):
+    """
+    A Strava push-subscription event (an activity created, updated, or deleted, or an athlete
+    deauthorizing the app).
+
+    :param object_type: The kind of object the event is about ("activity" or "athlete").
+    :param object_id: The activity's (or athlete's) ID.
+    :param aspect_type: What happened ("create", "update", or "delete").
+    :param owner_id: The athlete's ID.
+    :param subscription_id: The push subscription's ID.
+    :param event_time: When the event happened (epoch seconds).
+    :param updates: The changed fields, for updates (e.g., {"title": "Morning Run"}).
+    """
+
+    object_type: Literal["activity", "athlete"]
+    object_id: int
+    aspect_type: Literal["create", "update", "delete"]
+    owner_id: int
+    subscription_id: int
+    event_time: int
+    updates: dict[str, Any] = Field(default_factory=dict)
+
+
+class StravaWebhookChallenge(BaseModel):
+    """
+    The response to Strava's subscription validation request (echoing its challenge).
+
+    :param hub_challenge: The challenge to echo.
+    """
+
+    hub_challenge: str = Field(alias="hub.challenge")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class WebhookQueueStats(BaseModel):
+    """
+    The webhook queue's counters.
+
+    :param queued: Activities waiting to be processed.
+    :param in_progress: Activities being processed.
+    :param received: Events received.
+    :param coalesced: Events merged into an activity's already-queued work.
+    :param processed: Activities processed (by action).
+    """
+
+    queued: int
+    in_progress: int
+    received: int
+    coalesced: int
+    processed: dict[str, int]
@@ -0,0 +1,31 @@
+repair_prompt = """
+### Instructions:
+You are an expert PostgreSQL assistant. The SQL query below was written to answer the user's request,
+but it failed. Fix **only** what the error points to and keep the rest of the query as-is.
+
+---
+
+### **User's Request:**
+"{user_question}"
+
+---
+
+### **Failing Query:**
+{query}
+
+---
+
+### **Error:**
+{error}
+
+---
+
+### **Relevant Schema:**
+{schema_description}
+
+---
+
+### **Output Format:**
+Respond with a **valid JSON object** containing the following attribute:
+- "query": "The corrected SQL query"
+"""
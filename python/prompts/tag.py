@@ -17,6 +17,14 @@ Do not assume missing details—**only use the information explicitly provided**
 
 ---
 
+### **Similar Past Requests:**
+These requests were previously answered correctly with the SQL shown. Reuse their patterns where they apply,
+but always tailor the query to the user's most recent request.
+
+{examples}
+
+---
+
 ### **User's Most Recent Request:**
 "{user_question}"
 
@@ -64,3 +72,25 @@ Respond with a **valid JSON object** containing the following attributes:
 - "confidence": "LOW | MEDIUM | HIGH",
 - "follow_ups": "Clarifying question (only if confidence is LOW)"
 """
+
+answer_prompt = """
+The user previously asked a question, and a SQL query was executed to retrieve relevant data.
+The query result is:
+
+{query_result}
+{truncation_note}
+Your task is to **write a natural language answer** to the user.
+Do **NOT** generate another SQL query. Simply provide a clear, well-written summary response.
+
+Additionally, if there are multiple data records, display such with a Markdown-formatted table.
+"""
+
+truncation_note = """
+NOTE: The result was truncated to its first {num_rows} rows. Tell the user that only these rows are
+shown, and suggest narrowing the question (e.g., a date range or a summary) if they need the rest.
+"""
+
+example_template = """Request: "{question}"
+SQL:
+{query}
+"""
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Request
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
-from typing import Any
+from typing import Any, Literal
 from models.base import Empty, APIRequestPayload
-from models.activities import DetailedActivities
+from models.activities import ActivitiesPageMeta, DetailedActivities
+from models.athlete import Activity
 from dao.strava_activities import StravaActivitiesDao
+from services.activity_export import (
+    ARROW_MEDIA_TYPE,
+    EXPORT_FORMATS,
+    encode_arrow,
+    pyarrow,
+)
 from utils.simple_logger import SimpleLogger
 
 activities_dao = StravaActivitiesDao()
@@ -12,6 +21,53 @@ logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
 activities_router = APIRouter()
 
 
+def parse_filters(filters: list[str]) -> dict[str, str]:
+    """
+    Parses `column:text` filter parameters.
+
+    :param filters: The filter parameters.
+
+    :return: Column -> text to look for in it.
+    """
+    column_filters = {}
+    for column_filter in filters:
+        name, separator, value = column_filter.partition(":")
+        if not separator:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid filter [{column_filter}], expected `column:text`.",
+            )
+        column_filters[name.strip()] = value
+    return column_filters
+
+
+def check_format(format: str) -> None:
+    """
+    Checks that a response format can be produced (Arrow needs the optional pyarrow).
+
+    :param format: The response format.
+
+    :return: None
+    """
+    if format == "arrow" and pyarrow is None:
+        raise HTTPException(
+            status_code=406, detail="Arrow output isn't available (pyarrow is missing)."
+        )
+
+
+def parse_columns(columns: str | None) -> list[str] | None:
+    """
+    Parses a comma-separated column list parameter.
+
+    :param columns: The parameter.
+
+    :return: The column names (None if not given).
+    """
+    if not columns:
+        return None
+    return [name.strip() for name in columns.split(",") if name.strip()] or None
+
+
 class ActivitiesAPI:
     """
     Handles all activities API requests.
@@ -28,22 +84,158 @@ class ActivitiesAPI:
 
     @activities_router.get(
         "/activities/detailed-stats",
-        summary="Acquires a list of all activities from the database.",
-        description="Acquires a a list of all activities from the strava_api.activities database table.",
+        summary="Acquires a page of activities from the database.",
+        description=(
+            "Acquires a page of activities from the strava_api.activities database table, "
+            "filtered, sorted and projected by the database, as columns and rows. Pass the "
+            "response's `meta.next_cursor` as `cursor` to get the next page. With "
+            "`format=arrow`, the page is an Arrow IPC stream instead, and the next cursor "
+            "comes in the `X-Next-Cursor` header."
+        ),
         status_code=200,
-        response_model=APIRequestPayload[DetailedActivities, Empty],
+        response_model=APIRequestPayload[DetailedActivities, ActivitiesPageMeta],
+        response_class=ORJSONResponse,
     )
     async def get_detailed_activities(
         request: Request,
-    ) -> APIRequestPayload[DetailedActivities, Empty]:
+        athlete_id: int | None = Query(
+            default=None, description="Only this athlete's activities."
+        ),
+        start_date: date | None = Query(
+            default=None, description="Only activities on or after this date."
+        ),
+        end_date: date | None = Query(
+            default=None, description="Only activities on or before this date."
+        ),
+        filters: list[str] = Query(
+            default=[],
+            alias="filter",
+            description=(
+                "Column filters as `column:text` (case-insensitive substring match), "
+                "e.g., `filter=description:tempo`. Repeat for several columns."
+            ),
+        ),
+        sort_by: str = Query(default="full_datetime", description="The sort column."),
+        descending: bool = Query(
+            default=True, description="Whether to sort in descending order."
+        ),
+        columns: str | None = Query(
+            default=None,
+            description="Comma-separated columns to return (all of them, if not given).",
+        ),
+        cursor: str | None = Query(
+            default=None, description="The previous page's `meta.next_cursor`."
+        ),
+        page_size: int = Query(
+            default=100, ge=1, le=1000, description="The most activities to return."
+        ),
+        format: Literal["json", "arrow"] = Query(
+            default="json", description="The response format."
+        ),
+    ) -> Response:
         """
-        Retrieves detailed statistics for all activities for the authenticated athlete.
+        Retrieves a page of detailed statistics for the athletes' activities.
         """
         logger.info("Getting detailed activities for the 'Database' page.")
 
-        response = activities_dao.get_detailed_activities()
+        check_format(format)
+        column_filters = parse_filters(filters)
+        column_names = parse_columns(columns) or list(Activity.__table__.columns.keys())
+
+        try:
+            activities, next_cursor = activities_dao.get_activities_page(
+                athlete_id=athlete_id,
+                start_date=start_date,
+                end_date=end_date,
+                filters=column_filters,
+                sort_by=sort_by,
+                descending=descending,
+                columns=column_names,
+                cursor=cursor,
+                page_size=page_size,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if format == "arrow":
+            return Response(
+                content=b"".join(encode_arrow(column_names, [activities])),
+                media_type=ARROW_MEDIA_TYPE,
+                headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+            )
+        # The rows are plain tuples, so they go straight to orjson (no model validation)
+        return ORJSONResponse(
+            {
+                "data": {"headers": column_names, "rows": activities},
+                "meta": ActivitiesPageMeta(
+                    next_cursor=next_cursor,
+                    page_size=page_size,
+                    sort_by=sort_by,
+                    descending=descending,
+                ).dict(),
+            }
+        )
+
+    @activities_router.get(
+        "/activities/export",
+        summary="Exports activities from the database.",
+        description=(
+            "Streams the activities of the strava_api.activities database table (oldest "
+            "first) as NDJSON, CSV, or an Arrow IPC stream, with the same filters as "
+            "`/activities/detailed-stats`. "
+            "Rows are fetched and encoded a chunk at a time, so exports of any size use "
+            "constant memory."
+        ),
+        status_code=200,
+        response_class=StreamingResponse,
+    )
+    async def export_activities(
+        athlete_id: int | None = Query(
+            default=None, description="Only this athlete's activities."
+        ),
+        start_date: date | None = Query(
+            default=None, description="Only activities on or after this date."
+        ),
+        end_date: date | None = Query(
+            default=None, description="Only activities on or before this date."
+        ),
+        filters: list[str] = Query(
+            default=[],
+            alias="filter",
+            description="Column filters as `column:text` (see `/activities/detailed-stats`).",
+        ),
+        columns: str | None = Query(
+            default=None,
+            description="Comma-separated columns to export (all of them, if not given).",
+        ),
+        format: Literal["ndjson", "csv", "arrow"] = Query(
+            default="ndjson", description="The export format."
+        ),
+    ) -> StreamingResponse:
+        """
+        Streams an export of the activities.
+        """
+        logger.info(f"Exporting activities as {format}.")
+        check_format(format)
+
+        column_names = parse_columns(columns) or list(Activity.__table__.columns.keys())
+        try:
+            chunks = activities_dao.stream_activities(
+                athlete_id=athlete_id,
+                start_date=start_date,
+                end_date=end_date,
+                filters=parse_filters(filters),
+                columns=column_names,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        return APIRequestPayload(
-            data=DetailedActivities.model_validate(detailed_activities=response),
-            meta=Empty(),
+        encode, media_type, extension = EXPORT_FORMATS[format]
+        # A sync iterator: Starlette pulls each chunk in its threadpool
+        return StreamingResponse(
+            encode(column_names, chunks),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="activities.{extension}"'
+            },
         )
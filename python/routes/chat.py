@@ -1,7 +1,18 @@
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from json import dumps
+from typing import Any, AsyncIterator
 
 from models.base import APIRequestPayload, APIResponsePayload, Empty
-from models.chat import ChatRequest, ChatRequestMeta, ChatResponse, ChatResponseMeta
+from models.chat import (
+    CacheStats,
+    ChatCacheStats,
+    ChatRequest,
+    ChatRequestMeta,
+    ChatResponse,
+    ChatResponseMeta,
+    RepairStats,
+)
 from services.chat import ChatService
 from utils.simple_logger import SimpleLogger
 
@@ -11,6 +22,18 @@ logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
 chat_router = APIRouter()
 
 
+def format_sse_event(event: str, data: dict[str, Any]) -> str:
+    """
+    Formats an event as a server-sent event (SSE) message.
+
+    :param event: The event name.
+    :param data: The event data (JSON-serializable).
+
+    :return: The SSE-formatted message.
+    """
+    return f"event: {event}\ndata: {dumps(data, default=str)}\n\n"
+
+
 class ChatAPI:
     """
     Handles all chat API requests.
@@ -39,9 +62,103 @@ class ChatAPI:
         )
         messages: list[dict[str, str]] = request.data.messages_to_dict()
         user_question: dict[str, str] = messages[len(messages) - 1]
-        response_payload = chat_service.process(
-            user_question=user_question, messages=messages
+        response_payload = await chat_service.process(
+            user_question=user_question,
+            messages=messages,
+            synthesize=getattr(request.meta, "synthesize", False),
+            include_metrics=getattr(request.meta, "include_metrics", False),
         )
         logger.info(f"Chat message processed.")
 
         return response_payload
+
+    @chat_router.post(
+        "/chat/stream",
+        summary="Process chat message with a streamed response.",
+        description=(
+            "Process a chat message and stream the response as server-sent events: "
+            "a 'query' event with the executed SQL and row count, 'token' events with "
+            "the answer as it's generated, and a final 'done' (or 'error') event."
+        ),
+        status_code=200,
+        response_class=StreamingResponse,
+    )
+    async def stream_chat_message(
+        request: APIRequestPayload[ChatRequest, ChatRequestMeta],
+    ) -> StreamingResponse:
+        """
+        Processes the most recent chat message and streams the response.
+
+        :param request: The request object.
+
+        :return The streaming response.
+        """
+
+        logger.info(
+            f"Streaming a response to the most recent message from these messages: {request.data.messages}"
+        )
+        messages: list[dict[str, str]] = request.data.messages_to_dict()
+        user_question: dict[str, str] = messages[len(messages) - 1]
+
+        async def event_stream() -> AsyncIterator[str]:
+            try:
+                async for event, data in chat_service.stream(
+                    user_question=user_question,
+                    messages=messages,
+                    synthesize=getattr(request.meta, "synthesize", False),
+                    include_metrics=getattr(request.meta, "include_metrics", False),
+                ):
+                    yield format_sse_event(event=event, data=data)
+                logger.info(f"Chat message streamed.")
+            except Exception as e:
+                # The response has already started, so surface the failure as an event
+                logger.error(f"Failed to stream the chat message: {e}")
+                yield format_sse_event(
+                    event="error", data={"message": "Failed to process the message."}
+                )
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @chat_router.get(
+        "/chat/cache-stats",
+        summary="Acquires the chat pipeline's cache statistics.",
+        description="Acquires the hit/miss counters of the generated-query and query-result caches.",
+        status_code=200,
+        response_model=APIResponsePayload[ChatCacheStats, Empty],
+    )
+    async def get_cache_stats() -> APIResponsePayload[ChatCacheStats, Empty]:
+        """
+        Retrieves the chat pipeline's cache statistics.
+
+        :return The response payload.
+        """
+        retriever = chat_service.retriever
+        return APIResponsePayload(
+            data=ChatCacheStats(
+                query_cache=CacheStats(**retriever.query_cache.stats()),
+                result_cache=CacheStats(**retriever.result_cache.stats()),
+            ),
+            meta=Empty(),
+        )
+
+    @chat_router.get(
+        "/chat/repair-stats",
+        summary="Acquires the chat pipeline's SQL repair statistics.",
+        description="Acquires the counters of how many repair attempts generated queries needed.",
+        status_code=200,
+        response_model=APIResponsePayload[RepairStats, Empty],
+    )
+    async def get_repair_stats() -> APIResponsePayload[RepairStats, Empty]:
+        """
+        Retrieves the chat pipeline's SQL repair statistics.
+
+        :return The response payload.
+        """
+        return APIResponsePayload(
+            data=RepairStats(**chat_service.retriever.repairer.stats()),
+            meta=Empty(),
+        )
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+from os import getenv
+
+from models.base import APIResponsePayload, Empty
+from models.webhooks import (
+    StravaWebhookChallenge,
+    StravaWebhookEvent,
+    WebhookQueueStats,
+)
+from services.webhooks import StravaWebhookProcessor
+from utils.simple_logger import SimpleLogger
+
+# Started (and stopped) with the app, see `app.py`
+webhook_processor = StravaWebhookProcessor()
+logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+webhooks_router = APIRouter()
+
+
+class StravaWebhookAPI:
+    """
+    Handles Strava's push subscription: the callback URL's validation handshake and the events.
+    """
+
+    @webhooks_router.get(
+        "/strava/webhook",
+        summary="Validates the Strava push subscription.",
+        description="Echoes Strava's challenge when the subscription's verify token matches.",
+        status_code=200,
+        response_model=StravaWebhookChallenge,
+    )
+    async def validate_subscription(
+        mode: str = Query(alias="hub.mode"),
+        challenge: str = Query(alias="hub.challenge"),
+        verify_token: str = Query(alias="hub.verify_token"),
+    ) -> JSONResponse:
+        """
+        Completes Strava's subscription validation handshake.
+
+        :param mode: The request's mode (always "subscribe").
+        :param challenge: The challenge to echo.
+        :param verify_token: The verify token given when creating the subscription.
+
+        :return The challenge.
+        """
+        if mode != "subscribe" or verify_token != getenv("STRAVA_WEBHOOK_VERIFY_TOKEN"):
+            logger.warning("Rejected a Strava subscription validation request.")
+            raise HTTPException(status_code=403, detail="Invalid verify token.")
+        return JSONResponse(
+            StravaWebhookChallenge(hub_challenge=challenge).dict(by_alias=True)
+        )
+
+    @webhooks_router.post(
+        "/strava/webhook",
+        summary="Receives a Strava push event.",
+        description=(
+            "Queues the work for an activity created, updated, or deleted (or an athlete "
+            "deauthorizing the app), and acknowledges the event right away. Events for any "
+            "subscription other than STRAVA_WEBHOOK_SUBSCRIPTION_ID are rejected."
+        ),
+        status_code=200,
+        response_model=Empty,
+    )
+    async def receive_event(event: StravaWebhookEvent) -> Empty:
+        """
+        Queues a Strava push event's work.
+
+        :param event: The event.
+
+        :return An empty response.
+        """
+        # Events change runs without any API call, so only our subscription's are accepted
+        subscription_id = getenv("STRAVA_WEBHOOK_SUBSCRIPTION_ID")
+        if not subscription_id or str(event.subscription_id) != subscription_id:
+            logger.warning(
+                f"Rejected an event for unknown subscription [{event.subscription_id}]."
+            )
+            raise HTTPException(status_code=403, detail="Unknown subscription.")
+        webhook_processor.receive(event)
+        return Empty()
+
+    @webhooks_router.get(
+        "/strava/webhook/stats",
+        summary="Acquires the Strava webhook queue's statistics.",
+        description="Acquires the counters of events received, coalesced, and processed.",
+        status_code=200,
+        response_model=APIResponsePayload[WebhookQueueStats, Empty],
+    )
+    async def get_webhook_stats() -> APIResponsePayload[WebhookQueueStats, Empty]:
+        """
+        Retrieves the Strava webhook queue's statistics.
+
+        :return The response payload.
+        """
+        return APIResponsePayload(
+            data=WebhookQueueStats(**webhook_processor.stats()),
+            meta=Empty(),
+        )
@@ -0,0 +1,115 @@
+from csv import writer
+from datetime import date, datetime, time
+from io import BytesIO, StringIO
+from typing import Iterable, Iterator
+
+import orjson
+
+from models.athlete import Activity
+
+try:
+    import pyarrow
+except ImportError:  # Optional; Arrow output is unavailable without it
+    pyarrow = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def encode_ndjson(columns: list[str], chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    """
+    Encodes rows as newline-delimited JSON objects, one encoded chunk at a time.
+
+    :param columns: The column names (the objects' keys).
+    :param chunks: The chunks of row tuples.
+
+    :return: An iterator over the encoded chunks.
+    """
+    for chunk in chunks:
+        yield b"".join(
+            orjson.dumps(dict(zip(columns, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in chunk
+        )
+
+
+def encode_csv(columns: list[str], chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    """
+    Encodes rows as CSV (with a header line), one encoded chunk at a time.
+
+    :param columns: The column names (the header).
+    :param chunks: The chunks of row tuples.
+
+    :return: An iterator over the encoded chunks.
+    """
+    buffer = StringIO()
+    csv_writer = writer(buffer)
+    csv_writer.writerow(columns)
+    for chunk in chunks:
+        csv_writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")  # The header of an empty export
+
+
+def arrow_schema(columns: list[str]):
+    """
+    Builds the Arrow schema of activity columns from their database types (rather than from
+    the values, which may all be NULL in a chunk).
+
+    :param columns: The column names.
+
+    :return: The Arrow schema.
+    """
+    arrow_types = {
+        bool: pyarrow.bool_(),
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        str: pyarrow.string(),
+        datetime: pyarrow.timestamp("us"),
+        date: pyarrow.date32(),
+        time: pyarrow.time64("us"),
+    }
+    table_columns = Activity.__table__.columns
+    return pyarrow.schema(
+        [(name, arrow_types[table_columns[name].type.python_type]) for name in columns]
+    )
+
+
+def encode_arrow(columns: list[str], chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    """
+    Encodes rows as an Arrow IPC stream, one record batch per chunk.
+
+    :param columns: The column names.
+    :param chunks: The chunks of row tuples.
+
+    :return: An iterator over the encoded chunks (the first one starts with the schema).
+    """
+    if pyarrow is None:
+        raise RuntimeError("Arrow output requires pyarrow.")
+    schema = arrow_schema(columns)
+    sink = BytesIO()
+    with pyarrow.ipc.new_stream(sink, schema) as stream:
+        for chunk in chunks:
+            stream.write_batch(
+                pyarrow.record_batch(
+                    (
+                        [list(values) for values in zip(*chunk)]
+                        if chunk
+                        else [[]] * len(columns)
+                    ),
+                    schema=schema,
+                )
+            )
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()  # The end-of-stream marker (and the schema, if there were no rows)
+
+
+# Export format -> (encoder, media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": (encode_ndjson, "application/x-ndjson", "ndjson"),
+    "csv": (encode_csv, "text/csv", "csv"),
+    "arrow": (encode_arrow, ARROW_MEDIA_TYPE, "arrows"),
+}
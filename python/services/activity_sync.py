@@ -0,0 +1,327 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from os import getenv
+from time import perf_counter
+from typing import Any, Iterable, Iterator
+
+from stravalib.exc import RateLimitExceeded
+from stravalib.model import Activity
+
+from dao.strava_activities import StravaActivitiesDao
+from dao.strava_sync_state import StravaSyncStateDao
+from services.activity_transform import build_activity_row, transform_activities
+from services.strava import StravaAPI
+from utils.simple_logger import SimpleLogger
+
+# Listing with `after` returns activities oldest first, so an interrupted listing is a prefix
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# The columns an activity summary (from the activity list) carries, to spot changed activities
+SUMMARY_COLUMNS = (
+    "name", "moving_time_s", "distance_mi", "wkt_type", "total_elev_gain_ft", "manual",
+    "achievement_count", "kudos_count", "comment_count", "athlete_count",
+)  # fmt: skip
+
+
+class SyncPipelineStats:
+    """
+    The per-stage item counts and timings of a sync pipeline run (fetch, transform, upsert).
+    """
+
+    def __init__(self):
+        self.items: dict[str, int] = {}  # Stage -> items processed
+        self.timings: dict[str, float] = {}  # Stage -> seconds
+
+    @contextmanager
+    def time(self, stage: str, items: int = 0) -> Iterator[None]:
+        """
+        Times a pipeline stage's work on a batch.
+
+        :param stage: The stage's name (e.g., "transform").
+        :param items: The number of items in the batch.
+
+        :return: A context manager that adds the elapsed time to the stage's total.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage=stage, seconds=perf_counter() - start, items=items)
+
+    def record(self, stage: str, seconds: float, items: int) -> None:
+        """
+        Adds to a stage's totals.
+
+        :param stage: The stage's name.
+        :param seconds: The time spent.
+        :param items: The number of items processed.
+
+        :return: None
+        """
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.items[stage] = self.items.get(stage, 0) + items
+
+    def timed(self, stage: str, iterable: Iterable) -> Iterator:
+        """
+        Times the waits on an iterable (e.g., the fetches behind a generator) as a stage.
+
+        :param stage: The stage's name (e.g., "fetch").
+        :param iterable: The iterable.
+
+        :return: An iterator over the iterable's items.
+        """
+        iterator = iter(iterable)
+        done = object()
+        while True:
+            start = perf_counter()
+            item = next(iterator, done)
+            self.record(
+                stage=stage,
+                seconds=perf_counter() - start,
+                items=0 if item is done else 1,
+            )
+            if item is done:
+                return
+            yield item
+
+    def throughput(self) -> dict[str, float]:
+        """
+        The items per second each stage processed (while it was working).
+
+        :return: Stage -> items per second.
+        """
+        return {
+            stage: round(self.items[stage] / seconds, 1) if seconds else 0.0
+            for stage, seconds in self.timings.items()
+        }
+
+    def summary(self) -> str:
+        """
+        Summarizes the run for logging.
+
+        :return: The summary (e.g., "fetch=120 in 14.201s (8.5/s), transform=...").
+        """
+        throughput = self.throughput()
+        return ", ".join(
+            f"{stage}={self.items[stage]} in {seconds:.3f}s ({throughput[stage]}/s)"
+            for stage, seconds in self.timings.items()
+        )
+
+
+class ActivitySyncService:
+    """
+    Syncs athletes' Strava runs into the database incrementally, resuming where the last sync
+    stopped.
+
+    Each athlete's sync state holds a watermark (the start time of the newest activity listed so
+    far) and the IDs of runs that were listed but not yet stored (e.g., the daily quota ran out).
+    A sync retries the pending runs, lists only the activities after the watermark (less an
+    overlap, so recent edits are seen), and detail-fetches just the new runs and those whose
+    summary differs from the stored row. A steady-state sync therefore costs one list call plus
+    one call per new run, instead of re-fetching the athlete's whole history.
+
+    The runs stream through a pipeline: they're fetched concurrently (a bounded number ahead),
+    transformed a batch at a time, and each batch is bulk-upserted before more are taken, so
+    memory stays bounded by the batch size however long the backfill.
+    """
+
+    def __init__(
+        self,
+        activities_dao: StravaActivitiesDao = None,
+        sync_state_dao: StravaSyncStateDao = None,
+        overlap_days: float = None,
+        batch_size: int = None,
+    ):
+        """
+        Initializes the activity sync service.
+
+        :param activities_dao: The activities DAO.
+        :param sync_state_dao: The sync state DAO.
+        :param overlap_days: How far before the watermark to re-list activities, to catch edits.
+        :param batch_size: The number of runs transformed and upserted at a time.
+
+        :return: None
+        """
+        self.activities_dao: StravaActivitiesDao = (
+            StravaActivitiesDao() if activities_dao is None else activities_dao
+        )
+        self.sync_state_dao: StravaSyncStateDao = (
+            StravaSyncStateDao() if sync_state_dao is None else sync_state_dao
+        )
+        self.overlap: timedelta = timedelta(
+            days=(
+                float(getenv("STRAVA_SYNC_OVERLAP_DAYS", "7"))
+                if overlap_days is None
+                else overlap_days
+            )
+        )
+        self.batch_size: int = (
+            int(getenv("STRAVA_SYNC_BATCH_SIZE", "200"))
+            if batch_size is None
+            else batch_size
+        )
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def list_activities(
+        self, strava_api: StravaAPI, after: datetime
+    ) -> tuple[list[Activity], bool]:
+        """
+        Lists the athlete's activities after the given time, oldest first.
+
+        :param strava_api: The athlete's Strava API client.
+        :param after: The time to list activities after.
+
+        :return: The listed activities, and whether the listing finished (it's paged, so the
+            rate limit may cut it short).
+        """
+        listed: list[Activity] = []
+        try:
+            for activity in strava_api.fetch_activities(start_date=after) or []:
+                listed.append(activity)
+            return listed, True
+        except RateLimitExceeded as e:
+            self.logger.error(f"Strava API rate limit exceeded while listing: {e}")
+        except Exception as e:
+            self.logger.error(f"Failed to list activities: {e}")
+        return listed, False
+
+    def find_changed(
+        self, summaries: list[Activity], athlete_id: int
+    ) -> tuple[list[int], list[int]]:
+        """
+        Splits listed runs into new ones and stored ones whose summary has changed.
+
+        :param summaries: The listed runs.
+        :param athlete_id: The athlete's ID.
+
+        :return: The IDs of the new runs and of the changed runs.
+        """
+        stored = {
+            activity.activity_id: activity
+            for activity in self.activities_dao.get_activities_by_ids(
+                [summary.id for summary in summaries]
+            )
+        }
+        new_ids, changed_ids = [], []
+        for summary in summaries:
+            activity = stored.get(summary.id)
+            if activity is None:
+                new_ids.append(summary.id)
+                continue
+            row = build_activity_row(summary, athlete_id)
+            if any(
+                getattr(activity, column) != row[column] for column in SUMMARY_COLUMNS
+            ):
+                changed_ids.append(summary.id)
+        return new_ids, changed_ids
+
+    def store_activities(
+        self,
+        activity_ids: list[int],
+        athlete_id: int,
+        strava_api: StravaAPI,
+        stats: SyncPipelineStats,
+    ) -> list[int]:
+        """
+        Fetches, transforms, and upserts runs, a batch at a time.
+
+        :param activity_ids: The IDs of the runs.
+        :param athlete_id: The athlete's ID.
+        :param strava_api: The athlete's Strava API client.
+        :param stats: The pipeline's stage counts and timings.
+
+        :return: The IDs of the runs to retry: those the quota didn't allow, or that couldn't be
+            stored (runs that failed for good, e.g. deleted ones, are dropped).
+        """
+        unstored_ids: list[int] = []
+        fetched = stats.timed(
+            "fetch", strava_api.iter_detailed_activities(activity_ids=activity_ids)
+        )
+        while batch := list(islice(fetched, self.batch_size)):
+            with stats.time("transform", items=len(batch)):
+                rows = transform_activities(activities=batch, athlete_id=athlete_id)
+            with stats.time("upsert", items=len(rows)):
+                counts = self.activities_dao.upsert_activities(rows)
+            if counts is None:
+                unstored_ids += [row["activity_id"] for row in rows]
+        if strava_api.failed_activity_ids:
+            self.logger.warning(
+                f"Dropping {len(strava_api.failed_activity_ids)} runs that couldn't be fetched: "
+                f"{strava_api.failed_activity_ids}"
+            )
+        return strava_api.unfetched_activity_ids + unstored_ids
+
+    def sync_athlete(
+        self, athlete_id: int, strava_api: StravaAPI, max_fetches: int = None
+    ) -> dict[str, Any]:
+        """
+        Syncs an athlete's new and changed runs, and records where the sync got to.
+
+        :param athlete_id: The athlete's ID.
+        :param strava_api: The athlete's Strava API client.
+        :param max_fetches: The most runs to detail-fetch (the rest stay pending for the next
+            sync); unlimited, if not given.
+
+        :return: A summary of the sync (counts of runs listed, fetched, stored, dropped after
+            failing, and pending).
+        """
+        start = perf_counter()
+        state = self.sync_state_dao.get_sync_state(athlete_id)
+        watermark = state.last_activity_at if state else None
+        pending_ids = list(state.pending_activity_ids or []) if state else []
+
+        listed, listing_finished = self.list_activities(
+            strava_api=strava_api,
+            after=watermark - self.overlap if watermark else EPOCH,
+        )
+        runs = [activity for activity in listed if activity.type == "Run"]
+        new_ids, changed_ids = self.find_changed(summaries=runs, athlete_id=athlete_id)
+
+        # Pending runs first, since they're the oldest
+        activity_ids = list(dict.fromkeys([*pending_ids, *new_ids, *changed_ids]))
+        deferred_ids = activity_ids[max_fetches:] if max_fetches is not None else []
+        activity_ids = activity_ids[: len(activity_ids) - len(deferred_ids)]
+        stats = SyncPipelineStats()
+        unstored_ids = self.store_activities(
+            activity_ids=activity_ids,
+            athlete_id=athlete_id,
+            strava_api=strava_api,
+            stats=stats,
+        )
+        failed = len(strava_api.failed_activity_ids)
+        stored = len(activity_ids) - len(unstored_ids) - failed
+        unstored_ids += deferred_ids
+
+        # Everything listed is now either stored or pending, so the watermark can pass it
+        if listed:
+            newest = max(activity.start_date for activity in listed)
+            watermark = max(watermark, newest) if watermark else newest
+        status = "complete" if listing_finished and not unstored_ids else "partial"
+        if not listing_finished and not listed and not stored:
+            status = "failed"
+        self.sync_state_dao.upsert_sync_state(
+            athlete_id=athlete_id,
+            last_activity_at=watermark,
+            pending_activity_ids=unstored_ids,
+            last_status=status,
+        )
+
+        summary = {
+            "athlete_id": athlete_id,
+            "status": status,
+            "listed": len(listed),
+            "new": len(new_ids),
+            "changed": len(changed_ids),
+            "retried": len(pending_ids),
+            "stored": stored,
+            "failed": failed,
+            "deferred": len(deferred_ids),
+            "pending": len(unstored_ids),
+            "watermark": watermark,
+            "throughput": stats.throughput(),
+        }
+        self.logger.info(
+            f"Synced athlete [{athlete_id}] in {perf_counter() - start:.1f}s: {summary} "
+            f"({stats.summary()})"
+        )
+        return summary
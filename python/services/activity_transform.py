@@ -0,0 +1,150 @@
+from datetime import time
+from typing import Any
+
+import numpy as np
+from stravalib.model import Activity
+
+METERS_PER_MILE = 1609.344
+FEET_PER_METER = 3.28084
+SECONDS_PER_DAY = 86400
+WEEK_DAYS = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+
+
+def magnitude(value: Any) -> float | None:
+    """
+    Strips a stravalib quantity (e.g., a distance in meters) down to its number.
+
+    :param value: The quantity (or plain number).
+
+    :return: The number (None if the value is missing).
+    """
+    if value is None:
+        return None
+    return float(getattr(value, "magnitude", value))
+
+
+def to_times(seconds: np.ndarray) -> list[time | None]:
+    """
+    Converts durations to times of day (e.g., HH:MM:SS), capped at 23:59:59.
+
+    :param seconds: The durations in seconds (NaN where missing).
+
+    :return: The times (None where missing).
+    """
+    missing = np.isnan(seconds)
+    whole = np.clip(np.rint(np.nan_to_num(seconds)), 0, SECONDS_PER_DAY - 1)
+    hours, rest = np.divmod(whole.astype(np.int64), 3600)
+    minutes, secs = np.divmod(rest, 60)
+    return [
+        None if is_missing else time(int(h), int(m), int(s))
+        for is_missing, h, m, s in zip(missing, hours, minutes, secs)
+    ]
+
+
+def to_values(array: np.ndarray, cast: type = float) -> list:
+    """
+    Converts an array to Python values for the database driver.
+
+    :param array: The array (NaN where missing).
+    :param cast: The values' type (e.g., int).
+
+    :return: The values (None where missing).
+    """
+    return [None if np.isnan(value) else cast(value) for value in array]
+
+
+def transform_activities(
+    activities: list[Activity], athlete_id: int
+) -> list[dict[str, Any]]:
+    """
+    Converts a batch of Strava activities to the 'activities' table's column values.
+
+    The unit conversions (meters and m/s to miles, feet, and ft/s) and the derived durations
+    (moving time and pace as HH:MM:SS) are computed column-wise over the whole batch with NumPy.
+    Dates are in the athlete's local time.
+
+    :param activities: The (detailed or summary) activities.
+    :param athlete_id: The athlete's ID.
+
+    :return: The activities' column values, in the order given.
+    """
+    if not activities:
+        return []
+
+    def column(values) -> np.ndarray:
+        return np.array(
+            [np.nan if value is None else value for value in values], dtype=np.float64
+        )
+
+    moving_time_s = column(
+        [
+            activity.moving_time.total_seconds() if activity.moving_time else 0
+            for activity in activities
+        ]
+    ).astype(np.int64)
+    distance_mi = (
+        np.nan_to_num(column([magnitude(a.distance) for a in activities]))
+        / METERS_PER_MILE
+    )
+    average_speed = np.nan_to_num(
+        column([magnitude(a.average_speed) for a in activities])
+    )
+    max_speed = column([magnitude(a.max_speed) for a in activities])
+    elevation_gain = column([magnitude(a.total_elevation_gain) for a in activities])
+    # Strava reports a run's cadence per leg
+    spm = column([a.average_cadence or None for a in activities]) * 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pace_s = np.where(distance_mi > 0, moving_time_s / distance_mi, np.nan)
+
+    columns = {
+        "moving_time": to_times(moving_time_s.astype(np.float64)),
+        "moving_time_s": moving_time_s.tolist(),
+        "distance_mi": np.round(distance_mi, 2).tolist(),
+        "pace_min_mi": to_times(pace_s),
+        "avg_speed_ft_s": np.round(average_speed * FEET_PER_METER, 2).tolist(),
+        "spm_avg": to_values(np.round(spm, 1)),
+        "total_elev_gain_ft": to_values(np.round(elevation_gain * FEET_PER_METER, 1)),
+        "max_speed_ft_s": to_values(np.round(max_speed * FEET_PER_METER, 2)),
+        "avg_power": to_values(column([a.average_watts for a in activities]), cast=int),
+    }
+
+    rows = []
+    for index, activity in enumerate(activities):
+        start = activity.start_date_local
+        rows.append(
+            {
+                "activity_id": activity.id,
+                "athlete_id": athlete_id,
+                "name": activity.name or "",
+                **{name: values[index] for name, values in columns.items()},
+                "full_datetime": start,
+                "time": start.time(),
+                "week_day": WEEK_DAYS[start.weekday()],
+                "month": start.month,
+                "day": start.day,
+                "year": start.year,
+                "hr_avg": activity.average_heartrate,
+                "wkt_type": activity.workout_type,
+                "description": activity.description,
+                "manual": bool(activity.manual),
+                "calories": activity.calories,
+                "achievement_count": activity.achievement_count,
+                "kudos_count": activity.kudos_count,
+                "comment_count": activity.comment_count,
+                "athlete_count": activity.athlete_count,
+                "rpe": activity.perceived_exertion,
+            }
+        )
+    return rows
+
+
+def build_activity_row(activity: Activity, athlete_id: int) -> dict[str, Any]:
+    """
+    Converts a single Strava activity to the 'activities' table's column values.
+
+    :param activity: The (detailed or summary) activity.
+    :param athlete_id: The athlete's ID.
+
+    :return: The activity's column values.
+    """
+    return transform_activities([activity], athlete_id)[0]
@@ -0,0 +1,377 @@
+from cachetools import TTLCache
+from hashlib import sha256
+from os import getenv
+from re import sub, split, search, escape, IGNORECASE
+from threading import Lock
+from typing import Any, Sequence
+
+from models.athlete import Base
+from models.chat import GeneratedQueryOutput
+from utils.simple_logger import SimpleLogger
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for cache lookups (lowercased, punctuation stripped, whitespace collapsed).
+
+    :param text: The text to normalize.
+
+    :return: The normalized text.
+    """
+    text = sub(r"[^\w\s%.-]", " ", text.lower())
+    text = sub(r"(?<!\d)\.|\.(?!\d)", " ", text)  # Keep decimal points only
+    return " ".join(text.split())
+
+
+def hash_text(text: str) -> str:
+    """
+    Hashes text into a short, stable fingerprint.
+
+    :param text: The text to hash.
+
+    :return: The hex digest (first 16 characters).
+    """
+    return sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalizes a SQL query for cache lookups (whitespace collapsed outside of string literals,
+    trailing semicolon dropped).
+
+    :param query: The SQL query to normalize.
+
+    :return: The normalized SQL query.
+    """
+    parts = split(r"('(?:[^']|'')*')", query.strip().rstrip(";"))
+    return "".join(
+        part if index % 2 else sub(r"\s+", " ", part)
+        for index, part in enumerate(parts)
+    ).strip()
+
+
+class DataVersions:
+    """
+    Tracks a write counter per database table, so cached reads can tell when they've gone stale.
+
+    The DAOs bump a table's version after every committed write to it.
+    """
+
+    def __init__(self):
+        self.versions: dict[str, int] = {}
+        self.lock = Lock()
+
+    def bump(self, *tables: str) -> None:
+        """
+        Marks the given tables as written to.
+
+        :param tables: The fully-qualified table names (e.g., "strava_api.activities").
+
+        :return: None
+        """
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+    def snapshot(self, tables: Sequence[str]) -> tuple[int, ...]:
+        """
+        Returns the current versions of the given tables.
+
+        :param tables: The fully-qualified table names.
+
+        :return: The versions, in the order given.
+        """
+        with self.lock:
+            return tuple(self.versions.get(table, 0) for table in tables)
+
+
+# Shared by the DAOs (writers) and the result cache (reader)
+data_versions = DataVersions()
+
+
+class QueryCache:
+    """
+    Caches generated SQL queries keyed on the normalized user question and the schema they were
+    generated against, so repeat questions skip the query-generation LLM round trip.
+
+    Entries are evicted least-recently-used once the cache is full, and expire after a TTL. An
+    optional similarity tier also matches near-identical phrasings of a cached question.
+    """
+
+    def __init__(
+        self,
+        max_size: int = None,
+        ttl_s: float = None,
+        similarity_threshold: float = None,
+    ):
+        """
+        Initializes the query cache.
+
+        :param max_size: The maximum number of cached queries.
+        :param ttl_s: The number of seconds a cached query stays valid.
+        :param similarity_threshold: The minimum token similarity (0-1) for a near-identical
+                                     question to count as a hit. 0 disables the similarity tier.
+
+        :return: None
+        """
+        self.max_size: int = (
+            int(getenv("TAG_QUERY_CACHE_SIZE", "512")) if max_size is None else max_size
+        )
+        self.ttl_s: float = (
+            float(getenv("TAG_QUERY_CACHE_TTL_S", "3600")) if ttl_s is None else ttl_s
+        )
+        self.similarity_threshold: float = (
+            float(getenv("TAG_QUERY_CACHE_SIMILARITY", "0"))
+            if similarity_threshold is None
+            else similarity_threshold
+        )
+        self.cache: TTLCache = TTLCache(maxsize=self.max_size, ttl=self.ttl_s)
+        self.lock = Lock()
+        self.hits: int = 0
+        self.similar_hits: int = 0
+        self.misses: int = 0
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def get(self, question: str, schema_hash: str) -> GeneratedQueryOutput | None:
+        """
+        Looks up the cached query for a question.
+
+        :param question: The user's question.
+        :param schema_hash: The fingerprint of the schema description used for generation.
+
+        :return: The cached query output, or None on a miss.
+        """
+        normalized_question = normalize_text(question)
+        with self.lock:
+            cached_output = self.cache.get((schema_hash, normalized_question))
+            if cached_output is not None:
+                self.hits += 1
+                return cached_output
+
+            if self.similarity_threshold > 0:
+                cached_output = self.find_similar(normalized_question, schema_hash)
+                if cached_output is not None:
+                    self.similar_hits += 1
+                    return cached_output
+
+            self.misses += 1
+            return None
+
+    def find_similar(
+        self, normalized_question: str, schema_hash: str
+    ) -> GeneratedQueryOutput | None:
+        """
+        Finds the cached query of the most similar question (by token Jaccard similarity).
+
+        Questions whose numbers differ never match, since those are almost always filter values.
+
+        :param normalized_question: The normalized user question.
+        :param schema_hash: The fingerprint of the schema description used for generation.
+
+        :return: The most similar cached query output above the threshold, or None.
+        """
+        tokens = set(normalized_question.split())
+        numbers = {token for token in tokens if any(c.isdigit() for c in token)}
+        best_score, best_output = 0.0, None
+        self.cache.expire()
+        for (cached_schema_hash, cached_question), output in list(self.cache.items()):
+            if cached_schema_hash != schema_hash:
+                continue
+            cached_tokens = set(cached_question.split())
+            cached_numbers = {
+                token for token in cached_tokens if any(c.isdigit() for c in token)
+            }
+            if numbers != cached_numbers:
+                continue
+            score = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if score > best_score:
+                best_score, best_output = score, output
+        if best_score >= self.similarity_threshold:
+            self.logger.debug(
+                f"Similar cached query found (similarity={best_score:.2f})"
+            )
+            return best_output
+        return None
+
+    def set(
+        self, question: str, schema_hash: str, output: GeneratedQueryOutput
+    ) -> None:
+        """
+        Caches the generated query for a question.
+
+        :param question: The user's question.
+        :param schema_hash: The fingerprint of the schema description used for generation.
+        :param output: The generated query output.
+
+        :return: None
+        """
+        with self.lock:
+            self.cache[(schema_hash, normalize_text(question))] = output
+
+    def invalidate(self, question: str, schema_hash: str) -> None:
+        """
+        Removes the cached query for a question (e.g., when it failed to execute).
+
+        :param question: The user's question.
+        :param schema_hash: The fingerprint of the schema description used for generation.
+
+        :return: None
+        """
+        with self.lock:
+            self.cache.pop((schema_hash, normalize_text(question)), None)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Returns the cache's hit/miss counters.
+
+        :return: The cache statistics.
+        """
+        with self.lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "size": len(self.cache),
+                "hit_rate": (
+                    (self.hits + self.similar_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+
+class ResultCache:
+    """
+    Caches SQL query results keyed on the normalized executed query.
+
+    Each entry remembers the versions of the tables the query reads from; once a DAO write bumps
+    any of them, the entry is stale and is treated as a miss. The TTL is a backstop for writes
+    made by other processes, which this process' version counters can't see.
+    """
+
+    def __init__(
+        self,
+        max_size: int = None,
+        ttl_s: float = None,
+        max_rows: int = None,
+        versions: DataVersions = data_versions,
+    ):
+        """
+        Initializes the result cache.
+
+        :param max_size: The maximum number of cached results.
+        :param ttl_s: The number of seconds a cached result stays valid.
+        :param max_rows: The largest result (in rows) worth caching.
+        :param versions: The table versions to validate entries against.
+
+        :return: None
+        """
+        self.max_size: int = (
+            int(getenv("TAG_RESULT_CACHE_SIZE", "256"))
+            if max_size is None
+            else max_size
+        )
+        self.ttl_s: float = (
+            float(getenv("TAG_RESULT_CACHE_TTL_S", "300")) if ttl_s is None else ttl_s
+        )
+        self.max_rows: int = (
+            int(getenv("TAG_RESULT_CACHE_MAX_ROWS", "1000"))
+            if max_rows is None
+            else max_rows
+        )
+        self.versions: DataVersions = versions
+        self.tables: list[str] = [
+            table.fullname for table in Base.metadata.sorted_tables
+        ]
+        self.cache: TTLCache = TTLCache(maxsize=self.max_size, ttl=self.ttl_s)
+        self.lock = Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stale: int = 0
+
+    def tables_read_by(self, query: str) -> tuple[str, ...]:
+        """
+        Determines which known tables a query reads from (all of them, if none are recognized).
+
+        :param query: The SQL query.
+
+        :return: The fully-qualified table names.
+        """
+        tables = tuple(
+            table
+            for table in self.tables
+            if search(rf"\b{escape(table.split('.')[-1])}\b", query, IGNORECASE)
+        )
+        return tables or tuple(self.tables)
+
+    def snapshot(self, query: str) -> tuple[tuple[str, ...], tuple[int, ...]]:
+        """
+        Captures the versions of the tables a query reads from.
+
+        NOTE: Take this *before* executing the query, so a write that lands mid-execution makes
+        the cached result stale rather than going unnoticed.
+
+        :param query: The SQL query.
+
+        :return: The tables read and their current versions.
+        """
+        tables = self.tables_read_by(query)
+        return tables, self.versions.snapshot(tables)
+
+    def get(self, query: str) -> Any | None:
+        """
+        Looks up the cached result of a query.
+
+        :param query: The SQL query.
+
+        :return: The cached result, or None on a miss (or a stale entry).
+        """
+        key = normalize_sql(query)
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            (tables, versions), result = entry
+            if self.versions.snapshot(tables) != versions:
+                self.cache.pop(key, None)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def set(
+        self,
+        query: str,
+        result: Any,
+        snapshot: tuple[tuple[str, ...], tuple[int, ...]],
+    ) -> None:
+        """
+        Caches the result of a query.
+
+        :param query: The SQL query.
+        :param result: The query's result (sized by its number of rows).
+        :param snapshot: The table versions captured (via `snapshot`) before executing the query.
+
+        :return: None
+        """
+        if len(result) > self.max_rows:
+            return
+        with self.lock:
+            self.cache[normalize_sql(query)] = (snapshot, result)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Returns the cache's hit/miss counters.
+
+        :return: The cache statistics.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "size": len(self.cache),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
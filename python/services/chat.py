@@ -1,22 +1,121 @@
+from os import getenv
+from time import perf_counter
+from typing import Any, AsyncIterator
+
+from services.intent_router import IntentRouter
+from services.retrievers.fast_path import FastPathRetriever
 from services.retrievers.tag import TAGRetriever
-from models.chat import ChatResponse, ChatResponseMeta, OpenAIMessage
+from services.metrics import chat_request_duration, chat_requests
+from models.chat import (
+    ChatResponse,
+    ChatResponseMeta,
+    OpenAIMessage,
+    PipelineMetrics,
+)
 from models.base import APIResponsePayload
 
 
 class ChatService:
     def __init__(self):
-        # Eventually we'll need an intent router to determine which retriever to use
+        # Common question shapes are answered locally; everything else goes to TAG
+        self.router = IntentRouter()
         self.retriever = TAGRetriever()
+        self.fast_path = FastPathRetriever(query_executor=self.retriever.query_executor)
+        self.use_fast_path: bool = (
+            getenv("CHAT_FAST_PATH_ENABLED", "true").lower() == "true"
+        )
+
+    async def process_fast_path(
+        self, user_question: dict[str, str], include_metrics: bool = False
+    ) -> APIResponsePayload[ChatResponse, ChatResponseMeta] | None:
+        """
+        Answers a chat message locally, if it's a recognized question shape.
+
+        :param user_question: The user's question.
+        :param include_metrics: Whether to include the timings in the response.
+
+        :return The response payload, or None if the message should go to the TAG retriever.
+        """
+        if not self.use_fast_path:
+            return None
+        start = perf_counter()
+        intent = self.router.route(user_question.get("content", ""))
+        if intent is None:
+            return None
+        response_payload = await self.fast_path.process(intent)
+        if response_payload is None:
+            return None
+        elapsed = perf_counter() - start
+        chat_requests.labels(path="fast_path").inc()
+        chat_request_duration.labels(path="fast_path").observe(elapsed)
+        if include_metrics:
+            response_payload.meta.metrics = PipelineMetrics(
+                timings={"fast_path": round(elapsed, 6)}, total=round(elapsed, 6)
+            )
+        return response_payload
 
-    def process(
-        self, user_question: dict[str, str], messages: list[dict[str, str]]
+    async def process(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        synthesize: bool = False,
+        include_metrics: bool = False,
     ) -> APIResponsePayload[ChatResponse, ChatResponseMeta]:
         """
         Processes a chat message.
 
         :param user_question: The user's question.
         :param messages: The conversation messages.
+        :param synthesize: Whether to have the LLM write the answer (rather than a local rendering).
+        :param include_metrics: Whether to include the pipeline's timings and token usage.
 
         :return The response payload.
         """
-        return self.retriever.process(user_question=user_question, messages=messages)
+        response_payload = await self.process_fast_path(
+            user_question, include_metrics=include_metrics
+        )
+        if response_payload:
+            return response_payload
+        return await self.retriever.process(
+            user_question=user_question,
+            messages=messages,
+            synthesize=synthesize,
+            include_metrics=include_metrics,
+        )
+
+    async def stream(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        synthesize: bool = False,
+        include_metrics: bool = False,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Processes a chat message, streaming the response as it's generated.
+
+        :param user_question: The user's question.
+        :param messages: The conversation messages.
+        :param synthesize: Whether to have the LLM write the answer (rather than a local rendering).
+        :param include_metrics: Whether to include the pipeline's timings and token usage.
+
+        :return An async iterator of (event name, event data) tuples.
+        """
+        response_payload = await self.process_fast_path(
+            user_question, include_metrics=include_metrics
+        )
+        if response_payload:
+            meta = response_payload.meta
+            yield "token", {"content": response_payload.data.response.content}
+            yield "done", {
+                "completion_id": meta.completion_id,
+                "executed_query": meta.executed_query,
+                **({"metrics": meta.metrics.dict()} if meta.metrics else {}),
+            }
+            return
+        async for event in self.retriever.stream(
+            user_question=user_question,
+            messages=messages,
+            synthesize=synthesize,
+            include_metrics=include_metrics,
+        ):
+            yield event
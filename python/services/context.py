@@ -0,0 +1,189 @@
+from functools import lru_cache
+from os import getenv
+from typing import Any
+
+from models.chat import RoleTypes
+from utils.simple_logger import SimpleLogger
+
+try:
+    from tiktoken import encoding_for_model, get_encoding
+except ImportError:  # Optional; token counts are estimated without it
+    encoding_for_model = get_encoding = None
+
+logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+# Token budgets for the conversation history sent along with each request, per model
+MODEL_CONTEXT_BUDGETS: dict[str, int] = {
+    "gpt-4o-mini": 1500,
+    "gpt-4o": 1500,
+    "gpt-4.1-mini": 1500,
+    "gpt-4.1": 1500,
+}
+DEFAULT_CONTEXT_BUDGET = 1000
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str) -> Any | None:
+    """
+    Acquires the tokenizer for a model (cached).
+
+    :param model: The model name.
+
+    :return: The tiktoken encoding, or None if tiktoken (or its encoding files) isn't available.
+    """
+    if encoding_for_model is None:
+        return None
+    try:
+        try:
+            return encoding_for_model(model)
+        except KeyError:  # Unknown model name; use the encoding of the current models
+            return get_encoding("o200k_base")
+    except Exception as e:
+        # E.g., the encoding files can't be downloaded in an offline environment
+        logger.warning(f"Unable to load a tokenizer for {model}; estimating: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Counts the tokens in a text for a model.
+
+    :param text: The text.
+    :param model: The model name.
+
+    :return: The number of tokens (estimated at ~4 characters per token without tiktoken).
+    """
+    tokenizer = get_tokenizer(model)
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+class ConversationContextBuilder:
+    """
+    Fits the conversation history into a per-model token budget.
+
+    The most recent turns are kept verbatim; older turns are compacted into a single summary
+    message, and the oldest summary lines are dropped first if the budget is still exceeded.
+    Only user and assistant turns are kept, so prompts injected by earlier requests never pile up.
+    """
+
+    def __init__(
+        self,
+        recent_turns: int = None,
+        summary_chars: int = None,
+        budgets: dict[str, int] = None,
+    ):
+        """
+        Initializes the context builder.
+
+        :param recent_turns: The number of most recent messages kept verbatim.
+        :param summary_chars: The maximum characters kept per compacted (older) message.
+        :param budgets: The per-model token budgets for the conversation history.
+
+        :return: None
+        """
+        self.recent_turns: int = (
+            int(getenv("TAG_CONTEXT_RECENT_TURNS", "4"))
+            if recent_turns is None
+            else recent_turns
+        )
+        self.summary_chars: int = (
+            int(getenv("TAG_CONTEXT_SUMMARY_CHARS", "160"))
+            if summary_chars is None
+            else summary_chars
+        )
+        self.budgets: dict[str, int] = (
+            MODEL_CONTEXT_BUDGETS if budgets is None else budgets
+        )
+
+    def get_budget(self, model: str) -> int:
+        """
+        Acquires the conversation-history token budget for a model.
+
+        :param model: The model name.
+
+        :return: The token budget.
+        """
+        budget = getenv("TAG_CONTEXT_TOKEN_BUDGET")
+        if budget:
+            return int(budget)
+        return self.budgets.get(model, DEFAULT_CONTEXT_BUDGET)
+
+    def compact(self, message: dict[str, str]) -> str:
+        """
+        Compacts a message into a one-line summary.
+
+        :param message: The message.
+
+        :return: The summary line.
+        """
+        content = " ".join(message["content"].split())
+        if len(content) > self.summary_chars:
+            content = f"{content[: self.summary_chars].rstrip()}..."
+        return f"- {RoleTypes(message['role']).value}: {content}"
+
+    def build(self, messages: list[dict[str, str]], model: str) -> list[dict[str, str]]:
+        """
+        Builds the conversation history to send with a request.
+
+        :param messages: The conversation so far (excluding the user's most recent question).
+        :param model: The model the history is for.
+
+        :return: The budgeted history: an optional summary message followed by the recent turns.
+        """
+        turns = [
+            {"role": message["role"], "content": message["content"]}
+            for message in messages
+            if message["role"] in (RoleTypes.USER, RoleTypes.ASSISTANT)
+        ]
+        budget = self.get_budget(model)
+        split = max(len(turns) - self.recent_turns, 0)
+        older, recent = turns[:split], turns[split:]
+
+        # Compact recent turns (oldest first) into the summary until they fit on their own
+        recent_tokens = [count_tokens(turn["content"], model) for turn in recent]
+        while recent and sum(recent_tokens) > budget:
+            older.append(recent.pop(0))
+            recent_tokens.pop(0)
+
+        # Fill what's left of the budget with summaries, most recent first
+        remaining = budget - sum(recent_tokens)
+        summary_lines: list[str] = []
+        for turn in reversed(older):
+            line = self.compact(turn)
+            tokens = count_tokens(line, model)
+            if tokens > remaining:
+                break
+            summary_lines.insert(0, line)
+            remaining -= tokens
+
+        history: list[dict[str, str]] = []
+        if summary_lines:
+            history.append(
+                {
+                    "role": RoleTypes.DEVELOPER,
+                    "content": "Summary of the earlier conversation:\n"
+                    + "\n".join(summary_lines),
+                }
+            )
+        return history + recent
+
+    def format(self, history: list[dict[str, str]]) -> str:
+        """
+        Formats the history as plain text for a prompt.
+
+        :param history: The budgeted history.
+
+        :return: The formatted conversation (or "None" if there's no history).
+        """
+        if not history:
+            return "None"
+        return "\n".join(
+            (
+                message["content"]
+                if message["role"] == RoleTypes.DEVELOPER
+                else f"{RoleTypes(message['role']).value}: {message['content']}"
+            )
+            for message in history
+        )
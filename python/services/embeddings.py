@@ -0,0 +1,107 @@
+from numpy import float32, ndarray, sqrt, zeros
+from os import getenv
+from zlib import crc32
+
+from services.cache import normalize_text
+
+
+class HashingEmbedder:
+    """
+    Embeds text locally (no model download or network access) with the hashing trick.
+
+    Word unigrams, word bigrams, and character trigrams are hashed into a fixed number of
+    signed buckets, and the resulting vector is L2-normalized so a dot product is a cosine
+    similarity.
+    """
+
+    def __init__(self, dim: int = None):
+        """
+        Initializes the hashing embedder.
+
+        :param dim: The embedding dimension.
+
+        :return: None
+        """
+        self.dim: int = int(getenv("TAG_EMBEDDING_DIM", "128")) if dim is None else dim
+
+    def features(self, text: str) -> list[tuple[str, float]]:
+        """
+        Extracts the weighted features of a text.
+
+        :param text: The text.
+
+        :return: The (feature, weight) pairs.
+        """
+        words = normalize_text(text).split()
+        features = [(f"w:{word}", 1.0) for word in words]
+        features += [(f"b:{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [(f"c:{padded[i:i + 3]}", 0.25) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: list[str]) -> ndarray:
+        """
+        Embeds a batch of texts.
+
+        :param texts: The texts to embed.
+
+        :return: A (len(texts), dim) float32 array of unit-length embeddings.
+        """
+        vectors = zeros((len(texts), self.dim), dtype=float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self.features(text):
+                bucket = crc32(feature.encode("utf-8"))
+                sign = 1.0 if bucket & 0x80000000 else -1.0
+                vectors[row, bucket % self.dim] += sign * weight
+        norms = sqrt((vectors * vectors).sum(axis=1, keepdims=True))
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    Embeds text with a local sentence-transformers model (downloaded once, then cached on disk).
+    """
+
+    def __init__(self, model_name: str = None):
+        """
+        Initializes the sentence-transformers embedder.
+
+        :param model_name: The sentence-transformers model to use.
+
+        :return: None
+        """
+        # Imported here since it's heavy (torch) and only needed when this embedder is chosen
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(
+            getenv("TAG_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+            if model_name is None
+            else model_name
+        )
+        self.dim: int = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list[str]) -> ndarray:
+        """
+        Embeds a batch of texts.
+
+        :param texts: The texts to embed.
+
+        :return: A (len(texts), dim) float32 array of unit-length embeddings.
+        """
+        return self.model.encode(
+            texts, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(float32)
+
+
+def get_embedder() -> HashingEmbedder | SentenceTransformerEmbedder:
+    """
+    Creates the embedder configured by the TAG_EMBEDDER environment variable
+    ("hashing" by default, or "sentence-transformers").
+
+    :return: The embedder.
+    """
+    if getenv("TAG_EMBEDDER", "hashing") == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    return HashingEmbedder()
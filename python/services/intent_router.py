@@ -0,0 +1,279 @@
+from calendar import monthrange
+from datetime import date, timedelta
+from re import compile as compile_regex, sub
+
+from utils.simple_logger import SimpleLogger
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [
+            ("january", "jan"),
+            ("february", "feb"),
+            ("march", "mar"),
+            ("april", "apr"),
+            ("may",),
+            ("june", "jun"),
+            ("july", "jul"),
+            ("august", "aug"),
+            ("september", "sep", "sept"),
+            ("october", "oct"),
+            ("november", "nov"),
+            ("december", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+MONTH = rf"(?:{'|'.join(sorted(MONTHS, key=len, reverse=True))})"
+ISO_DATE = r"\d{4}-\d{2}-\d{2}"
+
+# An athlete's name (optionally possessive)
+NAME = r"(?P<athlete>[a-z][a-z\-]*)(?:'s|')?"
+# Words that fill a name's slot without naming an athlete
+NOT_NAMES = {
+    "i", "me", "my", "we", "us", "our", "you", "your", "he", "him", "his", "she", "her",
+    "they", "them", "their", "it", "the", "a", "an", "everyone", "anyone", "someone",
+    "somebody", "everybody", "team", "all", "each", "who",
+}  # fmt: skip
+RUN_VERB = r"(?:run|ran|runs|done|do|log|logged|go running|gone running|went running)"
+
+GREETING_PATTERN = compile_regex(
+    r"^(?:hi|hello|hey|heya|hiya|howdy|yo|greetings|sup|what's up|whats up"
+    r"|good (?:morning|afternoon|evening))(?: there| all| everyone| team)?$"
+)
+INTENT_PATTERNS: dict[str, list] = {
+    "mileage": [
+        compile_regex(rf"^how (?:many|much) (?:miles|mileage|distance) (?:did|has|have) {NAME} {RUN_VERB}$"),
+        compile_regex(rf"^(?:what (?:is|was|were)|what's|whats) {NAME} (?:total |weekly |monthly |yearly )?(?:mileage|miles|distance)$"),
+        compile_regex(rf"^{NAME} (?:total |weekly |monthly |yearly )?(?:mileage|miles)$"),
+        compile_regex(r"^(?:total |weekly |monthly |yearly )?(?:mileage|miles) (?:for|of|by) (?P<athlete>[a-z][a-z\-]*)$"),
+    ],
+    "run_count": [
+        compile_regex(rf"^how many (?:runs|times|activities) (?:did|has|have) {NAME}(?: {RUN_VERB})?$"),
+        compile_regex(rf"^how often (?:did|has|does) {NAME} {RUN_VERB}$"),
+    ],
+    "longest_run": [
+        compile_regex(rf"^(?:what (?:is|was)|what's|whats) {NAME} longest run$"),
+        compile_regex(r"^(?:what (?:is|was)|what's|whats) the longest run (?:by|for|of|from) (?P<athlete>[a-z][a-z\-]*)$"),
+        compile_regex(rf"^{NAME} longest run$"),
+    ],
+}  # fmt: skip
+
+# Period phrases, most specific first
+PERIOD_PATTERNS = [
+    ("between", compile_regex(rf"\b(?:between|from) (?P<start>{ISO_DATE}) (?:and|to|through) (?P<end>{ISO_DATE})\b")),
+    ("since", compile_regex(rf"\bsince (?P<start>{ISO_DATE})\b")),
+    ("rolling", compile_regex(r"\b(?:in )?(?:the )?(?:last|past) (?P<count>\d+) (?P<unit>days?|weeks?|months?)\b")),
+    ("month", compile_regex(rf"\bin (?P<month>{MONTH})(?: (?P<year>\d{{4}}))?\b")),
+    ("year", compile_regex(r"\bin (?P<year>\d{4})\b")),
+    ("relative", compile_regex(r"\b(?:so far )?(?P<which>this|last|past) (?P<unit>week|month|year)\b")),
+    ("day", compile_regex(r"\b(?P<which>today|yesterday)\b")),
+]  # fmt: skip
+
+
+class Period:
+    """
+    A date range, [start, end), and how to phrase it in an answer (e.g., "this week").
+    """
+
+    def __init__(self, start: date, end: date, label: str):
+        self.start: date = start
+        self.end: date = end
+        self.label: str = label
+
+    def __repr__(self):
+        return f"Period({self.start}, {self.end}, {self.label!r})"
+
+
+class Intent:
+    """
+    A recognized question shape and its parameters.
+    """
+
+    def __init__(
+        self, name: str, athlete: str | None = None, period: Period | None = None
+    ):
+        self.name: str = name
+        self.athlete: str | None = athlete
+        self.period: Period | None = period
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, athlete={self.athlete!r}, period={self.period})"
+
+
+def add_months(day: date, months: int) -> date:
+    """
+    Shifts a date by a number of months (clamping the day to the target month's length).
+
+    :param day: The date.
+    :param months: The number of months to shift by (may be negative).
+
+    :return: The shifted date.
+    """
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, min(day.day, monthrange(year, month + 1)[1]))
+
+
+class IntentRouter:
+    """
+    Recognizes common question shapes locally, so that they can be answered without the LLM.
+
+    Only whole-question matches are routed; anything else (including follow-ups that rely on the
+    conversation) returns no intent and is left to the TAG retriever.
+    """
+
+    def __init__(self):
+        """
+        Initializes the intent router.
+
+        :return: None
+        """
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def normalize(self, question: str) -> str:
+        """
+        Normalizes a question for matching (lowercased, without punctuation or extra whitespace).
+
+        :param question: The user's question.
+
+        :return: The normalized question.
+        """
+        question = question.lower().replace("’", "'")
+        question = sub(r"[^a-z0-9'\-\s]", " ", question)
+        return " ".join(question.split())
+
+    def parse_period(self, question: str, today: date) -> tuple[Period | None, str]:
+        """
+        Finds a period phrase in a (normalized) question.
+
+        :param question: The normalized question.
+        :param today: The current date.
+
+        :return: The period (or None if there's no period phrase) and the question without it.
+        """
+        for kind, pattern in PERIOD_PATTERNS:
+            match = pattern.search(question)
+            if not match:
+                continue
+            remainder = " ".join(
+                f"{question[: match.start()]} {question[match.end():]}".split()
+            )
+            period = self.build_period(kind, match.groupdict(), today)
+            if period:
+                return period, remainder
+        return None, question
+
+    def build_period(
+        self, kind: str, groups: dict[str, str], today: date
+    ) -> Period | None:
+        """
+        Converts a matched period phrase to a date range.
+
+        :param kind: The kind of period phrase (see `PERIOD_PATTERNS`).
+        :param groups: The phrase's matched groups.
+        :param today: The current date.
+
+        :return: The period, or None if the phrase doesn't describe a valid range.
+        """
+        try:
+            if kind == "between":
+                start = date.fromisoformat(groups["start"])
+                end = date.fromisoformat(groups["end"]) + timedelta(days=1)
+                return Period(start, end, f"between {start} and {end - timedelta(1)}")
+            if kind == "since":
+                start = date.fromisoformat(groups["start"])
+                return Period(start, today + timedelta(days=1), f"since {start}")
+            if kind == "rolling":
+                count, unit = int(groups["count"]), groups["unit"].rstrip("s")
+                if unit == "month":
+                    start = add_months(today, -count)
+                else:
+                    start = today - timedelta(days=count * (7 if unit == "week" else 1))
+                return Period(
+                    start + timedelta(days=1),
+                    today + timedelta(days=1),
+                    f"in the last {count} {groups['unit']}",
+                )
+            if kind == "month":
+                month = MONTHS[groups["month"]]
+                year = int(groups["year"]) if groups["year"] else today.year
+                if not groups["year"] and month > today.month:
+                    year -= 1  # The most recent one
+                start = date(year, month, 1)
+                month_name = start.strftime("%B")
+                return Period(start, add_months(start, 1), f"in {month_name} {year}")
+            if kind == "year":
+                year = int(groups["year"])
+                return Period(date(year, 1, 1), date(year + 1, 1, 1), f"in {year}")
+            if kind == "relative":
+                which, unit = groups["which"], groups["unit"]
+                if which == "past":  # Rolling, e.g., "the past week"
+                    days = {"week": 7, "month": 30, "year": 365}[unit]
+                    return Period(
+                        today - timedelta(days=days - 1),
+                        today + timedelta(days=1),
+                        f"in the past {unit}",
+                    )
+                if unit == "week":
+                    start = today - timedelta(days=today.weekday())  # Monday
+                    if which == "last":
+                        start -= timedelta(weeks=1)
+                    return Period(start, start + timedelta(weeks=1), f"{which} week")
+                if unit == "month":
+                    start = today.replace(day=1)
+                    if which == "last":
+                        start = add_months(start, -1)
+                    return Period(start, add_months(start, 1), f"{which} month")
+                start = date(today.year - (which == "last"), 1, 1)
+                return Period(start, date(start.year + 1, 1, 1), f"{which} year")
+            if kind == "day":
+                start = today - timedelta(days=groups["which"] == "yesterday")
+                return Period(start, start + timedelta(days=1), groups["which"])
+        except ValueError:
+            return None  # E.g., an invalid date
+        return None
+
+    def route(self, question: str, today: date | None = None) -> Intent | None:
+        """
+        Routes a question to an intent.
+
+        :param question: The user's question.
+        :param today: The current date (defaults to today).
+
+        :return: The recognized intent, or None if the question should go to the TAG retriever.
+        """
+        today = today or date.today()
+        normalized = self.normalize(question)
+        if GREETING_PATTERN.match(normalized):
+            return Intent(name="greeting")
+
+        period, remainder = self.parse_period(normalized, today=today)
+        for name, patterns in INTENT_PATTERNS.items():
+            for pattern in patterns:
+                match = pattern.match(remainder)
+                if not match:
+                    continue
+                if period is None and name != "longest_run":
+                    # Totals need a period; "weekly"/"monthly" imply the current one
+                    unit = next(
+                        (
+                            unit
+                            for word, unit in (("weekly", "week"), ("monthly", "month"))
+                            if word in remainder.split()
+                        ),
+                        None,
+                    )
+                    if unit is None:
+                        return None
+                    period = self.build_period(
+                        "relative", {"which": "this", "unit": unit}, today
+                    )
+                athlete = match.group("athlete")
+                if athlete in NOT_NAMES:
+                    return None
+                intent = Intent(name=name, athlete=athlete, period=period)
+                self.logger.debug(f"Routed the question to {intent}.")
+                return intent
+        return None
@@ -0,0 +1,522 @@
+from asyncio import Lock, sleep
+from hashlib import sha256
+from json import dumps, loads
+from os import getenv
+from pathlib import Path
+from re import DOTALL, compile as compile_regex
+from time import time
+from typing import Any, AsyncIterator
+from zlib import crc32
+
+from openai import NOT_GIVEN, AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from services.cache import normalize_text
+from utils.simple_logger import SimpleLogger
+
+# Markers that identify which prompt a request carries
+TAG_QUESTION_PATTERN = compile_regex(
+    r"### \*\*User's Most Recent Request:\*\*\s*\"(?P<question>.*?)\"\s*---", DOTALL
+)
+REPAIR_QUESTION_PATTERN = compile_regex(
+    r"### \*\*User's Request:\*\*\s*\"(?P<question>.*?)\"\s*---", DOTALL
+)
+# An athlete's name in a question (e.g., "Jacob's longest run", "How far did Jacob run")
+ATHLETE_PATTERN = compile_regex(
+    r"\b(?:(?P<possessive>[A-Z][a-z\-]+)'s?|(?:did|has|does|for|by) (?P<name>[A-Z][a-z\-]+))\b"
+)
+NOT_ATHLETES = {"What", "Who", "Where", "When", "How", "That", "It", "There", "Here"}
+
+# Question keywords -> the query the local stand-in "generates" for them (first match wins)
+LOCAL_QUERIES = [
+    (
+        {"longest", "farthest", "furthest"},
+        "SELECT a.name, a.distance_mi, a.full_datetime\n"
+        "FROM strava_api.activities a{join}{where}\n"
+        "ORDER BY a.distance_mi DESC\nLIMIT 1",
+    ),
+    (
+        {"fastest", "pace", "quickest"},
+        "SELECT a.name, a.pace_min_mi, a.distance_mi, a.full_datetime\n"
+        "FROM strava_api.activities a{join}{where}\n"
+        "ORDER BY a.pace_min_mi ASC\nLIMIT 1",
+    ),
+    (
+        {"elevation", "climb", "climbed", "vert"},
+        "SELECT SUM(a.total_elev_gain_ft) AS total_elev_gain_ft\n"
+        "FROM strava_api.activities a{join}{where}",
+    ),
+    (
+        {"heart", "hr", "bpm"},
+        "SELECT AVG(a.hr_avg) AS avg_hr\nFROM strava_api.activities a{join}{where}",
+    ),
+    (
+        {"monthly", "month", "months"},
+        "SELECT a.year, a.month, SUM(a.distance_mi) AS distance_mi, COUNT(*) AS runs\n"
+        "FROM strava_api.activities a{join}{where}\n"
+        "GROUP BY a.year, a.month\nORDER BY a.year DESC, a.month DESC",
+    ),
+    (
+        {"many", "often", "count"},
+        "SELECT COUNT(*) AS runs\nFROM strava_api.activities a{join}{where}",
+    ),
+    (
+        {"miles", "mileage", "distance", "far", "total"},
+        "SELECT SUM(a.distance_mi) AS distance_mi\nFROM strava_api.activities a{join}{where}",
+    ),
+    (
+        {"recent", "last", "latest", "runs", "activities", "show", "list"},
+        "SELECT a.name, a.distance_mi, a.moving_time, a.full_datetime\n"
+        "FROM strava_api.activities a{join}{where}\n"
+        "ORDER BY a.full_datetime DESC\nLIMIT 10",
+    ),
+]
+ATHLETE_JOIN = "\nJOIN strava_api.athletes ath ON ath.athlete_id = a.athlete_id"
+ATHLETE_FILTER = "\nWHERE ath.athlete_name ILIKE '%{athlete}%'"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimates a text's token count (~4 characters per token).
+
+    :param text: The text.
+
+    :return: The estimated token count.
+    """
+    return max(1, len(text) // 4)
+
+
+def build_completion(
+    content: str, model: str, messages: list[dict[str, str]], seed: str
+) -> ChatCompletion:
+    """
+    Builds a chat completion (as the OpenAI API would return it) around a response.
+
+    :param content: The response content.
+    :param model: The model name.
+    :param messages: The request messages (for the prompt token count).
+    :param seed: The text the completion ID is derived from.
+
+    :return: The chat completion.
+    """
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    completion_tokens = estimate_tokens(content)
+    return ChatCompletion(
+        id=f"chatcmpl-local-{sha256(seed.encode('utf-8')).hexdigest()[:24]}",
+        object="chat.completion",
+        created=int(time()),
+        model=model,
+        choices=[
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+        usage={
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    )
+
+
+async def stream_completion(
+    completion: ChatCompletion, delay: float = 0.0
+) -> AsyncIterator[ChatCompletionChunk]:
+    """
+    Streams a chat completion's content as chunks (one per word), followed by a final chunk
+    with the usage (as the OpenAI API does when asked to include it).
+
+    :param completion: The chat completion.
+    :param delay: The delay before each chunk, in seconds.
+
+    :return: An async iterator of chat completion chunks.
+    """
+    content = completion.choices[0].message.content or ""
+    words = content.split(" ")
+    for index, word in enumerate(words):
+        if delay:
+            await sleep(delay)
+        yield ChatCompletionChunk(
+            id=completion.id,
+            object="chat.completion.chunk",
+            created=completion.created,
+            model=completion.model,
+            choices=[
+                {
+                    "index": 0,
+                    "delta": {"content": word if index == 0 else f" {word}"},
+                    "finish_reason": "stop" if index == len(words) - 1 else None,
+                }
+            ],
+        )
+    yield ChatCompletionChunk(
+        id=completion.id,
+        object="chat.completion.chunk",
+        created=completion.created,
+        model=completion.model,
+        choices=[],
+        usage=completion.usage,
+    )
+
+
+class OpenAIBackend:
+    """
+    Sends chat requests to the OpenAI API.
+    """
+
+    def __init__(self, client: AsyncOpenAI = None):
+        """
+        Initializes the OpenAI backend.
+
+        :param client: The async OpenAI client.
+
+        :return: None
+        """
+        self.client: AsyncOpenAI = client or AsyncOpenAI(
+            api_key=getenv("OPENAI_API_KEY")
+        )
+
+    async def create(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        stream: bool = False,
+        store: bool = True,
+        temperature: float | None = None,
+    ) -> ChatCompletion | AsyncIterator[ChatCompletionChunk]:
+        """
+        Creates a chat completion.
+
+        :param model: The model to use.
+        :param messages: The messages to process.
+        :param stream: Whether to stream the response.
+        :param store: Whether to store the messages in the completion.
+        :param temperature: The sampling temperature (the model's default, if not given).
+
+        :return: The chat completion (or a stream of chunks if streaming).
+        """
+        return await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=stream,
+            store=store,
+            temperature=NOT_GIVEN if temperature is None else temperature,
+            # Have the stream's final chunk report the token usage
+            stream_options={"include_usage": True} if stream else NOT_GIVEN,
+        )
+
+
+class LocalBackend:
+    """
+    A deterministic, offline stand-in for the OpenAI API, for load tests and benchmarks.
+
+    TAG prompts get a keyword-chosen query against the activities table, repair prompts get that
+    query back, and everything else gets a short canned answer. A configurable share of questions
+    first gets a query on an unknown table, so the validation and repair path is exercised too.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = None,
+        ms_per_token: float = None,
+        error_rate: float = None,
+    ):
+        """
+        Initializes the local backend.
+
+        :param latency_ms: The simulated latency of each request, in milliseconds.
+        :param ms_per_token: The simulated generation time per completion token, in milliseconds.
+        :param error_rate: The share of questions (0-1) whose first generated query is broken.
+
+        :return: None
+        """
+        self.latency_ms: float = (
+            float(getenv("LOCAL_LLM_LATENCY_MS", "0"))
+            if latency_ms is None
+            else latency_ms
+        )
+        self.ms_per_token: float = (
+            float(getenv("LOCAL_LLM_MS_PER_TOKEN", "0"))
+            if ms_per_token is None
+            else ms_per_token
+        )
+        self.error_rate: float = (
+            float(getenv("LOCAL_LLM_ERROR_RATE", "0"))
+            if error_rate is None
+            else error_rate
+        )
+
+    def build_query(self, question: str) -> str | None:
+        """
+        Picks the query for a question.
+
+        :param question: The user's question.
+
+        :return: The SQL query, or None if the question isn't about the data.
+        """
+        words = set(normalize_text(question).split())
+        for keywords, template in LOCAL_QUERIES:
+            if keywords & words:
+                break
+        else:
+            return None
+        athlete = None
+        for match in ATHLETE_PATTERN.finditer(question):
+            name = match.group("possessive") or match.group("name")
+            if name not in NOT_ATHLETES:
+                athlete = name
+                break
+        return template.format(
+            join=ATHLETE_JOIN if athlete else "",
+            where=ATHLETE_FILTER.format(athlete=athlete) if athlete else "",
+        )
+
+    def is_broken(self, question: str) -> bool:
+        """
+        Determines (deterministically) whether a question's first query should be broken.
+
+        :param question: The user's question.
+
+        :return: Whether to generate a broken query first.
+        """
+        bucket = crc32(normalize_text(question).encode("utf-8")) % 1000
+        return bucket < self.error_rate * 1000
+
+    def respond(self, messages: list[dict[str, str]]) -> str:
+        """
+        Writes the response to a request.
+
+        :param messages: The request messages.
+
+        :return: The response content.
+        """
+        prompt = messages[0]["content"] if messages else ""
+        if match := REPAIR_QUESTION_PATTERN.search(prompt):
+            query = self.build_query(match.group("question"))
+            return dumps(
+                {
+                    "query": query
+                    or "SELECT COUNT(*) AS runs\nFROM strava_api.activities"
+                }
+            )
+        if match := TAG_QUESTION_PATTERN.search(prompt):
+            question = match.group("question")
+            query = self.build_query(question)
+            if query is None:
+                return dumps(
+                    {
+                        "query": "",
+                        "confidence": "LOW",
+                        "follow_ups": "Could you tell me which runs (and which athlete) you're asking about?",
+                    }
+                )
+            if self.is_broken(question) and len(messages) == 1:
+                # Only the first attempt (the retries carry the error as a second message)
+                query = query.replace("strava_api.activities", "strava_api.activity", 1)
+            return dumps({"query": query, "confidence": "HIGH", "follow_ups": ""})
+        return (
+            "Here's what your training data shows, based on the results of the query. "
+            "Let me know if you'd like to dig into a specific run or time period."
+        )
+
+    async def create(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        stream: bool = False,
+        store: bool = True,
+        temperature: float | None = None,
+    ) -> ChatCompletion | AsyncIterator[ChatCompletionChunk]:
+        """
+        Creates a chat completion.
+
+        :param model: The model to use.
+        :param messages: The messages to process.
+        :param stream: Whether to stream the response.
+        :param store: Unused (kept for parity with the OpenAI backend).
+        :param temperature: Unused (the responses are deterministic).
+
+        :return: The chat completion (or a stream of chunks if streaming).
+        """
+        content = self.respond(messages)
+        completion = build_completion(
+            content=content,
+            model=model,
+            messages=messages,
+            seed=dumps(messages, sort_keys=True) + content,
+        )
+        generation_s = self.ms_per_token * completion.usage.completion_tokens / 1000
+        if self.latency_ms:
+            await sleep(self.latency_ms / 1000)
+        if stream:
+            words = len(content.split(" "))
+            return stream_completion(completion, delay=generation_s / words)
+        if generation_s:
+            await sleep(generation_s)
+        return completion
+
+
+class CassetteBackend:
+    """
+    Records chat completions from another backend to a cassette (a JSON Lines file) and replays
+    them, so a benchmark can be re-run against real model output without calling the API.
+
+    Requests are keyed on their model, messages, and temperature. Streamed requests are recorded
+    (and replayed) as whole completions and streamed back one word at a time.
+
+    Since the whole prompt is keyed on, a replay only hits if the prompts are the same as when
+    recording: anything that depends on earlier requests (the few-shot examples from the
+    ExampleIndex, the query cache) has to be disabled for both (`chat_benchmark` does so).
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        mode: str = None,
+        inner: OpenAIBackend | LocalBackend | None = None,
+    ):
+        """
+        Initializes the cassette backend.
+
+        :param path: The cassette's path.
+        :param mode: "record" (replay hits, record misses) or "replay" (fail on misses).
+        :param inner: The backend misses are recorded from (by default, the OpenAI API).
+
+        :return: None
+        """
+        self.path: Path = Path(
+            getenv("OPENAI_CASSETTE_PATH", "cassettes/chat.jsonl")
+            if path is None
+            else path
+        )
+        self.mode: str = (
+            getenv("OPENAI_CASSETTE_MODE", "replay") if mode is None else mode
+        )
+        if self.mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {self.mode}")
+        self.inner = inner
+        if self.inner is None and self.mode == "record":
+            self.inner = OpenAIBackend()
+        self.completions: dict[str, dict[str, Any]] = {}
+        self.lock = Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+        self.load()
+
+    def load(self) -> None:
+        """
+        Loads the cassette's recorded completions (if the cassette exists).
+
+        :return: None
+        """
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    entry = loads(line)
+                    self.completions[entry["key"]] = entry["completion"]
+        self.logger.info(f"Loaded {len(self.completions)} completions from {self.path}")
+
+    def build_key(
+        self, model: str, messages: list[dict[str, str]], temperature: float | None
+    ) -> str:
+        """
+        Builds the cassette key of a request.
+
+        :param model: The model.
+        :param messages: The messages.
+        :param temperature: The sampling temperature.
+
+        :return: The key.
+        """
+        request = dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            sort_keys=True,
+        )
+        return sha256(request.encode("utf-8")).hexdigest()
+
+    async def create(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        stream: bool = False,
+        store: bool = True,
+        temperature: float | None = None,
+    ) -> ChatCompletion | AsyncIterator[ChatCompletionChunk]:
+        """
+        Creates a chat completion, from the cassette if it was recorded.
+
+        :param model: The model to use.
+        :param messages: The messages to process.
+        :param stream: Whether to stream the response.
+        :param store: Whether to store the messages in the completion (when recording).
+        :param temperature: The sampling temperature (the model's default, if not given).
+
+        :return: The chat completion (or a stream of chunks if streaming).
+        """
+        key = self.build_key(model=model, messages=messages, temperature=temperature)
+        recorded = self.completions.get(key)
+        if recorded is not None:
+            self.hits += 1
+            completion = ChatCompletion(**recorded)
+        elif self.mode == "replay":
+            self.misses += 1
+            raise LookupError(
+                f"No recorded completion in {self.path} for this request (key {key[:12]})"
+            )
+        else:
+            self.misses += 1
+            completion = await self.inner.create(
+                model=model,
+                messages=messages,
+                stream=False,
+                store=store,
+                temperature=temperature,
+            )
+            await self.save(key, completion)
+        return stream_completion(completion) if stream else completion
+
+    async def save(self, key: str, completion: ChatCompletion) -> None:
+        """
+        Appends a completion to the cassette.
+
+        :param key: The request's cassette key.
+        :param completion: The chat completion.
+
+        :return: None
+        """
+        async with self.lock:
+            if key in self.completions:
+                return  # Recorded by a concurrent, identical request
+            self.completions[key] = completion.to_dict()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as cassette:
+                cassette.write(
+                    dumps({"key": key, "completion": self.completions[key]}) + "\n"
+                )
+
+
+def get_llm_backend(
+    client: AsyncOpenAI = None,
+) -> OpenAIBackend | LocalBackend | CassetteBackend:
+    """
+    Creates the LLM backend configured by the OPENAI_BACKEND environment variable: "openai" (the
+    default), "local" (the offline stand-in), or "record"/"replay" (a cassette at
+    OPENAI_CASSETTE_PATH).
+
+    :param client: The async OpenAI client (for the backends that call the API).
+
+    :return: The LLM backend.
+    """
+    backend = getenv("OPENAI_BACKEND", "openai").lower()
+    if backend == "local":
+        return LocalBackend()
+    if backend == "record":
+        return CassetteBackend(mode=backend, inner=OpenAIBackend(client=client))
+    if backend == "replay":
+        return CassetteBackend(mode=backend)
+    return OpenAIBackend(client=client)
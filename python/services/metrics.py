@@ -0,0 +1,128 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+# Latency buckets (in seconds), from sub-millisecond local stages to multi-second LLM calls
+LATENCY_BUCKETS = [
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+]  # fmt: skip
+ROW_BUCKETS = [0, 1, 5, 10, 25, 50, 100, 200, 500, 1000]
+RETRY_BUCKETS = [0, 1, 2, 3, 5]
+
+# Shared by the services (writers) and the /metrics endpoint (reader). Registering a second
+# metric under a name that's already taken raises a ValueError.
+registry = CollectorRegistry()
+
+# The chat pipeline's metrics
+chat_requests = Counter(
+    "chat_requests_total",
+    "Chat requests, by how they were answered.",
+    labelnames=("path",),
+    registry=registry,
+)
+chat_request_duration = Histogram(
+    "chat_request_duration_seconds",
+    "End-to-end chat request latency.",
+    labelnames=("path",),
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+chat_stage_duration = Histogram(
+    "chat_stage_duration_seconds",
+    "TAG pipeline stage latency (summed across a request's attempts).",
+    labelnames=("stage",),
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+chat_query_rows = Histogram(
+    "chat_query_rows",
+    "Rows returned by the executed query.",
+    buckets=ROW_BUCKETS,
+    registry=registry,
+)
+chat_query_attempts = Histogram(
+    "chat_query_attempts",
+    "Queries generated (or reused from the cache) per TAG pipeline.",
+    buckets=RETRY_BUCKETS,
+    registry=registry,
+)
+chat_query_repairs = Histogram(
+    "chat_query_repairs",
+    "Repair attempts per TAG pipeline.",
+    buckets=RETRY_BUCKETS,
+    registry=registry,
+)
+chat_llm_tokens = Counter(
+    "chat_llm_tokens_total",
+    "LLM tokens used, by call (generation, repair, synthesis) and kind (prompt, completion).",
+    labelnames=("call", "kind"),
+    registry=registry,
+)
+
+# The Strava sync's metrics
+SYNC_BUCKETS = [0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0]
+strava_syncs = Counter(
+    "strava_syncs_total",
+    "Athlete syncs, by outcome (complete, partial, or failed).",
+    labelnames=("status",),
+    registry=registry,
+)
+strava_sync_duration = Histogram(
+    "strava_sync_duration_seconds",
+    "Athlete sync latency.",
+    buckets=SYNC_BUCKETS,
+    registry=registry,
+)
+strava_sync_activities = Counter(
+    "strava_sync_activities_total",
+    "Runs handled by athlete syncs, by outcome (stored, or pending for a later sync).",
+    labelnames=("outcome",),
+    registry=registry,
+)
+strava_sync_round_athletes = Gauge(
+    "strava_sync_round_athletes",
+    "The current (or last) sync round's athletes, by state (total, done).",
+    labelnames=("state",),
+    registry=registry,
+)
+strava_sync_rounds = Counter(
+    "strava_sync_rounds_total",
+    "Sync rounds (walks over every athlete) finished.",
+    registry=registry,
+)
+# Computed at scrape time by the running scheduler (see `SyncScheduler`)
+strava_sync_lag = Gauge(
+    "strava_sync_lag_seconds",
+    "Time since the least recently (completely) synced athlete was last synced.",
+    registry=registry,
+)
+strava_token_requests = Counter(
+    "strava_token_requests_total",
+    "Strava access token lookups, by result (hit = cached, exchange = refreshed, error = rejected).",
+    labelnames=("result",),
+    registry=registry,
+)
+
+# The Strava webhook's metrics
+strava_webhook_events = Counter(
+    "strava_webhook_events_total",
+    "Strava push events received, by object and aspect type.",
+    labelnames=("object_type", "aspect_type"),
+    registry=registry,
+)
+strava_webhook_actions = Counter(
+    "strava_webhook_actions_total",
+    "Activities processed from push events, by outcome (upserted, deleted, renamed, pending, ...).",
+    labelnames=("outcome",),
+    registry=registry,
+)
+strava_webhook_latency = Histogram(
+    "strava_webhook_latency_seconds",
+    "Time from an activity's first queued push event to it being processed.",
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+# Computed at scrape time from the running processor's queue (see `StravaWebhookProcessor`)
+strava_webhook_queue_depth = Gauge(
+    "strava_webhook_queue_depth",
+    "Activities waiting to be processed from Strava push events.",
+    registry=registry,
+)
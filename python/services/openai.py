@@ -1,8 +1,15 @@
 from os import getenv
-from openai import OpenAI
-from openai.types.chat import ChatCompletion
+from typing import AsyncIterator
+from openai import OpenAI, AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
+from services.llm_backends import (
+    CassetteBackend,
+    LocalBackend,
+    OpenAIBackend,
+    get_llm_backend,
+)
 from utils.simple_logger import SimpleLogger
 
 
@@ -11,15 +18,25 @@ class OpenAIService:
     Handles all OpenAI API requests.
     """
 
-    def __init__(self, model: str = None):
+    def __init__(
+        self,
+        model: str = None,
+        backend: OpenAIBackend | LocalBackend | CassetteBackend = None,
+    ):
         """
         Initializes the OpenAI service.
 
         :param model: The model to use for processing the messages.
+        :param backend: The backend async requests are sent to (by default, the one configured by
+            OPENAI_BACKEND; see `get_llm_backend`).
 
         :return: None
         """
         self.client = OpenAI(api_key=getenv("OPENAI_API_KEY"))
+        self.async_client = AsyncOpenAI(api_key=getenv("OPENAI_API_KEY"))
+        self.backend: OpenAIBackend | LocalBackend | CassetteBackend = (
+            get_llm_backend(client=self.async_client) if backend is None else backend
+        )
         self.model: str = (
             getenv("OPENAI_MODEL", "gpt-4o-mini") if model is None else model
         )
@@ -48,3 +65,35 @@ class OpenAIService:
             model=model, messages=messages, stream=use_streaming, store=store
         )
         return response
+
+    async def aprocess_request(
+        self,
+        messages: list[dict[str, str]],
+        model: str = None,
+        use_streaming: bool = False,
+        store: bool = True,
+        temperature: float | None = None,
+    ) -> ChatCompletion | AsyncIterator[ChatCompletionChunk]:
+        """
+        Processes a chat request (with the configured backend) without blocking the event loop.
+
+        :param messages: The messages to process.
+        :param model: The model to use for processing the messages.
+        :param use_streaming: Whether to use streaming for processing the messages.
+        :param store: Whether to store the messages in the completion.
+        :param temperature: The sampling temperature (the model's default, if not given).
+
+        :return: The chat completion response (or a stream of chunks if streaming).
+        """
+        if model is None:
+            model = self.model
+        response: ChatCompletion | AsyncIterator[ChatCompletionChunk] = (
+            await self.backend.create(
+                model=model,
+                messages=messages,
+                stream=use_streaming,
+                store=store,
+                temperature=temperature,
+            )
+        )
+        return response
@@ -0,0 +1,201 @@
+from os import getenv
+from threading import Condition
+from time import monotonic
+
+from stravalib.exc import RateLimitExceeded
+from stravalib.util.limiter import (
+    get_rates_from_response_headers,
+    get_seconds_until_next_day,
+    get_seconds_until_next_quarter,
+)
+
+from utils.simple_logger import SimpleLogger
+
+
+class QuotaWindow:
+    """
+    A fixed rate-limit window (e.g., Strava's 15-minute or daily quota) as a token bucket: it
+    holds `limit` tokens, each request takes one, and it refills when the window resets.
+    """
+
+    def __init__(self, name: str, limit: int, seconds_until_reset):
+        """
+        Initializes the quota window.
+
+        :param name: The window's name (for logging).
+        :param limit: The number of requests allowed per window.
+        :param seconds_until_reset: A function returning the seconds until the window resets.
+
+        :return: None
+        """
+        self.name: str = name
+        self.limit: int = limit
+        self.used: int = 0
+        self.seconds_until_reset = seconds_until_reset
+        self.resets_at: float = monotonic() + seconds_until_reset() + 1
+
+    def roll(self, now: float) -> None:
+        """
+        Refills the bucket if the window has reset.
+
+        :param now: The current monotonic time.
+
+        :return: None
+        """
+        if now >= self.resets_at:
+            self.used = 0
+            self.resets_at = now + self.seconds_until_reset() + 1
+
+    def available(self, reserve: int) -> int:
+        """
+        The number of requests that can still be made in this window.
+
+        :param reserve: The number of requests held back (e.g., for interactive calls).
+
+        :return: The number of available tokens.
+        """
+        return self.limit - reserve - self.used
+
+
+class StravaRateLimiter:
+    """
+    Paces Strava API requests to the app's 15-minute and daily quotas, which are shared by every
+    athlete's client (and thread).
+
+    Each request takes a token from both windows up front (blocking until both have one), and
+    every response's rate-limit headers (X-ReadRateLimit-* / X-RateLimit-*) re-sync the buckets'
+    limits and usage with Strava's own counts. An instance is passed to the stravalib client as
+    its rate limiter, so the headers are seen on every call.
+    """
+
+    def __init__(
+        self,
+        short_limit: int = None,
+        long_limit: int = None,
+        reserve: int = None,
+    ):
+        """
+        Initializes the rate limiter.
+
+        :param short_limit: The 15-minute quota, until a response reports it.
+        :param long_limit: The daily quota, until a response reports it.
+        :param reserve: The number of requests per window held back for other (e.g., interactive) calls.
+
+        :return: None
+        """
+        self.short = QuotaWindow(
+            name="15-minute",
+            limit=(
+                int(getenv("STRAVA_RATE_LIMIT_15MIN", "100"))
+                if short_limit is None
+                else short_limit
+            ),
+            seconds_until_reset=get_seconds_until_next_quarter,
+        )
+        self.long = QuotaWindow(
+            name="daily",
+            limit=(
+                int(getenv("STRAVA_RATE_LIMIT_DAILY", "1000"))
+                if long_limit is None
+                else long_limit
+            ),
+            seconds_until_reset=get_seconds_until_next_day,
+        )
+        self.reserve: int = (
+            int(getenv("STRAVA_RATE_LIMIT_RESERVE", "2"))
+            if reserve is None
+            else reserve
+        )
+        self.condition = Condition()
+        self.waited_s: float = 0.0  # Total time spent paused on a quota
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def __call__(self, headers: dict[str, str], method: str) -> None:
+        """
+        Re-syncs the buckets with a response's rate-limit headers (called by stravalib).
+
+        :param headers: The response's headers.
+        :param method: The request's HTTP method.
+
+        :return: None
+        """
+        rates = get_rates_from_response_headers(headers, method)
+        if rates is None:
+            return
+        with self.condition:
+            now = monotonic()
+            for window, limit, usage in (
+                (self.short, rates.short_limit, rates.short_usage),
+                (self.long, rates.long_limit, rates.long_usage),
+            ):
+                window.roll(now)
+                window.limit = limit
+                # Requests still in flight aren't in Strava's count yet, so never lower ours
+                window.used = max(window.used, usage)
+            self.condition.notify_all()
+
+    def exhaust(self) -> None:
+        """
+        Marks the 15-minute window as used up (e.g., after a 429 response).
+
+        :return: None
+        """
+        with self.condition:
+            self.short.used = max(self.short.used, self.short.limit)
+
+    def daily_remaining(self) -> int:
+        """
+        The number of requests still available in the daily window (less the reserve).
+
+        :return: The number of requests.
+        """
+        with self.condition:
+            self.long.roll(monotonic())
+            return max(0, self.long.available(self.reserve))
+
+    def acquire(self, max_wait_s: float = None) -> float:
+        """
+        Takes a token from both windows, pausing until the exhausted window resets if needed.
+
+        :param max_wait_s: The longest pause to accept (unbounded, if not given).
+
+        :return: The seconds spent paused.
+
+        :raises RateLimitExceeded: If a pause longer than `max_wait_s` would be needed.
+        """
+        waited = 0.0
+        with self.condition:
+            while True:
+                now = monotonic()
+                self.short.roll(now)
+                self.long.roll(now)
+                exhausted = [
+                    window
+                    for window in (self.short, self.long)
+                    if window.available(self.reserve) <= 0
+                ]
+                if not exhausted:
+                    self.short.used += 1
+                    self.long.used += 1
+                    self.waited_s += waited
+                    return waited
+
+                wait = max(window.resets_at for window in exhausted) - now
+                if max_wait_s is not None and waited + wait > max_wait_s:
+                    self.waited_s += waited
+                    raise RateLimitExceeded(
+                        f"The Strava {exhausted[-1].name} quota is used up for {wait:.0f}s",
+                        timeout=wait,
+                        limit=exhausted[-1].limit,
+                    )
+                if not waited:
+                    self.logger.info(
+                        f"Strava {exhausted[-1].name} quota used up; pausing for {wait:.0f}s."
+                    )
+                start = monotonic()
+                self.condition.wait(timeout=wait)
+                waited += monotonic() - start
+
+
+# Shared by every StravaAPI client, since the quotas are per app (not per athlete)
+strava_rate_limiter = StravaRateLimiter()
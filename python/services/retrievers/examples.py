@@ -0,0 +1,121 @@
+from numpy import argpartition, empty, float32, ndarray, vstack
+from os import getenv
+from threading import Lock
+
+from services.cache import normalize_text
+from services.embeddings import (
+    HashingEmbedder,
+    SentenceTransformerEmbedder,
+    get_embedder,
+)
+from utils.simple_logger import SimpleLogger
+
+
+class ExampleIndex:
+    """
+    An in-memory vector index of past successful (question, executed SQL) pairs, used to pick
+    few-shot examples for the TAG prompt.
+
+    Embeddings live in one contiguous NumPy matrix (grown by doubling), so a search is a single
+    matrix-vector product plus a partial sort. Once full, the oldest examples are overwritten.
+    """
+
+    def __init__(
+        self,
+        embedder: HashingEmbedder | SentenceTransformerEmbedder = None,
+        max_size: int = None,
+    ):
+        """
+        Initializes the example index.
+
+        :param embedder: The embedder for questions.
+        :param max_size: The maximum number of examples kept.
+
+        :return: None
+        """
+        self.embedder = get_embedder() if embedder is None else embedder
+        self.max_size: int = (
+            int(getenv("TAG_EXAMPLE_INDEX_SIZE", "50000"))
+            if max_size is None
+            else max_size
+        )
+        self.vectors: ndarray = empty(
+            (min(1024, self.max_size), self.embedder.dim), dtype=float32
+        )
+        self.questions: list[str | None] = [None] * self.max_size
+        self.queries: list[str | None] = [None] * self.max_size
+        self.rows: dict[str, int] = {}  # Normalized question -> row
+        self.size: int = 0
+        self.next_row: int = 0
+        self.lock = Lock()
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def add(self, question: str, query: str) -> None:
+        """
+        Records a successful (question, executed SQL) pair. A repeat question replaces its
+        previous SQL.
+
+        :param question: The user's question.
+        :param query: The SQL query that was executed successfully for it.
+
+        :return: None
+        """
+        key = normalize_text(question)
+        if not key:
+            return
+        vector = self.embedder.embed([question])[0]
+        with self.lock:
+            row = self.rows.get(key)
+            if row is None:
+                row = self.next_row
+                evicted_question = self.questions[row]
+                if evicted_question is not None:
+                    self.rows.pop(normalize_text(evicted_question), None)
+                self.rows[key] = row
+                self.next_row = (self.next_row + 1) % self.max_size
+                self.size = min(self.size + 1, self.max_size)
+                if row >= len(self.vectors):
+                    capacity = min(2 * len(self.vectors), self.max_size)
+                    self.vectors = vstack(
+                        [
+                            self.vectors,
+                            empty(
+                                (capacity - len(self.vectors), self.embedder.dim),
+                                dtype=float32,
+                            ),
+                        ]
+                    )
+            self.vectors[row] = vector
+            self.questions[row] = question
+            self.queries[row] = query
+
+    def search(
+        self, question: str, k: int = 3, min_similarity: float = 0.0
+    ) -> list[tuple[str, str, float]]:
+        """
+        Finds the past examples most similar to a question.
+
+        :param question: The user's question.
+        :param k: The maximum number of examples to return.
+        :param min_similarity: The minimum cosine similarity of a returned example.
+
+        :return: The (question, SQL, similarity) triples, most similar first.
+        """
+        if k <= 0 or not self.size:
+            return []
+        vector = self.embedder.embed([question])[0]
+        with self.lock:
+            scores = self.vectors[: self.size] @ vector
+            if self.size > k:
+                top_rows = argpartition(scores, -k)[-k:]
+            else:
+                top_rows = range(self.size)
+            top_rows = sorted(top_rows, key=lambda row: scores[row], reverse=True)
+            return [
+                (self.questions[row], self.queries[row], float(scores[row]))
+                for row in top_rows
+                if scores[row] >= min_similarity
+            ]
+
+    def __len__(self) -> int:
+        return self.size
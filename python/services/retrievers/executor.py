@@ -0,0 +1,164 @@
+from os import getenv
+from sqlalchemy import text, Row, Any
+from sqlalchemy.orm import Session
+
+from services.database import DatabaseService
+from services.retrievers.sql_validator import SQLValidator
+from utils.simple_logger import SimpleLogger
+
+
+class QueryResult:
+    """
+    The (bounded) result of a TAG query.
+    """
+
+    def __init__(self, columns: list[str], rows: list[Row[Any]], truncated: bool):
+        """
+        Initializes the query result.
+
+        :param columns: The result's column names.
+        :param rows: The result rows (at most the executor's row cap).
+        :param truncated: Whether the query returned more rows than were fetched.
+
+        :return: None
+        """
+        self.columns: list[str] = columns
+        self.rows: list[Row[Any]] = rows
+        self.truncated: bool = truncated
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class QueryExecutor:
+    """
+    Executes TAG queries with a bounded cost: a server-side statement timeout, a row cap, and
+    rows streamed in batches from a server-side cursor (so a large result is never fully
+    materialized on either side).
+
+    Executions are blocking and are meant to be run in a worker thread. A running query can be
+    cancelled from another thread via the handle passed to `run`.
+    """
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        sql_validator: SQLValidator,
+        statement_timeout_ms: int = None,
+        max_rows: int = None,
+        batch_size: int = None,
+    ):
+        """
+        Initializes the query executor.
+
+        :param db_service: The database service.
+        :param sql_validator: The validator whose EXPLAIN cost check runs before each query.
+        :param statement_timeout_ms: The server-side statement timeout (0 for none).
+        :param max_rows: The maximum number of rows fetched per query.
+        :param batch_size: The number of rows fetched from the cursor per round trip.
+
+        :return: None
+        """
+        self.db_service: DatabaseService = db_service
+        self.sql_validator: SQLValidator = sql_validator
+        self.statement_timeout_ms: int = (
+            int(getenv("TAG_STATEMENT_TIMEOUT_MS", "5000"))
+            if statement_timeout_ms is None
+            else statement_timeout_ms
+        )
+        self.max_rows: int = (
+            int(getenv("TAG_MAX_RESULT_ROWS", "200")) if max_rows is None else max_rows
+        )
+        self.batch_size: int = (
+            int(getenv("TAG_FETCH_BATCH_SIZE", "100"))
+            if batch_size is None
+            else batch_size
+        )
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def set_statement_timeout(self, session: Session) -> None:
+        """
+        Sets the statement timeout for the session's current transaction only.
+
+        :param session: The database session.
+
+        :return: None
+        """
+        if self.statement_timeout_ms > 0:
+            # `SET LOCAL` can't take bind parameters; `set_config(..., true)` is its equivalent
+            session.execute(
+                text("SELECT set_config('statement_timeout', :timeout, true)"),
+                {"timeout": str(self.statement_timeout_ms)},
+            )
+
+    def run(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+        handle: dict[str, Any] | None = None,
+    ) -> QueryResult:
+        """
+        Runs a (validated) query and fetches up to the row cap of its results.
+
+        :param query: The SQL query to execute.
+        :param params: The query's bind parameters (if any).
+        :param handle: A dict that receives the DBAPI connection (as 'connection') while the
+                       query runs, so that it can be cancelled (see `cancel`).
+
+        :return: The query result.
+        """
+        session = self.db_service.get_session()
+        try:
+            self.set_statement_timeout(session)
+            if handle is not None:
+                handle["connection"] = session.connection().connection.dbapi_connection
+            self.sql_validator.check_cost(session=session, query=query, params=params)
+
+            result = session.execute(
+                text(query),
+                params or {},
+                execution_options={
+                    "stream_results": True,
+                    "max_row_buffer": self.batch_size,
+                },
+            )
+            rows: list[Row[Any]] = []
+            # Fetch one row past the cap to know whether the result was truncated
+            while len(rows) <= self.max_rows:
+                batch = result.fetchmany(
+                    min(self.batch_size, self.max_rows + 1 - len(rows))
+                )
+                if not batch:
+                    break
+                rows.extend(batch)
+            columns = list(result.keys())
+            result.close()
+
+            truncated = len(rows) > self.max_rows
+            if truncated:
+                self.logger.warning(
+                    f"Query result truncated to {self.max_rows} rows: {query}"
+                )
+            return QueryResult(
+                columns=columns, rows=rows[: self.max_rows], truncated=truncated
+            )
+        finally:
+            if handle is not None:
+                handle.pop("connection", None)
+            self.db_service.close_session()
+
+    def cancel(self, handle: dict[str, Any]) -> None:
+        """
+        Cancels the query running on the connection in the given handle (if any).
+
+        :param handle: The handle passed to `run`.
+
+        :return: None
+        """
+        connection = handle.get("connection")
+        if connection is not None:
+            self.logger.warning("Cancelling the running query.")
+            connection.cancel()
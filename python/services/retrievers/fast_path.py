@@ -0,0 +1,164 @@
+from asyncio import to_thread
+from random import choice
+from sqlalchemy import Any
+
+from models.base import APIResponsePayload
+from models.chat import ChatResponse, ChatResponseMeta, OpenAIMessage, RoleTypes
+from services.intent_router import Intent
+from services.retrievers.executor import QueryExecutor, QueryResult
+from utils.simple_logger import SimpleLogger
+
+# Per-athlete totals over a period (athletes without runs in it are still returned)
+TOTALS_QUERY = """
+SELECT a.athlete_name,
+       COALESCE(SUM(act.distance_mi), 0) AS total_miles,
+       COUNT(act.activity_id) AS num_runs
+FROM strava_api.athletes a
+LEFT JOIN strava_api.activities act
+       ON act.athlete_id = a.athlete_id
+      AND act.full_datetime >= :start
+      AND act.full_datetime < :end
+WHERE a.athlete_name ILIKE :athlete
+GROUP BY a.athlete_name
+ORDER BY a.athlete_name
+"""
+
+# Per-athlete longest run, optionally within a period
+LONGEST_RUN_QUERY = """
+SELECT DISTINCT ON (a.athlete_name)
+       a.athlete_name, act.name, act.distance_mi, act.moving_time, act.full_datetime
+FROM strava_api.athletes a
+LEFT JOIN strava_api.activities act
+       ON act.athlete_id = a.athlete_id
+      AND (CAST(:start AS TIMESTAMP) IS NULL OR act.full_datetime >= :start)
+      AND (CAST(:end AS TIMESTAMP) IS NULL OR act.full_datetime < :end)
+WHERE a.athlete_name ILIKE :athlete
+ORDER BY a.athlete_name, act.distance_mi DESC NULLS LAST
+"""
+
+QUERIES = {
+    "mileage": TOTALS_QUERY,
+    "run_count": TOTALS_QUERY,
+    "longest_run": LONGEST_RUN_QUERY,
+}
+
+GREETINGS = [
+    'Hi! Ask me anything about your training, e.g., "How many miles did Jacob run this week?"',
+    "Hey there! I can answer questions about your runs, like \"What's Jacob's longest run?\"",
+    "Hello! What would you like to know about your training?",
+]
+
+
+class FastPathRetriever:
+    """
+    Answers routed intents (see `IntentRouter`) with parameterized SQL templates and templated
+    sentences, without calling the LLM.
+    """
+
+    def __init__(self, query_executor: QueryExecutor):
+        """
+        Initializes the fast-path retriever.
+
+        :param query_executor: The bounded executor of queries.
+
+        :return: None
+        """
+        self.query_executor: QueryExecutor = query_executor
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def build_params(self, intent: Intent) -> dict[str, Any]:
+        """
+        Builds the bind parameters of an intent's SQL template.
+
+        :param intent: The routed intent.
+
+        :return: The bind parameters.
+        """
+        escaped_name = (
+            intent.athlete.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_")
+        )
+        return {
+            "athlete": f"%{escaped_name}%",
+            "start": intent.period.start if intent.period else None,
+            "end": intent.period.end if intent.period else None,
+        }
+
+    def format_answer(self, intent: Intent, result: QueryResult) -> str:
+        """
+        Phrases the answer to an intent from its query result.
+
+        :param intent: The routed intent.
+        :param result: The query result (one row per matching athlete).
+
+        :return: The answer.
+        """
+        label = f" {intent.period.label}" if intent.period else ""
+        lines = []
+        for row in result.rows:
+            if intent.name == "longest_run":
+                if row.distance_mi is None:
+                    lines.append(f"{row.athlete_name} has no runs logged{label}.")
+                    continue
+                run_date = (
+                    f" on {row.full_datetime:%B %d, %Y}" if row.full_datetime else ""
+                )
+                lines.append(
+                    f"{row.athlete_name}'s longest run{label} was "
+                    f'"{row.name}"{run_date}: {row.distance_mi:.2f} miles in {row.moving_time}.'
+                )
+            elif row.num_runs == 0:
+                lines.append(f"{row.athlete_name} has no runs logged{label}.")
+            elif intent.name == "mileage":
+                runs = f"{row.num_runs} run{'s' if row.num_runs != 1 else ''}"
+                lines.append(
+                    f"{row.athlete_name} ran {row.total_miles:.2f} miles{label} ({runs})."
+                )
+            else:
+                runs = f"{row.num_runs} run{'s' if row.num_runs != 1 else ''}"
+                lines.append(
+                    f"{row.athlete_name} logged {runs}{label}, totaling "
+                    f"{row.total_miles:.2f} miles."
+                )
+        return "\n".join(lines)
+
+    async def answer(self, intent: Intent) -> tuple[str, str | None] | None:
+        """
+        Answers a routed intent.
+
+        :param intent: The routed intent.
+
+        :return: The answer and the executed query (if any), or None if the intent can't be
+                 answered locally (e.g., no athlete has the given name).
+        """
+        if intent.name == "greeting":
+            return choice(GREETINGS), None
+
+        query = QUERIES[intent.name]
+        result = await to_thread(
+            self.query_executor.run, query=query, params=self.build_params(intent)
+        )
+        if not result.rows:
+            self.logger.debug(f"No athlete matched '{intent.athlete}'.")
+            return None
+        return self.format_answer(intent=intent, result=result), query.strip()
+
+    async def process(
+        self, intent: Intent
+    ) -> APIResponsePayload[ChatResponse, ChatResponseMeta] | None:
+        """
+        Answers a routed intent and returns the response payload.
+
+        :param intent: The routed intent.
+
+        :return: The response payload, or None if the intent can't be answered locally.
+        """
+        answer = await self.answer(intent)
+        if answer is None:
+            return None
+        content, executed_query = answer
+        return APIResponsePayload(
+            data=ChatResponse(
+                response=OpenAIMessage(role=RoleTypes.ASSISTANT, content=content)
+            ),
+            meta=ChatResponseMeta(completion_id=None, executed_query=executed_query),
+        )
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Iterator
+
+from models.chat import PipelineMetrics
+
+
+class TAGPipelineState:
+    """
+    The state of a single TAG pipeline run (i.e., one user question).
+
+    This is created per request and threaded through the pipeline's stages, so that concurrent
+    chats never see each other's errors (which are fed back to the LLM as repair hints).
+    """
+
+    def __init__(self, question: str):
+        """
+        Initializes the pipeline state.
+
+        :param question: The user's question.
+
+        :return: None
+        """
+        self.question: str = question
+        self.errors: list[str] = []
+        self.attempts: int = 0  # Queries generated (or reused from the cache)
+        self.repairs: int = 0  # Repair attempts (counted against the repair budget)
+        self.timings: dict[str, float] = {}  # Stage -> seconds (summed across attempts)
+        self.usage: dict[str, dict[str, int]] = {}  # LLM call -> token kind -> tokens
+        self.rows: int | None = None  # Rows returned by the executed query
+        self.started_at: float = perf_counter()
+
+    @property
+    def last_error(self) -> str | None:
+        """
+        The most recent error (the repair hint for the next attempt), if any.
+        """
+        return self.errors[-1] if self.errors else None
+
+    def record_error(self, error: str) -> None:
+        """
+        Records an error from the current attempt.
+
+        :param error: The error message.
+
+        :return: None
+        """
+        self.errors.append(error)
+
+    def record_usage(self, call: str, usage: Any) -> None:
+        """
+        Records an LLM call's token usage.
+
+        :param call: The call's name (e.g., "generation").
+        :param usage: The completion's (or final stream chunk's) usage, if reported.
+
+        :return: None
+        """
+        if usage is None:
+            return
+        tokens = self.usage.setdefault(call, {"prompt": 0, "completion": 0})
+        tokens["prompt"] += usage.prompt_tokens or 0
+        tokens["completion"] += usage.completion_tokens or 0
+
+    @property
+    def elapsed(self) -> float:
+        """
+        The seconds since the run started.
+        """
+        return perf_counter() - self.started_at
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """
+        Times a pipeline stage.
+
+        :param stage: The stage's name (e.g., "generation").
+
+        :return: A context manager that adds the elapsed time to the stage's total.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + (
+                perf_counter() - start
+            )
+
+    def to_metrics(self) -> PipelineMetrics:
+        """
+        Converts the run's timings and token usage to the response metadata model.
+
+        :return: The pipeline metrics.
+        """
+        return PipelineMetrics(
+            timings={
+                stage: round(seconds, 6) for stage, seconds in self.timings.items()
+            },
+            tokens=self.usage,
+            attempts=self.attempts,
+            repairs=self.repairs,
+            rows=self.rows,
+            total=round(self.elapsed, 6),
+        )
+
+    def summary(self) -> str:
+        """
+        Summarizes the run for logging.
+
+        :return: The summary (e.g., "attempts=2, repairs=1, errors=1, tokens=812, total=1.234s, ...").
+        """
+        timings = ", ".join(
+            f"{stage}={seconds:.3f}s" for stage, seconds in self.timings.items()
+        )
+        tokens = sum(sum(kinds.values()) for kinds in self.usage.values())
+        return (
+            f"attempts={self.attempts}, repairs={self.repairs}, errors={len(self.errors)}, "
+            f"rows={self.rows}, tokens={tokens}, total={self.elapsed:.3f}s"
+            + (f", {timings}" if timings else "")
+        )
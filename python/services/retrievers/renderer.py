@@ -0,0 +1,145 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from os import getenv
+from typing import Any
+
+from services.cache import normalize_text
+from services.retrievers.executor import QueryResult
+
+# Column-name unit suffixes -> their label (longest first)
+UNIT_SUFFIXES = [
+    ("_min_mi", "min/mi"),
+    ("_ft_s", "ft/s"),
+    ("_mi", "mi"),
+    ("_ft", "ft"),
+    ("_s", "s"),
+]
+
+# Words that ask for more than the data itself (analysis, advice, or explanation)
+SYNTHESIS_WORDS = {
+    "why", "explain", "analyze", "analyse", "analysis", "compare", "comparison", "trend",
+    "trends", "summarize", "summary", "insight", "insights", "should", "recommend",
+    "advice", "improve", "improving", "better", "worse", "tell", "describe",
+}  # fmt: skip
+
+
+def format_value(value: Any) -> str:
+    """
+    Formats a result value for display.
+
+    :param value: The value.
+
+    :return: The formatted value.
+    """
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, (float, Decimal)):
+        return f"{value:,.2f}".rstrip("0").rstrip(".") if value % 1 else f"{value:,.0f}"
+    if isinstance(value, int):
+        return f"{value:,}" if abs(value) >= 10000 else str(value)
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, (date, time, timedelta)):
+        return str(value)
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def format_label(column: str) -> str:
+    """
+    Formats a column name as a label (e.g., "distance_mi" -> "Distance (mi)").
+
+    :param column: The column name.
+
+    :return: The label.
+    """
+    unit = None
+    for suffix, suffix_unit in UNIT_SUFFIXES:
+        if column.endswith(suffix) and len(column) > len(suffix):
+            column, unit = column[: -len(suffix)], suffix_unit
+            break
+    label = column.replace("_", " ").strip().capitalize()
+    return f"{label} ({unit})" if unit else label
+
+
+class ResultRenderer:
+    """
+    Renders common query-result shapes (no rows, a single value, or a small table) as a templated
+    sentence and a Markdown table, so that the answer-synthesis LLM call can be skipped.
+    """
+
+    def __init__(self, max_rows: int = None, max_columns: int = None):
+        """
+        Initializes the result renderer.
+
+        :param max_rows: The largest result (in rows) rendered locally.
+        :param max_columns: The widest result (in columns) rendered locally.
+
+        :return: None
+        """
+        self.max_rows: int = (
+            int(getenv("TAG_RENDER_MAX_ROWS", "50")) if max_rows is None else max_rows
+        )
+        self.max_columns: int = (
+            int(getenv("TAG_RENDER_MAX_COLUMNS", "8"))
+            if max_columns is None
+            else max_columns
+        )
+
+    def needs_synthesis(self, question: str) -> bool:
+        """
+        Determines whether a question asks for more than the data (e.g., an explanation).
+
+        :param question: The user's question.
+
+        :return: Whether the answer should be written by the LLM.
+        """
+        return bool(SYNTHESIS_WORDS & set(normalize_text(question).split()))
+
+    def build_table(self, columns: list[str], rows: list[Any]) -> str:
+        """
+        Builds a Markdown table.
+
+        :param columns: The column names.
+        :param rows: The rows.
+
+        :return: The Markdown table.
+        """
+        header = f"| {' | '.join(format_label(column) for column in columns)} |"
+        divider = f"|{'|'.join('---' for _ in columns)}|"
+        body = [
+            f"| {' | '.join(format_value(value) for value in row)} |" for row in rows
+        ]
+        return "\n".join([header, divider, *body])
+
+    def render(self, question: str, result: QueryResult) -> str | None:
+        """
+        Renders a query result as the answer to a question.
+
+        :param question: The user's question.
+        :param result: The query result.
+
+        :return: The answer, or None if the result (or question) needs the LLM.
+        """
+        if self.needs_synthesis(question):
+            return None
+        columns, rows = result.columns, result.rows
+        if not rows:
+            return "I couldn't find any data matching your question."
+        if len(columns) > self.max_columns or len(rows) > self.max_rows:
+            return None
+
+        if len(rows) == 1 and len(columns) == 1:
+            return f"{format_label(columns[0])}: **{format_value(rows[0][0])}**"
+        if len(rows) == 1:
+            answer = "Here's what I found:"
+        else:
+            answer = f"Here are the {len(rows)} results I found:"
+        answer = f"{answer}\n\n{self.build_table(columns, rows)}"
+        if result.truncated:
+            answer += (
+                f"\n\nOnly the first {len(rows)} rows are shown. Try narrowing your "
+                "question (e.g., to a date range) to see the rest."
+            )
+        return answer
@@ -0,0 +1,147 @@
+from json import loads
+from os import getenv
+
+from prompts.repair import repair_prompt
+from models.chat import RepairedQueryOutput, RoleTypes
+from models.exceptions import QueryGenerationException
+from services.openai import OpenAIService
+from services.retrievers.pipeline import TAGPipelineState
+from services.retrievers.schema import SchemaDescriber
+from utils.simple_logger import SimpleLogger
+
+
+class SQLRepairer:
+    """
+    Repairs a failing generated query with a small, delta-only prompt: the failing SQL, the error,
+    and the schema fragment relevant to them (rather than re-sending the full TAG prompt).
+
+    Also keeps the counters of how many repairs pipelines needed.
+    """
+
+    def __init__(
+        self,
+        openai_client: OpenAIService,
+        schema_describer: SchemaDescriber,
+        budget: int = None,
+    ):
+        """
+        Initializes the SQL repairer.
+
+        :param openai_client: The OpenAI service.
+        :param schema_describer: The generator of (pruned) schema descriptions.
+        :param budget: The maximum number of repair attempts per request.
+
+        :return: None
+        """
+        self.openai_service: OpenAIService = openai_client
+        self.schema_describer: SchemaDescriber = schema_describer
+        self.budget: int = (
+            int(getenv("TAG_REPAIR_BUDGET", "3")) if budget is None else budget
+        )
+        self.pipelines: int = 0
+        self.first_try: int = 0
+        self.repaired: int = 0
+        self.exhausted: int = 0
+        self.repair_attempts: int = 0
+        self.repairs_used: dict[int, int] = {}
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def build_schema_fragment(self, question: str, query: str, error: str) -> str:
+        """
+        Describes the part of the schema relevant to a failing query.
+
+        :param question: The user's question.
+        :param query: The failing SQL query.
+        :param error: The error message.
+
+        :return: The schema description.
+        """
+        # Split identifiers (e.g., 'distance_mi') so they match column keywords
+        relevance_text = f"{question} {query} {error}".replace("_", " ")
+        return self.schema_describer.describe_for(relevance_text)
+
+    async def repair(
+        self,
+        question: str,
+        query: str,
+        error: str,
+        gpt_model: str = None,
+        state: TAGPipelineState = None,
+    ) -> tuple[str, str]:
+        """
+        Asks the LLM to fix a failing query.
+
+        :param question: The user's question.
+        :param query: The failing SQL query.
+        :param error: The error message (from validation or the database).
+        :param gpt_model: The GPT model to use for the repair (e.g., "gpt-4o-mini").
+        :param state: The request's pipeline state (for the token usage), if any.
+
+        :return: The repaired query and the completion ID.
+        """
+        self.repair_attempts += 1
+        llm_messages = [
+            {
+                "role": RoleTypes.DEVELOPER,
+                "content": repair_prompt.format(
+                    user_question=question,
+                    query=query,
+                    error=error,
+                    schema_description=self.build_schema_fragment(
+                        question=question, query=query, error=error
+                    ),
+                ),
+            }
+        ]
+        repair_result = await self.openai_service.aprocess_request(
+            messages=llm_messages,
+            model=gpt_model if gpt_model else self.openai_service.model,
+        )
+        if state is not None:
+            state.record_usage("repair", repair_result.usage)
+        content = repair_result.choices[0].message.content
+        try:
+            output = RepairedQueryOutput.parse_obj(
+                loads(content.replace("```json", "").replace("```", ""))
+            )
+        except Exception as e:
+            error_msg = f"An error occurred during query repair: {content}. Here is the error: {e}"
+            self.logger.error(error_msg)
+            raise QueryGenerationException(message=error_msg)
+        return output.query, repair_result.id
+
+    def record(self, repairs_used: int, succeeded: bool) -> None:
+        """
+        Records the outcome of a pipeline's query.
+
+        :param repairs_used: The number of repair attempts the pipeline used.
+        :param succeeded: Whether the pipeline ended up with a working query.
+
+        :return: None
+        """
+        self.pipelines += 1
+        self.repairs_used[repairs_used] = self.repairs_used.get(repairs_used, 0) + 1
+        if not succeeded:
+            self.exhausted += 1
+        elif repairs_used:
+            self.repaired += 1
+        else:
+            self.first_try += 1
+
+    def stats(self) -> dict[str, int | dict[str, int]]:
+        """
+        Returns the repair counters.
+
+        :return: The repair statistics.
+        """
+        return {
+            "pipelines": self.pipelines,
+            "first_try": self.first_try,
+            "repaired": self.repaired,
+            "exhausted": self.exhausted,
+            "repair_attempts": self.repair_attempts,
+            "repairs_used": {
+                str(repairs): count
+                for repairs, count in sorted(self.repairs_used.items())
+            },
+        }
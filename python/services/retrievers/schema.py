@@ -0,0 +1,133 @@
+from functools import lru_cache
+from sqlalchemy import MetaData, Table
+
+from models.athlete import Base, describe_table
+from services.cache import normalize_text
+
+
+def stem(word: str) -> str:
+    """
+    Reduces a word to a crude stem for keyword matching (e.g., "miles" -> "mile").
+
+    :param word: The (normalized) word.
+
+    :return: The stem.
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return f"{word[:-3]}y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class SchemaDescriber:
+    """
+    Generates the TAG prompt's schema description from the ORM table metadata, optionally pruned
+    to the tables and columns relevant to a question.
+
+    Column descriptions come from each column's `comment`, and relevance from the `keywords` in
+    its `info` (plus the words of its name). Keys and columns flagged `always_include` are always
+    described, since nearly every query filters or joins on them.
+    """
+
+    def __init__(self, metadata: MetaData = Base.metadata):
+        """
+        Initializes the schema describer.
+
+        :param metadata: The metadata of the tables to describe.
+
+        :return: None
+        """
+        self.tables: list[Table] = list(metadata.sorted_tables)
+        self.full_description: str = "\n".join(
+            describe_table(table) for table in self.tables
+        )
+        # Single characters are skipped (e.g., the 's' unit suffix in 'moving_time_s')
+        self.keywords: dict[tuple[str, str], set[str]] = {
+            (table.fullname, column.name): {
+                stem(keyword)
+                for keyword in [
+                    *column.name.split("_"),
+                    *column.info.get("keywords", []),
+                ]
+                if len(keyword) > 1
+            }
+            for table in self.tables
+            for column in table.columns
+        }
+
+    def describe(self) -> str:
+        """
+        Describes the full schema.
+
+        :return: The schema description.
+        """
+        return self.full_description
+
+    def is_always_included(self, table: Table, column_name: str) -> bool:
+        """
+        Determines whether a column is described regardless of the question.
+
+        :param table: The table.
+        :param column_name: The column name.
+
+        :return: Whether the column is always included.
+        """
+        column = table.columns[column_name]
+        return (
+            column.primary_key
+            or bool(column.foreign_keys)
+            or column.info.get("always_include", False)
+        )
+
+    def select_columns(self, question: str) -> dict[str, tuple[str, ...]] | None:
+        """
+        Selects the columns relevant to a question.
+
+        :param question: The user's question (optionally with recent conversation turns).
+
+        :return: The relevant column names per table, or None if nothing beyond the always-included
+                 columns matched (i.e., the full schema should be used).
+        """
+        words = {stem(word) for word in normalize_text(question).split()}
+        selected: dict[str, tuple[str, ...]] = {}
+        any_matched = False
+        for table in self.tables:
+            column_names = []
+            for column in table.columns:
+                matched = bool(self.keywords[(table.fullname, column.name)] & words)
+                any_matched = any_matched or matched
+                if matched or self.is_always_included(table, column.name):
+                    column_names.append(column.name)
+            selected[table.fullname] = tuple(column_names)
+        return selected if any_matched else None
+
+    def describe_for(self, question: str) -> str:
+        """
+        Describes the part of the schema relevant to a question, falling back to the full schema.
+
+        :param question: The user's question (optionally with recent conversation turns).
+
+        :return: The schema description.
+        """
+        selected = self.select_columns(question)
+        if selected is None:
+            return self.full_description
+        return self.describe_selection(tuple(sorted(selected.items())))
+
+    @lru_cache(maxsize=256)
+    def describe_selection(
+        self, selection: tuple[tuple[str, tuple[str, ...]], ...]
+    ) -> str:
+        """
+        Describes a selection of columns (cached, since the same selections recur).
+
+        :param selection: The (table name, column names) pairs.
+
+        :return: The schema description.
+        """
+        column_names = dict(selection)
+        return "\n".join(
+            describe_table(table, column_names=list(column_names[table.fullname]))
+            for table in self.tables
+        )
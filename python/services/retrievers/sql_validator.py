@@ -0,0 +1,416 @@
+from os import getenv
+from re import DOTALL, VERBOSE, compile as compile_regex
+from sqlalchemy import Any, MetaData, text
+from sqlalchemy.orm import Session
+
+from models.athlete import Base
+from models.exceptions import QueryValidationException
+
+TOKEN_PATTERN = compile_regex(
+    r"""
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[EeBbXxNn]?'(?:[^']|'')*')
+    | (?P<dollar_string>\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+    | (?P<quoted_identifier>"(?:[^"]|"")+")
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    | (?P<identifier>[A-Za-z_][A-Za-z_0-9$]*)
+    | (?P<parameter>\$\d+)
+    | (?P<operator>::|<>|!=|>=|<=|\|\||[-+*/%^<>=~!@#&|.,;:()\[\]])
+    """,
+    VERBOSE | DOTALL,
+)
+
+# Statements/clauses that write, lock, or change session state
+FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "DROP", "ALTER", "CREATE",
+    "TRUNCATE", "GRANT", "REVOKE", "COPY", "VACUUM", "CALL", "DO", "EXECUTE",
+    "LOCK", "REINDEX", "CLUSTER", "COMMENT", "SET", "RESET", "REFRESH", "LISTEN",
+    "NOTIFY", "PREPARE", "DEALLOCATE", "DISCARD", "INTO", "SECURITY", "OWNER",
+}  # fmt: skip
+
+# Functions with side effects (or that read server files or sleep)
+FORBIDDEN_FUNCTIONS = {
+    "PG_SLEEP", "PG_SLEEP_FOR", "PG_SLEEP_UNTIL", "PG_READ_FILE", "PG_READ_BINARY_FILE",
+    "PG_LS_DIR", "PG_STAT_FILE", "PG_TERMINATE_BACKEND", "PG_CANCEL_BACKEND",
+    "PG_RELOAD_CONF", "PG_ROTATE_LOGFILE", "LO_IMPORT", "LO_EXPORT", "SET_CONFIG",
+    "DBLINK", "DBLINK_EXEC", "NEXTVAL", "SETVAL",
+}  # fmt: skip
+
+# Words that may appear unqualified in a SELECT without being column references
+SQL_WORDS = {
+    "SELECT", "WITH", "RECURSIVE", "AS", "FROM", "WHERE", "AND", "OR", "NOT", "IN",
+    "IS", "NULL", "TRUE", "FALSE", "LIKE", "ILIKE", "SIMILAR", "TO", "BETWEEN",
+    "EXISTS", "ANY", "ALL", "SOME", "CASE", "WHEN", "THEN", "ELSE", "END", "JOIN",
+    "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "LATERAL", "ON",
+    "USING", "GROUP", "BY", "HAVING", "ORDER", "ASC", "DESC", "NULLS", "FIRST", "LAST",
+    "LIMIT", "OFFSET", "FETCH", "NEXT", "ROW", "ROWS", "ONLY", "TIES", "UNION",
+    "INTERSECT", "EXCEPT", "DISTINCT", "OVER", "PARTITION", "WINDOW", "RANGE",
+    "GROUPS", "PRECEDING", "FOLLOWING", "UNBOUNDED", "CURRENT", "FILTER", "WITHIN",
+    "AT", "TIME", "ZONE", "INTERVAL", "CURRENT_DATE", "CURRENT_TIME",
+    "CURRENT_TIMESTAMP", "LOCALTIME", "LOCALTIMESTAMP", "CAST", "EXTRACT", "ESCAPE",
+    "COLLATE", "DATE", "TIMESTAMP", "TIMESTAMPTZ", "TIMETZ", "NUMERIC", "DECIMAL",
+    "INTEGER", "INT", "BIGINT", "SMALLINT", "FLOAT", "REAL", "DOUBLE", "PRECISION",
+    "TEXT", "VARCHAR", "CHAR", "CHARACTER", "VARYING", "BOOLEAN", "BOOL", "CENTURY",
+    "DECADE", "YEAR", "QUARTER", "MONTH", "WEEK", "DAY", "HOUR", "MINUTE", "SECOND",
+    "MILLISECOND", "MICROSECOND", "DOW", "ISODOW", "DOY", "EPOCH", "ISOYEAR", "DAYS",
+    "HOURS", "MINUTES", "SECONDS", "MONTHS", "YEARS", "WEEKS", "VALUES",
+}  # fmt: skip
+
+# Clauses that end a FROM list
+CLAUSE_KEYWORDS = {
+    "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "FETCH", "UNION",
+    "INTERSECT", "EXCEPT", "WINDOW", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT",
+    "FULL", "CROSS", "NATURAL", "LATERAL",
+}  # fmt: skip
+
+
+class Token:
+    """
+    A lexical SQL token.
+    """
+
+    def __init__(self, kind: str, value: str, start: int, end: int):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+        self.upper = value.upper() if kind == "identifier" else value
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r})"
+
+
+class SQLValidator:
+    """
+    Validates (and, where it's safe, repairs) LLM-generated SQL locally, before it reaches the
+    database.
+
+    A query must be a single read-only SELECT (or WITH ... SELECT) statement whose tables and
+    qualified column references exist in the ORM metadata. Unqualified columns are checked too
+    when the query reads only known tables (no CTEs or derived tables). Bare table names are
+    qualified with their schema, and a LIMIT is added when the query has none. Optionally, the
+    planner's cost estimate (via EXPLAIN) is checked against a ceiling.
+    """
+
+    def __init__(
+        self,
+        metadata: MetaData = Base.metadata,
+        default_limit: int = None,
+        max_cost: float = None,
+    ):
+        """
+        Initializes the SQL validator.
+
+        :param metadata: The metadata of the tables queries may read.
+        :param default_limit: The LIMIT added to queries without one (0 to not add one).
+        :param max_cost: The maximum planner cost estimate allowed (0 to skip the EXPLAIN check).
+
+        :return: None
+        """
+        self.default_limit: int = (
+            int(getenv("TAG_SQL_DEFAULT_LIMIT", "500"))
+            if default_limit is None
+            else default_limit
+        )
+        self.max_cost: float = (
+            float(getenv("TAG_SQL_MAX_COST", "0")) if max_cost is None else max_cost
+        )
+        self.tables: dict[str, set[str]] = {
+            table.fullname.lower(): {column.name.lower() for column in table.columns}
+            for table in metadata.sorted_tables
+        }
+        # Bare table name -> fully-qualified name
+        self.qualified_names: dict[str, str] = {
+            fullname.split(".")[-1]: fullname for fullname in self.tables
+        }
+
+    def tokenize(self, query: str) -> list[Token]:
+        """
+        Splits a query into tokens (whitespace and comments dropped).
+
+        :param query: The SQL query.
+
+        :return: The tokens.
+        """
+        tokens: list[Token] = []
+        position = 0
+        while position < len(query):
+            match = TOKEN_PATTERN.match(query, position)
+            if not match:
+                raise QueryValidationException(
+                    message=f"Unterminated literal or unexpected character near: {query[position:position + 20]!r}"
+                )
+            kind = match.lastgroup if match.lastgroup != "tag" else "dollar_string"
+            if kind not in ("space", "comment"):
+                tokens.append(Token(kind, match.group(), match.start(), match.end()))
+            position = match.end()
+        return tokens
+
+    def read_name(self, tokens: list[Token], index: int) -> tuple[str | None, int]:
+        """
+        Reads a (possibly schema-qualified) name starting at the given token.
+
+        :param tokens: The tokens.
+        :param index: The index of the name's first token.
+
+        :return: The lowercased name (or None if there's no name there) and the index after it.
+        """
+        parts = []
+        while index < len(tokens) and tokens[index].kind in (
+            "identifier",
+            "quoted_identifier",
+        ):
+            token = tokens[index]
+            parts.append(
+                token.value.strip('"')
+                if token.kind == "quoted_identifier"
+                else token.value.lower()
+            )
+            if (
+                index + 2 < len(tokens)
+                and tokens[index + 1].value == "."
+                and tokens[index + 2].kind in ("identifier", "quoted_identifier")
+            ):
+                index += 2
+                continue
+            index += 1
+            break
+        return (".".join(parts) if parts else None), index
+
+    def validate(self, query: str) -> str:
+        """
+        Validates a generated query, repairing it where that's safe.
+
+        :param query: The SQL query.
+
+        :return: The (possibly repaired) query to execute.
+        """
+        tokens = self.tokenize(query)
+        issues: list[str] = []
+
+        # A single statement (a trailing semicolon is fine)
+        while tokens and tokens[-1].value == ";":
+            tokens.pop()
+        if not tokens:
+            raise QueryValidationException(message="The generated query is empty.")
+        if any(token.value == ";" for token in tokens):
+            raise QueryValidationException(
+                message="Only a single SQL statement is allowed."
+            )
+        query = query[: tokens[-1].end]
+
+        # Read-only
+        first = next(token for token in tokens if token.value != "(")
+        if first.upper not in ("SELECT", "WITH"):
+            raise QueryValidationException(
+                message=f"Only read-only SELECT queries are allowed, not {first.value}."
+            )
+        for index, token in enumerate(tokens):
+            if token.kind != "identifier":
+                continue
+            previous = tokens[index - 1].value if index else ""
+            if previous == "." or previous == "::":
+                continue
+            next_value = tokens[index + 1].value if index + 1 < len(tokens) else ""
+            if token.upper in FORBIDDEN_KEYWORDS and next_value != ".":
+                issues.append(f"'{token.value}' is not allowed in a read-only query.")
+            elif token.upper in FORBIDDEN_FUNCTIONS and next_value == "(":
+                issues.append(f"The function '{token.value}' is not allowed.")
+        if issues:
+            raise QueryValidationException(message=" ".join(issues))
+
+        # Names defined by the query itself (CTEs and aliases)
+        cte_names: set[str] = set()
+        aliases: set[str] = set()
+        for index, token in enumerate(tokens[:-2]):
+            if token.kind in ("identifier", "quoted_identifier"):
+                if tokens[index + 1].upper == "AS" and tokens[index + 2].value == "(":
+                    cte_names.add(token.value.strip('"').lower())
+            if token.upper == "AS" and tokens[index + 1].kind in (
+                "identifier",
+                "quoted_identifier",
+            ):
+                aliases.add(tokens[index + 1].value.strip('"').lower())
+        # Implicit aliases (e.g., "SUM(distance_mi) total")
+        keywords = SQL_WORDS | CLAUSE_KEYWORDS | FORBIDDEN_KEYWORDS
+        for previous, token in zip(tokens, tokens[1:]):
+            if (
+                token.kind == "identifier"
+                and token.upper not in keywords
+                and (
+                    previous.value == ")"
+                    or previous.kind in ("number", "string", "quoted_identifier")
+                    or (
+                        previous.kind == "identifier" and previous.upper not in keywords
+                    )
+                )
+            ):
+                aliases.add(token.value.lower())
+
+        # Tables read (FROM/JOIN lists), with schema-qualification repairs
+        table_aliases: dict[str, str] = {}  # Alias (or name) -> fully-qualified table
+        replacements: list[tuple[int, int, str]] = []
+        has_derived_tables = bool(cte_names)
+        # Whether each open parenthesis (and the top level) holds a query, as opposed to,
+        # e.g., a function call such as EXTRACT(MONTH FROM ...)
+        scopes: list[bool] = [True]
+        from_depth: int | None = None
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            if token.value == "(":
+                scopes.append(
+                    index + 1 < len(tokens)
+                    and tokens[index + 1].upper in ("SELECT", "WITH")
+                )
+            elif token.value == ")" and len(scopes) > 1:
+                scopes.pop()
+                if from_depth is not None and len(scopes) <= from_depth:
+                    from_depth = None
+            depth = len(scopes)
+            starts_table = (scopes[-1] and token.upper in ("FROM", "JOIN")) or (
+                token.value == "," and from_depth == depth
+            )
+            if scopes[-1] and token.upper == "FROM":
+                from_depth = depth
+            elif (
+                token.upper in CLAUSE_KEYWORDS - {"JOIN", "LATERAL"}
+                and from_depth == depth
+            ):
+                from_depth = None
+            if not starts_table:
+                index += 1
+                continue
+
+            name_index = index + 1
+            if name_index < len(tokens) and tokens[name_index].upper == "LATERAL":
+                name_index += 1
+            if name_index >= len(tokens) or tokens[name_index].value == "(":
+                has_derived_tables = True  # A subquery in FROM
+                index += 1
+                continue
+            name, after = self.read_name(tokens, name_index)
+            if name is None:
+                index += 1
+                continue
+            if after < len(tokens) and tokens[after].value == "(":
+                has_derived_tables = (
+                    True  # A set-returning function (e.g., generate_series)
+                )
+                index = after
+                continue
+            if name in cte_names:
+                table_aliases[name] = name
+            elif name in self.tables:
+                table_aliases[name] = name
+                table_aliases[name.split(".")[-1]] = name
+            elif name in self.qualified_names:
+                fullname = self.qualified_names[name]
+                replacements.append(
+                    (tokens[name_index].start, tokens[after - 1].end, fullname)
+                )
+                table_aliases[name] = fullname
+            else:
+                known = ", ".join(sorted(self.tables))
+                issues.append(f"Unknown table '{name}'. Available tables: {known}.")
+            # An alias may follow (with or without AS)
+            alias_index = (
+                after + 1
+                if after < len(tokens) and tokens[after].upper == "AS"
+                else after
+            )
+            if (
+                alias_index < len(tokens)
+                and tokens[alias_index].kind in ("identifier", "quoted_identifier")
+                and tokens[alias_index].upper not in SQL_WORDS | CLAUSE_KEYWORDS
+            ):
+                alias = tokens[alias_index].value.strip('"').lower()
+                table_aliases[alias] = table_aliases.get(name, name)
+                aliases.add(alias)
+            index = after
+
+        # Column references
+        for index, token in enumerate(tokens):
+            if token.kind not in ("identifier", "quoted_identifier"):
+                continue
+            value = token.value.strip('"').lower()
+            previous = tokens[index - 1].value if index else ""
+            next_value = tokens[index + 1].value if index + 1 < len(tokens) else ""
+            if next_value == "." and index + 2 < len(tokens):
+                # A qualified reference: <table or alias>.<column>
+                column_token = tokens[index + 2]
+                table = table_aliases.get(value)
+                if table in self.tables and column_token.kind in (
+                    "identifier",
+                    "quoted_identifier",
+                ):
+                    column = column_token.value.strip('"').lower()
+                    if column not in self.tables[table]:
+                        issues.append(
+                            f"Unknown column '{value}.{column}'. Columns of {table}: "
+                            f"{', '.join(sorted(self.tables[table]))}."
+                        )
+                continue
+            if (
+                has_derived_tables
+                or previous in (".", "::")
+                or next_value == "("
+                or token.kind == "quoted_identifier"
+                or token.upper in SQL_WORDS | CLAUSE_KEYWORDS
+                or value in aliases
+                or value in table_aliases
+                or any(value == name.split(".")[0] for name in self.tables)
+            ):
+                continue
+            known_columns = set().union(
+                *(
+                    self.tables[table]
+                    for table in set(table_aliases.values())
+                    if table in self.tables
+                )
+            )
+            if known_columns and value not in known_columns:
+                issues.append(f"Unknown column '{token.value}'.")
+        if issues:
+            raise QueryValidationException(message=" ".join(dict.fromkeys(issues)))
+
+        # Repairs: qualify bare table names, and bound the result size
+        for start, end, replacement in sorted(replacements, reverse=True):
+            query = f"{query[:start]}{replacement}{query[end:]}"
+        depth = 0
+        has_limit = False
+        for token in tokens:
+            depth += token.value == "("
+            depth -= token.value == ")"
+            if depth == 0 and token.upper in ("LIMIT", "FETCH"):
+                has_limit = True
+        if not has_limit and self.default_limit > 0:
+            query = f"{query}\nLIMIT {self.default_limit}"
+        return query
+
+    def check_cost(
+        self, session: Session, query: str, params: dict[str, Any] | None = None
+    ) -> None:
+        """
+        Rejects a query whose planner cost estimate exceeds the configured ceiling.
+
+        :param session: The database session to EXPLAIN the query in.
+        :param query: The (validated) SQL query.
+        :param params: The query's bind parameters (if any).
+
+        :return: None
+        """
+        if self.max_cost <= 0:
+            return
+        plan = session.execute(
+            text(f"EXPLAIN (FORMAT JSON) {query}"), params or {}
+        ).scalar()
+        total_cost = plan[0]["Plan"]["Total Cost"]
+        if total_cost > self.max_cost:
+            raise QueryValidationException(
+                message=(
+                    f"The query is too expensive to run (estimated cost {total_cost:.0f} > "
+                    f"{self.max_cost:.0f}). Filter, aggregate, or limit it further."
+                )
+            )
@@ -1,14 +1,10 @@
-from sqlalchemy import text, Sequence, Row, Any
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_random_exponential,
-    retry_if_exception_type,
-)
+from sqlalchemy import Any
 from json import loads
+from os import getenv
+from asyncio import CancelledError, Semaphore, as_completed, create_task, to_thread
+from typing import AsyncIterator, Callable
 
-from prompts.tag import tag_prompt
-from models.athlete import Activity, Athlete
+from prompts.tag import tag_prompt, answer_prompt, example_template, truncation_note
 from models.chat import (
     ChatResponse,
     ChatResponseMeta,
@@ -20,9 +16,28 @@ from models.base import APIResponsePayload
 from models.exceptions import (
     QueryExecutionException,
     QueryGenerationException,
+    QueryValidationException,
 )
+from services.cache import QueryCache, ResultCache, hash_text
+from services.context import ConversationContextBuilder
 from services.database import DatabaseService
+from services.metrics import (
+    chat_llm_tokens,
+    chat_query_attempts,
+    chat_query_repairs,
+    chat_query_rows,
+    chat_request_duration,
+    chat_requests,
+    chat_stage_duration,
+)
 from services.openai import OpenAIService
+from services.retrievers.examples import ExampleIndex
+from services.retrievers.executor import QueryExecutor, QueryResult
+from services.retrievers.pipeline import TAGPipelineState
+from services.retrievers.renderer import ResultRenderer
+from services.retrievers.repair import SQLRepairer
+from services.retrievers.schema import SchemaDescriber
+from services.retrievers.sql_validator import SQLValidator
 from utils.simple_logger import SimpleLogger
 
 
@@ -35,20 +50,74 @@ class TAGRetriever:
         self,
         db_service: DatabaseService = DatabaseService(),
         openai_client: OpenAIService = OpenAIService(),
+        query_cache: QueryCache = QueryCache(),
+        result_cache: ResultCache = ResultCache(),
+        example_index: ExampleIndex = ExampleIndex(),
+        context_builder: ConversationContextBuilder = ConversationContextBuilder(),
+        schema_describer: SchemaDescriber = SchemaDescriber(),
+        sql_validator: SQLValidator = SQLValidator(),
+        query_executor: QueryExecutor | None = None,
+        repairer: SQLRepairer | None = None,
+        renderer: ResultRenderer = ResultRenderer(),
     ):
         """
         Initializes the TAG retriever.
 
         :param db_service: The database service.
         :param openai_client: The OpenAI service.
+        :param query_cache: The cache of generated queries, keyed on the user question
+            (only standalone questions are cached, since a follow-up depends on the history).
+        :param result_cache: The cache of query results, keyed on the executed query.
+        :param example_index: The index of past successful queries, used as few-shot examples.
+        :param context_builder: The builder of the token-budgeted conversation history.
+        :param schema_describer: The generator of schema descriptions from the ORM metadata.
+        :param sql_validator: The local validator of generated queries.
+        :param query_executor: The bounded executor of queries (by default, one on `db_service`).
+        :param repairer: The repairer of failing queries (by default, one on `openai_client`).
+        :param renderer: The local renderer of common result shapes.
 
         :return: None
         """
         self.prompt: str = tag_prompt
+        self.schema_describer: SchemaDescriber = schema_describer
         self.schema_description: str = self.establish_schema_description()
+        self.schema_hash: str = hash_text(self.schema_description)
         self.db_service: DatabaseService = db_service
         self.openai_service: OpenAIService = openai_client
-        self.error_msg: str = ""
+        self.query_cache: QueryCache = query_cache
+        self.result_cache: ResultCache = result_cache
+        self.example_index: ExampleIndex = example_index
+        self.context_builder: ConversationContextBuilder = context_builder
+        self.sql_validator: SQLValidator = sql_validator
+        self.repairer: SQLRepairer = repairer or SQLRepairer(
+            openai_client=openai_client, schema_describer=schema_describer
+        )
+        self.query_executor: QueryExecutor = query_executor or QueryExecutor(
+            db_service=db_service, sql_validator=sql_validator
+        )
+        self.renderer: ResultRenderer = renderer
+        self.render_locally: bool = (
+            getenv("TAG_LOCAL_RENDERING", "true").lower() == "true"
+        )
+        self.few_shot_k: int = int(getenv("TAG_FEW_SHOT_K", "3"))
+        self.few_shot_min_similarity: float = float(
+            getenv("TAG_FEW_SHOT_MIN_SIMILARITY", "0.3")
+        )
+        self.prune_schema: bool = getenv("TAG_PRUNE_SCHEMA", "true").lower() == "true"
+        # Hedged generation: N concurrent candidates (trades tokens for tail latency)
+        self.hedge_candidates: int = int(getenv("TAG_HEDGE_CANDIDATES", "1"))
+        self.hedge_temperatures: list[float] = [
+            float(temperature)
+            for temperature in getenv("TAG_HEDGE_TEMPERATURES", "0,0.4,0.8").split(",")
+        ]
+        self.hedge_models: list[str] = [
+            model for model in getenv("TAG_HEDGE_MODELS", "").split(",") if model
+        ]
+        # Bounds the in-flight pipelines (DB connections and LLM calls) per worker
+        self.max_concurrency: int = int(getenv("TAG_MAX_CONCURRENCY", "8"))
+        self.semaphore: Semaphore = Semaphore(self.max_concurrency)
+        # Called with each finished pipeline's state (e.g., by the benchmark, to collect timings)
+        self.pipeline_listeners: list[Callable[[TAGPipelineState], None]] = []
         self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
 
     def establish_schema_description(self) -> str:
@@ -57,10 +126,29 @@ class TAGRetriever:
 
         :return: The schema description.
         """
-        activity_desc = Activity().convert_to_schema_description()
-        athlete_desc = Athlete().convert_to_schema_description()
-        schema_desc = f"{activity_desc}\n{athlete_desc}"
-        return schema_desc
+        return self.schema_describer.describe()
+
+    def establish_relevant_schema_description(
+        self, question: str, messages: list[dict[str, str]]
+    ) -> str:
+        """
+        Establishes the schema description for the TAG prompt, pruned to the tables and columns
+        relevant to the question (and the most recent user turn, for follow-up questions).
+
+        :param question: The user's question.
+        :param messages: The budgeted conversation history.
+
+        :return: The schema description (the full one if nothing specific was relevant).
+        """
+        if not self.prune_schema:
+            return self.schema_description
+        previous_questions = [
+            message["content"]
+            for message in messages
+            if message["role"] == RoleTypes.USER
+        ]
+        relevance_text = " ".join([*previous_questions[-1:], question])
+        return self.schema_describer.describe_for(relevance_text)
 
     def clean_query(self, query: str) -> str:
         """
@@ -77,108 +165,426 @@ class TAGRetriever:
             .strip()  # Trim any remaining spaces
         )
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_random_exponential(min=1, max=10),
-        retry=retry_if_exception_type(
-            [QueryGenerationException, QueryExecutionException]
-        ),
-    )
-    def execute_query(
+    def run_query(
+        self, query: str, handle: dict[str, Any] | None = None
+    ) -> QueryResult:
+        """
+        Runs the given SQL query with a bounded cost (see `QueryExecutor`).
+
+        NOTE: This is blocking and is meant to be run in a worker thread. The scoped
+        session is thread-local, so it's acquired and closed within this same call.
+
+        :param query: The SQL query to execute.
+        :param handle: A dict through which the running query can be cancelled.
+
+        :return: The query result.
+        """
+        return self.query_executor.run(query=query, handle=handle)
+
+    def build_examples(self, question: str) -> str:
+        """
+        Builds the few-shot examples section of the TAG prompt from the most similar past queries.
+
+        :param question: The user's question.
+
+        :return: The formatted examples (or "None" if there are no similar past queries).
+        """
+        examples = self.example_index.search(
+            question=question,
+            k=self.few_shot_k,
+            min_similarity=self.few_shot_min_similarity,
+        )
+        if not examples:
+            return "None"
+        return "\n".join(
+            example_template.format(question=example_question, query=example_query)
+            for example_question, example_query, _ in examples
+        )
+
+    async def generate_query(
         self,
         user_question: dict[str, str],
         messages: list[dict[str, str]],
-        schema_desc: str = None,
+        schema_desc: str,
+        state: TAGPipelineState,
         gpt_model: str = None,
-    ) -> tuple[Sequence[Row[Any]], int, int, str] | str:
+        temperature: float | None = None,
+    ) -> tuple[GeneratedQueryOutput, str]:
         """
-        Executes the generated SQL query and returns the results.
+        Generates a SQL query for the user's question with the LLM.
 
         :param user_question: The user's question.
-        :param messages: The list of messages.
+        :param messages: The budgeted conversation history (see `build_history`).
         :param schema_desc: The schema description for the database.
+        :param state: The request's pipeline state (for the previous attempt's error, if any).
         :param gpt_model: The GPT model to use for generating the query (e.g., "gpt-4o-mini").
+        :param temperature: The sampling temperature (the model's default, if not given).
 
-        :return: The query results, the number of results, the completion ID, and the query to execute,
-                    OR follow-up questions to ask the user.
+        :return: The generated query output and the completion ID.
         """
 
-        if not schema_desc:
-            schema_desc = self.schema_description
-
-        # Generate a query based on the user's question
-        if self.error_msg:
-            messages.append({"role": RoleTypes.DEVELOPER, "content": self.error_msg})
-
-        # NOTE - Consideration: Only append the full TAG prompt if it's not already in the messages
-        messages.append(
-            {
-                "role": RoleTypes.DEVELOPER,
-                "content": tag_prompt.format(
-                    schema_description=schema_desc,
-                    conversation=messages,
+        # The history is only sent once: inside the TAG prompt
+        with state.time("prompt_build"):
+            llm_messages: list[dict[str, str]] = [
+                {
+                    "role": RoleTypes.DEVELOPER,
+                    "content": tag_prompt.format(
+                        schema_description=schema_desc,
+                        conversation=self.context_builder.format(messages),
+                        examples=self.build_examples(user_question.get("content", "")),
+                        user_question=user_question.get("content", ""),
+                    ),
+                }
+            ]
+            if state.last_error:
+                llm_messages.append(
+                    {"role": RoleTypes.DEVELOPER, "content": state.last_error}
+                )
+
+        self.logger.debug(f"Messages being fed in to the LLM:\n{llm_messages}")
+        with state.time("generation_call"):
+            query_result = await self.openai_service.aprocess_request(
+                messages=llm_messages,
+                model=gpt_model if gpt_model else self.openai_service.model,
+                temperature=temperature,
+            )
+        state.record_usage("generation", query_result.usage)
+        completion_id = query_result.id
+        self.logger.debug(f"Chat completed: {completion_id}")
+
+        # Clean things up and get a parsed query output
+        try:
+            with state.time("parse"):
+                # Replace single quotes with double quotes for the JSON object
+                query_result.choices[0].message.content = (
+                    query_result.choices[0]
+                    .message.content.replace("```", "")
+                    .replace("json", "")
+                )
+                json_result_data = loads(query_result.choices[0].message.content)
+                json_result: GeneratedQueryOutput = GeneratedQueryOutput.parse_obj(
+                    json_result_data
+                )
+        except Exception as e:
+            error_msg = f"An error occurred during query generation: {query_result.choices[0].message.content}. Here is the error: {e}\nPlease try again.\n"
+            self.logger.error(error_msg)
+            state.record_error(error_msg)
+            raise QueryGenerationException(
+                message=error_msg
+            )  # Regenerated within budget
+
+        return json_result, completion_id
+
+    async def generate_query_within_budget(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        schema_desc: str,
+        state: TAGPipelineState,
+        gpt_model: str = None,
+    ) -> tuple[GeneratedQueryOutput, str]:
+        """
+        Generates a SQL query for the user's question, regenerating (with the parse error) while
+        the repair budget allows if the LLM's output can't be parsed.
+
+        :param user_question: The user's question.
+        :param messages: The budgeted conversation history (see `build_history`).
+        :param schema_desc: The schema description for the database.
+        :param state: The request's pipeline state.
+        :param gpt_model: The GPT model to use for generating the query (e.g., "gpt-4o-mini").
+
+        :return: The generated query output and the completion ID.
+        """
+        while True:
+            state.attempts += 1
+            try:
+                return await self.generate_query(
                     user_question=user_question,
+                    messages=messages,
+                    schema_desc=schema_desc,
+                    state=state,
+                    gpt_model=gpt_model,
+                )
+            except QueryGenerationException:
+                if state.repairs >= self.repairer.budget:
+                    self.repairer.record(repairs_used=state.repairs, succeeded=False)
+                    raise
+                state.repairs += 1
+
+    async def validate_and_run(
+        self, query: str, state: TAGPipelineState
+    ) -> tuple[str, QueryResult]:
+        """
+        Validates a query and executes it (or reuses its cached result).
+
+        :param query: The SQL query.
+        :param state: The request's pipeline state.
+
+        :return: The (possibly repaired by validation) query and its result.
+        """
+        # Reject (or repair) unsafe/invalid queries before they reach the database
+        with state.time("validation"):
+            query = self.sql_validator.validate(query)
+
+        # Execute the query (off the event loop)
+        self.logger.debug(f"\nExecuting this generated query: {query}")
+        result = self.result_cache.get(query)
+        if result is not None:
+            self.logger.debug("Using the cached result for this query.")
+            return query, result
+        snapshot = self.result_cache.snapshot(query)
+        handle: dict[str, Any] = {}
+        try:
+            with state.time("execution"):
+                result = await to_thread(self.run_query, query, handle)
+        except CancelledError:
+            # The request was abandoned; don't leave the query running
+            self.query_executor.cancel(handle)
+            raise
+        except Exception as e:
+            raise QueryExecutionException(message=str(e))
+        self.result_cache.set(query, result=result, snapshot=snapshot)
+        return query, result
+
+    async def generate_hedged(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        schema_desc: str,
+        state: TAGPipelineState,
+        gpt_model: str = None,
+    ) -> tuple[GeneratedQueryOutput, str, str | None, QueryResult | Exception | None]:
+        """
+        Generates candidate queries concurrently (with different temperatures and, optionally,
+        models), validating and executing each as it arrives. The first candidate to execute
+        successfully wins, and the others are cancelled.
+
+        :param user_question: The user's question.
+        :param messages: The budgeted conversation history (see `build_history`).
+        :param schema_desc: The schema description for the database.
+        :param state: The request's pipeline state.
+        :param gpt_model: The GPT model to use when no hedge models are configured.
+
+        :return: The candidate's output, completion ID, cleaned query, and result: the winner's
+                 (with its QueryResult), or, if none succeeded, the first to fail (with its
+                 exception, for repair), else the first to have LOW confidence (with no query
+                 or result). If no candidate could be parsed, a single query is regenerated
+                 within the repair budget instead (with no result yet).
+        """
+
+        async def run_candidate(
+            index: int,
+        ) -> tuple[
+            GeneratedQueryOutput, str, str | None, QueryResult | Exception | None
+        ]:
+            output, completion_id = await self.generate_query(
+                user_question=user_question,
+                messages=messages,
+                schema_desc=schema_desc,
+                state=state,
+                gpt_model=(
+                    self.hedge_models[index % len(self.hedge_models)]
+                    if self.hedge_models
+                    else gpt_model
                 ),
-            }
+                temperature=self.hedge_temperatures[
+                    index % len(self.hedge_temperatures)
+                ],
+            )
+            if output.confidence == "LOW":
+                return output, completion_id, None, None
+            query = self.clean_query(output.query)
+            try:
+                return (
+                    output,
+                    completion_id,
+                    *(await self.validate_and_run(query=query, state=state)),
+                )
+            except (QueryValidationException, QueryExecutionException) as e:
+                return output, completion_id, query, e
+
+        state.attempts += self.hedge_candidates
+        tasks = [
+            create_task(run_candidate(index)) for index in range(self.hedge_candidates)
+        ]
+        failed = low_confidence = None
+        try:
+            for next_done in as_completed(tasks):
+                try:
+                    outcome = await next_done
+                except QueryGenerationException:
+                    continue  # Unparseable; the error is in the state
+                if isinstance(outcome[3], QueryResult):
+                    return outcome
+                # A query that only needs repair beats asking the user follow-up questions
+                if isinstance(outcome[3], Exception):
+                    failed = failed or outcome
+                else:
+                    low_confidence = low_confidence or outcome
+        finally:
+            for task in tasks:
+                task.cancel()  # No-op for the finished ones
+
+        if failed or low_confidence:
+            return failed or low_confidence
+        self.logger.warning(
+            f"None of the {self.hedge_candidates} candidate generations could be parsed; "
+            "regenerating."
         )
-
-        self.logger.debug(f"Messages being fed in to the LLM:\n{messages}")
-        query_result = self.openai_service.process_request(
+        output, completion_id = await self.generate_query_within_budget(
+            user_question=user_question,
             messages=messages,
-            model=gpt_model if gpt_model else self.openai_service.model,
+            schema_desc=schema_desc,
+            state=state,
+            gpt_model=gpt_model,
         )
-        completion_id = query_result.id
-        self.logger.debug(f"Chat completed: {completion_id}")
+        query = None if output.confidence == "LOW" else self.clean_query(output.query)
+        return output, completion_id, query, None
 
-        # Clean things up and get an executable query
-        try:
-            # Replace single quotes with double quotes for the JSON object
-            query_result.choices[0].message.content = (
-                query_result.choices[0]
-                .message.content.replace("```", "")
-                .replace("json", "")
-            )
-            json_result_data = loads(query_result.choices[0].message.content)
-            json_result: GeneratedQueryOutput = GeneratedQueryOutput.parse_obj(
-                json_result_data
+    async def execute_query(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        state: TAGPipelineState,
+        schema_desc: str = None,
+        gpt_model: str = None,
+    ) -> tuple[QueryResult, int, int, str] | str:
+        """
+        Executes the generated SQL query and returns the results.
+
+        A failing query (invalid, or erroring in the database) goes through the repair stage,
+        which sends the LLM only the failing SQL, the error, and the relevant schema fragment,
+        up to the per-request repair budget. With hedging enabled (TAG_HEDGE_CANDIDATES > 1),
+        several candidate queries race instead (see `generate_hedged`).
+
+        :param user_question: The user's question.
+        :param messages: The budgeted conversation history (see `build_history`).
+        :param state: The request's pipeline state.
+        :param schema_desc: The schema description for the database.
+        :param gpt_model: The GPT model to use for generating the query (e.g., "gpt-4o-mini").
+
+        :return: The query results, the number of results, the completion ID, and the query to execute,
+                    OR follow-up questions to ask the user.
+        """
+
+        question = user_question.get("content", "")
+        if not schema_desc:
+            schema_desc = self.establish_relevant_schema_description(
+                question=question, messages=messages
             )
-            follow_ups = json_result.follow_ups if json_result.follow_ups else None
+
+        # A follow-up's query depends on the conversation, so only a question asked without any
+        # history is cached (and indexed as a few-shot example) on its own text
+        standalone = not messages
+
+        # Reuse the query generated for this question earlier (if any), else generate one
+        cached_output = (
+            self.query_cache.get(question=question, schema_hash=self.schema_hash)
+            if standalone
+            else None
+        )
+        result: QueryResult | None = None
+        failure: Exception | None = None
+        if cached_output:
+            self.logger.debug("Using the cached query for this question.")
+            state.attempts += 1
+            json_result, completion_id = cached_output, None
+            query_to_execute = self.clean_query(json_result.query)
+        else:
+            if self.hedge_candidates > 1:
+                with state.time("hedged_generation"):
+                    json_result, completion_id, query_to_execute, outcome = (
+                        await self.generate_hedged(
+                            user_question=user_question,
+                            messages=messages,
+                            schema_desc=schema_desc,
+                            state=state,
+                            gpt_model=gpt_model,
+                        )
+                    )
+                if isinstance(outcome, QueryResult):
+                    result = outcome
+                elif isinstance(outcome, Exception):
+                    failure = outcome
+            else:
+                json_result, completion_id = await self.generate_query_within_budget(
+                    user_question=user_question,
+                    messages=messages,
+                    schema_desc=schema_desc,
+                    state=state,
+                    gpt_model=gpt_model,
+                )
+                query_to_execute = self.clean_query(json_result.query)
             confidence = json_result.confidence
             if confidence == "LOW":
+                follow_ups = json_result.follow_ups
                 if not follow_ups:
                     follow_ups = "Could you please elaborate on your question?"
-                self.error_msg = f"Confidence level is {confidence}. Follow-up questions: {follow_ups}."
-                self.logger.error(self.error_msg)
+                self.logger.error(
+                    f"Confidence level is {confidence}. Follow-up questions: {follow_ups}."
+                )
                 return follow_ups
-            query_to_execute = self.clean_query(json_result.query)
-        except Exception as e:
-            self.error_msg = f"An error occurred during query generation: {query_result.choices[0].message.content}. Here is the error: {e}\nPlease try again.\n"
-            self.logger.error(self.error_msg)
-            raise QueryGenerationException(
-                message=self.error_msg
-            )  # Hit the retry mechanism
 
-        # Execute the query
-        session = self.db_service.get_session()
-        try:
-            self.logger.debug(f"\nExecuting this generated query: {query_to_execute}")
-            result = session.execute(text(query_to_execute)).fetchall()
-        except Exception as e:
-            self.error_msg = f"An error occurred while executing this query: {query_to_execute}.\nHere is the error: {e}\nPlease generate a query to resolve this issue.\n"
-            self.logger.error(self.error_msg)
-            self.db_service.close_session()  # Close session before retry
-            raise QueryExecutionException(
-                message=self.error_msg
-            )  # Hit the retry mechanism
-        self.db_service.close_session()
+        while result is None:
+            if failure is None:
+                try:
+                    query_to_execute, result = await self.validate_and_run(
+                        query=query_to_execute, state=state
+                    )
+                    break
+                except (QueryValidationException, QueryExecutionException) as e:
+                    failure = e
+            error_msg = f"An error occurred with this query: {query_to_execute}.\nHere is the error: {failure.message}"
+            self.logger.error(error_msg)
+            state.record_error(error_msg)
+            if cached_output:
+                self.query_cache.invalidate(
+                    question=question, schema_hash=self.schema_hash
+                )
+                cached_output = None
+
+            # Repair the query, within the request's budget
+            while True:
+                if state.repairs >= self.repairer.budget:
+                    self.repairer.record(repairs_used=state.repairs, succeeded=False)
+                    raise failure
+                state.repairs += 1
+                try:
+                    with state.time("repair"):
+                        repaired_query, completion_id = await self.repairer.repair(
+                            question=question,
+                            query=query_to_execute,
+                            error=failure.message,
+                            gpt_model=gpt_model,
+                            state=state,
+                        )
+                    query_to_execute = self.clean_query(repaired_query)
+                    failure = None
+                    break
+                except QueryGenerationException as e:
+                    state.record_error(e.message)
+
+        self.repairer.record(repairs_used=state.repairs, succeeded=True)
+        state.rows = len(result)
+        if standalone and not cached_output:
+            self.query_cache.set(
+                question=question,
+                schema_hash=self.schema_hash,
+                output=GeneratedQueryOutput(
+                    query=query_to_execute, confidence=json_result.confidence
+                ),
+            )
+            self.example_index.add(question=question, query=query_to_execute)
 
         return result, len(result), completion_id, query_to_execute
 
-    def process(
+    async def process(
         self,
         user_question: dict[str, str],
         messages: list[dict[str, str]],
         gpt_model: str = None,
+        synthesize: bool = False,
+        include_metrics: bool = False,
     ) -> APIResponsePayload[ChatResponse, ChatResponseMeta]:
         """
         Processes the TAG query and returns the AI response.
@@ -186,11 +592,82 @@ class TAGRetriever:
         :param user_question: The user's most recent question.
         :param messages: The list of messages.
         :param gpt_model: The GPT model to use for generating the query (e.g., "gpt-4o-mini").
+        :param synthesize: Whether to have the LLM write the answer even if it can be rendered locally.
+        :param include_metrics: Whether to include the pipeline's timings and token usage.
+
+        :return The response payload.
+        """
+
+        state = TAGPipelineState(question=user_question.get("content", ""))
+        with state.time("queued"):
+            await self.semaphore.acquire()
+        try:
+            return await self.run_pipeline(
+                user_question=user_question,
+                messages=messages,
+                state=state,
+                gpt_model=gpt_model,
+                synthesize=synthesize,
+                include_metrics=include_metrics,
+            )
+        finally:
+            self.semaphore.release()
+            self.finish_pipeline(state)
+
+    def finish_pipeline(self, state: TAGPipelineState) -> None:
+        """
+        Logs a finished pipeline run, records its metrics, and notifies the pipeline listeners.
+
+        :param state: The request's pipeline state.
+
+        :return: None
+        """
+        self.logger.info(f"TAG pipeline finished: {state.summary()}")
+        chat_requests.labels(path="tag").inc()
+        chat_request_duration.labels(path="tag").observe(state.elapsed)
+        for stage, seconds in state.timings.items():
+            chat_stage_duration.labels(stage=stage).observe(seconds)
+        for call, tokens in state.usage.items():
+            for kind, count in tokens.items():
+                chat_llm_tokens.labels(call=call, kind=kind).inc(count)
+        chat_query_attempts.observe(state.attempts)
+        chat_query_repairs.observe(state.repairs)
+        if state.rows is not None:
+            chat_query_rows.observe(state.rows)
+        for listener in self.pipeline_listeners:
+            listener(state)
+
+    async def run_pipeline(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        state: TAGPipelineState,
+        gpt_model: str = None,
+        synthesize: bool = False,
+        include_metrics: bool = False,
+    ) -> APIResponsePayload[ChatResponse, ChatResponseMeta]:
+        """
+        Runs the TAG pipeline (query generation, execution, and answer synthesis) for a question.
+
+        :param user_question: The user's most recent question.
+        :param messages: The list of messages.
+        :param state: The request's pipeline state.
+        :param gpt_model: The GPT model to use for generating the query (e.g., "gpt-4o-mini").
+        :param synthesize: Whether to have the LLM write the answer even if it can be rendered locally.
+        :param include_metrics: Whether to include the pipeline's timings and token usage.
 
         :return The response payload.
         """
 
-        result = self.execute_query(user_question=user_question, messages=messages)
+        history = self.build_history(
+            user_question=user_question, messages=messages, gpt_model=gpt_model
+        )
+        result = await self.execute_query(
+            user_question=user_question,
+            messages=history,
+            state=state,
+            gpt_model=gpt_model,
+        )
 
         if isinstance(result, str):
             # The LLM had low confidence and provided follow-up questions
@@ -201,44 +678,30 @@ class TAGRetriever:
                 meta=ChatResponseMeta(
                     completion_id=None,
                     executed_query=None,
+                    metrics=state.to_metrics() if include_metrics else None,
                 ),
             )
 
         # Unpack the tuple result
         result, num_rows, completion_id, executed_query = result
 
-        # Display the results
-        formatted_result = "\n".join([str(row) for row in result])
-        self.logger.debug(
-            f"\nQuery executed successfully. Number of rows returned: {num_rows}"
-        )
-        self.logger.debug(f"\nQuery Result:\n{formatted_result}")
-
-        # Return an answer to the user
-        messages.append(
-            {
-                "role": RoleTypes.DEVELOPER,
-                "content": f"""
-                    The user previously asked a question, and a SQL query was executed to retrieve relevant data.
-                    The query result is:
-
-                    {formatted_result}
-
-                    Your task is to **write a natural language answer** to the user.
-                    Do **NOT** generate another SQL query. Simply provide a clear, well-written summary response.
-
-                    Additionally, if there are multiple data records, display such with a Markdown-formatted table.
-                """,
-            }
-        )
-        ai_response = (
-            self.openai_service.process_request(
-                messages=messages,
-                model=gpt_model if gpt_model else self.openai_service.model,
-            )
-            .choices[0]
-            .message.content
+        # Return an answer to the user (rendered locally, if possible)
+        ai_response = self.render_answer(
+            user_question=user_question, result=result, synthesize=synthesize
         )
+        if ai_response is None:
+            answer_messages = [
+                *history,
+                user_question,
+                self.build_answer_message(result=result, num_rows=num_rows),
+            ]
+            with state.time("synthesis"):
+                answer_result = await self.openai_service.aprocess_request(
+                    messages=answer_messages,
+                    model=gpt_model if gpt_model else self.openai_service.model,
+                )
+            state.record_usage("synthesis", answer_result.usage)
+            ai_response = answer_result.choices[0].message.content
         self.logger.debug(f"\n{ai_response}")
 
         return APIResponsePayload(
@@ -248,5 +711,195 @@ class TAGRetriever:
             meta=ChatResponseMeta(
                 completion_id=completion_id or None,
                 executed_query=executed_query or None,
+                metrics=state.to_metrics() if include_metrics else None,
             ),
         )
+
+    def build_history(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        gpt_model: str = None,
+    ) -> list[dict[str, str]]:
+        """
+        Builds the token-budgeted conversation history preceding the user's question.
+
+        :param user_question: The user's most recent question.
+        :param messages: The list of messages.
+        :param gpt_model: The GPT model the history is for.
+
+        :return: The budgeted conversation history.
+        """
+        if messages and messages[-1] is user_question:
+            messages = messages[:-1]
+        return self.context_builder.build(
+            messages=messages, model=gpt_model or self.openai_service.model
+        )
+
+    def render_answer(
+        self, user_question: dict[str, str], result: QueryResult, synthesize: bool
+    ) -> str | None:
+        """
+        Renders the answer locally, unless the LLM is needed (or requested) to write it.
+
+        :param user_question: The user's most recent question.
+        :param result: The query result.
+        :param synthesize: Whether the LLM was requested to write the answer.
+
+        :return: The rendered answer, or None if the LLM should write it.
+        """
+        if synthesize or not self.render_locally:
+            return None
+        return self.renderer.render(
+            question=user_question.get("content", ""), result=result
+        )
+
+    def build_answer_message(
+        self, result: QueryResult, num_rows: int
+    ) -> dict[str, str]:
+        """
+        Builds the developer message asking the LLM to answer the user from the query result.
+
+        :param result: The query result.
+        :param num_rows: The number of rows returned by the query.
+
+        :return: The answer-synthesis message.
+        """
+        formatted_result = "\n".join([str(row) for row in result.rows])
+        self.logger.debug(
+            f"\nQuery executed successfully. Number of rows returned: {num_rows}"
+        )
+        self.logger.debug(f"\nQuery Result:\n{formatted_result}")
+
+        return {
+            "role": RoleTypes.DEVELOPER,
+            "content": answer_prompt.format(
+                query_result=formatted_result,
+                truncation_note=(
+                    truncation_note.format(num_rows=num_rows)
+                    if result.truncated
+                    else ""
+                ),
+            ),
+        }
+
+    def build_done_event(
+        self,
+        completion_id: str | None,
+        executed_query: str | None,
+        state: TAGPipelineState,
+        include_metrics: bool,
+    ) -> dict[str, Any]:
+        """
+        Builds the data of a stream's final 'done' event.
+
+        :param completion_id: The completion ID (if any).
+        :param executed_query: The executed query (if any).
+        :param state: The request's pipeline state.
+        :param include_metrics: Whether to include the pipeline's timings and token usage.
+
+        :return: The event data.
+        """
+        data = {"completion_id": completion_id, "executed_query": executed_query}
+        if include_metrics:
+            data["metrics"] = state.to_metrics().dict()
+        return data
+
+    async def stream(
+        self,
+        user_question: dict[str, str],
+        messages: list[dict[str, str]],
+        gpt_model: str = None,
+        synthesize: bool = False,
+        include_metrics: bool = False,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Processes the TAG query and streams the AI response as it's generated.
+
+        Yields a 'query' event as soon as the generated SQL has been executed, a 'token'
+        event per answer-synthesis chunk (or a single one for a locally-rendered answer),
+        and a final 'done' event.
+
+        :param user_question: The user's most recent question.
+        :param messages: The list of messages.
+        :param gpt_model: The GPT model to use for generating the query (e.g., "gpt-4o-mini").
+        :param synthesize: Whether to have the LLM write the answer even if it can be rendered locally.
+        :param include_metrics: Whether to include the pipeline's timings and token usage.
+
+        :return An async iterator of (event name, event data) tuples.
+        """
+
+        state = TAGPipelineState(question=user_question.get("content", ""))
+        with state.time("queued"):
+            await self.semaphore.acquire()
+        try:
+            history = self.build_history(
+                user_question=user_question, messages=messages, gpt_model=gpt_model
+            )
+            result = await self.execute_query(
+                user_question=user_question,
+                messages=history,
+                state=state,
+                gpt_model=gpt_model,
+            )
+
+            if isinstance(result, str):
+                # The LLM had low confidence and provided follow-up questions
+                yield "token", {"content": result}
+                yield "done", self.build_done_event(
+                    completion_id=None,
+                    executed_query=None,
+                    state=state,
+                    include_metrics=include_metrics,
+                )
+                return
+
+            result, num_rows, completion_id, executed_query = result
+            yield "query", {
+                "completion_id": completion_id,
+                "executed_query": executed_query,
+                "num_rows": num_rows,
+            }
+
+            rendered_answer = self.render_answer(
+                user_question=user_question, result=result, synthesize=synthesize
+            )
+            if rendered_answer is not None:
+                yield "token", {"content": rendered_answer}
+                yield "done", self.build_done_event(
+                    completion_id=completion_id,
+                    executed_query=executed_query,
+                    state=state,
+                    include_metrics=include_metrics,
+                )
+                return
+
+            answer_messages = [
+                *history,
+                user_question,
+                self.build_answer_message(result=result, num_rows=num_rows),
+            ]
+            with state.time("synthesis"):
+                response_stream = await self.openai_service.aprocess_request(
+                    messages=answer_messages,
+                    model=gpt_model if gpt_model else self.openai_service.model,
+                    use_streaming=True,
+                )
+                async for chunk in response_stream:
+                    # The final chunk carries the usage (and no choices)
+                    state.record_usage("synthesis", getattr(chunk, "usage", None))
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        yield "token", {"content": content}
+
+            yield "done", self.build_done_event(
+                completion_id=completion_id,
+                executed_query=executed_query,
+                state=state,
+                include_metrics=include_metrics,
+            )
+        finally:
+            self.semaphore.release()
+            self.finish_pipeline(state)
@@ -1,7 +1,10 @@
 from stravalib.client import Client
 from stravalib.exc import RateLimitExceeded
 from stravalib.model import Activity, Athlete
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import islice
 from stravalib.client import Client
 from tenacity import (
     retry,
@@ -11,7 +14,10 @@ from tenacity import (
     RetryError,
 )
 from os import getenv
+from time import perf_counter
+from typing import Iterable, Iterator
 
+from services.rate_limiter import StravaRateLimiter, strava_rate_limiter
 from utils.simple_logger import SimpleLogger
 
 
@@ -31,13 +37,19 @@ class StravaAuthorization:
             client_id=self.client_id, redirect_uri=self.redirect_uri
         )
 
-    def exchange_refresh_token(self, refresh_token: str) -> str:
+    def exchange_refresh_token(self, refresh_token: str) -> dict:
+        """
+        Exchanges a refresh token for a short-lived access token.
+
+        Strava may rotate the refresh token, so the whole response is returned: the
+        access_token, the refresh_token to use next time, and expires_at (epoch seconds).
+        """
         token_response = self.client.refresh_access_token(
             client_id=self.client_id,
             client_secret=self.client_secret,
             refresh_token=refresh_token,
         )
-        return token_response["access_token"]
+        return token_response
 
     def exchange_authorization_code(self, code):
         token_response = self.client.exchange_code_for_token(
@@ -54,14 +66,33 @@ class ActivityRetrievalException(Exception):
     pass
 
 
+class ActivityUnavailableException(Exception):
+    """
+    Exception for a detailed activity that can't be retrieved at all (e.g., it was deleted or
+    made private), so retrying is pointless.
+    """
+
+    pass
+
+
 class StravaAPI:
     """
     Responsible for making calls to the Strava API for activity data.
     """
 
-    def __init__(self, access_token):
+    def __init__(
+        self, access_token, rate_limiter: StravaRateLimiter = strava_rate_limiter
+    ):
         self.access_token = access_token
-        self.client = Client(access_token)
+        # The rate limiter sees every response's rate-limit headers (and paces the requests)
+        self.rate_limiter = rate_limiter
+        self.client = Client(access_token, rate_limiter=rate_limiter)
+        self.max_workers = int(getenv("STRAVA_DETAIL_CONCURRENCY", "8"))
+        self.max_prefetch = int(getenv("STRAVA_DETAIL_PREFETCH", str(self.max_workers * 4)))
+        # Pauses longer than this (i.e., a used-up daily quota) end the fetch early instead
+        self.max_quota_wait_s = float(getenv("STRAVA_MAX_QUOTA_WAIT_S", "900"))
+        self.unfetched_activity_ids: list[int] = []
+        self.failed_activity_ids: list[int] = []
         self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
 
     @retry(
@@ -99,66 +130,158 @@ class StravaAPI:
     )
     def fetch_detailed_activity(self, activity_id: int) -> Activity | None:
         """
-        Retrieves the detailed activity with the given ID.
+        Retrieves the detailed activity with the given ID, pausing (within the max quota wait)
+        whenever the app's rate-limit quota is used up.
 
         Args:
             activity_id: The ID of the activity
 
         Returns:
-            A detailed activity.
+            A detailed activity, or None if the quota won't allow it within the max quota wait.
+
+        Raises:
+            ActivityUnavailableException: If Strava refuses the request (a 4xx other than 429).
         """
-        try:
-            return self.client.get_activity(activity_id=activity_id)
-        except RateLimitExceeded as e:
-            self.logger.error(
-                f"Strava API rate limit exceeded for activity [{activity_id}]: {e}"
-            )
-            return None
-        except RetryError as e:
-            self.logger.error(
-                f"Failed to retrieve detailed activity [{activity_id}] on final retry attempt [{e.last_attempt.attempt_number}]: {e}"
-            )
-            return None
-        except Exception as e:
-            self.logger.error(
-                f"Failed to retrieve detailed activity with ID [{activity_id}]: {e}"
-            )
-            raise ActivityRetrievalException(
-                f"Failed to retrieve detailed activity with ID [{activity_id}]: {e}"
-            )
+        while True:
+            try:
+                self.rate_limiter.acquire(max_wait_s=self.max_quota_wait_s)
+                return self.client.get_activity(activity_id=activity_id)
+            except RateLimitExceeded as e:
+                self.logger.error(
+                    f"Strava API rate limit exceeded for activity [{activity_id}]: {e}"
+                )
+                return None
+            except RetryError as e:
+                self.logger.error(
+                    f"Failed to retrieve detailed activity [{activity_id}] on final retry attempt [{e.last_attempt.attempt_number}]: {e}"
+                )
+                return None
+            except Exception as e:
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                if status_code == 429:
+                    # Throttled despite the pacing (e.g., by another process); pause, then resume
+                    self.rate_limiter.exhaust()
+                    continue
+                if status_code is not None and 400 <= status_code < 500:
+                    # Deleted, private, or not the athlete's; retrying won't change that
+                    raise ActivityUnavailableException(
+                        f"Detailed activity with ID [{activity_id}] is unavailable: {e}"
+                    )
+                self.logger.error(
+                    f"Failed to retrieve detailed activity with ID [{activity_id}]: {e}"
+                )
+                raise ActivityRetrievalException(
+                    f"Failed to retrieve detailed activity with ID [{activity_id}]: {e}"
+                )
 
     def get_detailed_activities(self, activities: list[Activity]) -> list[Activity]:
         """
-        Gets the detailed activities.
+        Gets the detailed activities, fetching them concurrently at the pace the app's rate-limit
+        quotas allow.
+
+        The IDs of runs that couldn't be fetched because the daily quota ran out are kept in
+        `unfetched_activity_ids`, so a later sync can pick them up; those that failed for good
+        (e.g., deleted, or still failing after the retries) are kept in `failed_activity_ids`.
 
         Args:
             activities: list of Activity objects
 
         Returns:
-            a list of detailed Activity objects (runs specifically)
+            a list of detailed Activity objects (runs specifically), in the order given
         """
-        activity_ids_and_type = [
-            (activity.id, activity.type) for activity in activities
+        activity_ids = [
+            activity.id
+            for activity in activities
+            if activity.type == "Run"  # Only including runs (for now)
         ]
-        detailed_activities: list[Activity] = []  # Type hinting and initialization
-        for activity_id, activity_type in activity_ids_and_type:
-            if activity_type == "Run":  # Only including runs (for now)
-                detailed_activity = self.fetch_detailed_activity(
-                    activity_id=activity_id
-                )
-                if not detailed_activity:
-                    self.logger.info(
-                        f"""
-                        No detailed activity was acquired for activity [{activity_id}] 
-                        due to a rate limit or retry error. Returning the 
-                        current list of {len(detailed_activities)} detailed activities.
-                    """
-                    )
-                    return detailed_activities  # Return what we've got (we've hit the rate limit)
-                detailed_activities.append(detailed_activity)
-        self.logger.info(f"Returning {len(detailed_activities)} detailed activities.")
+        return self.get_detailed_activities_by_id(activity_ids=activity_ids)
+
+    def get_detailed_activities_by_id(self, activity_ids: list[int]) -> list[Activity]:
+        """
+        Gets the detailed activities with the given IDs (see `get_detailed_activities`).
+
+        Args:
+            activity_ids: The IDs of the activities
+
+        Returns:
+            a list of detailed Activity objects, in the order given
+        """
+        start = perf_counter()
+        waited_before = self.rate_limiter.waited_s
+        detailed_activities: list[Activity] = list(
+            self.iter_detailed_activities(activity_ids=activity_ids)
+        )
+
+        elapsed = perf_counter() - start
+        if self.unfetched_activity_ids:
+            self.logger.info(
+                f"No detailed activity was acquired for {len(self.unfetched_activity_ids)} "
+                "activities due to the rate limit."
+            )
+        if self.failed_activity_ids:
+            self.logger.info(
+                f"No detailed activity was acquired for {len(self.failed_activity_ids)} "
+                "activities due to retry errors or unavailable activities."
+            )
+        self.logger.info(
+            f"Returning {len(detailed_activities)} detailed activities "
+            f"(fetched in {elapsed:.1f}s, {self.rate_limiter.waited_s - waited_before:.1f}s "
+            "of which paused on the rate limit)."
+        )
         return detailed_activities
 
+    def iter_detailed_activities(self, activity_ids: Iterable[int]) -> Iterator[Activity]:
+        """
+        Yields the detailed activities with the given IDs as they're fetched, keeping at most
+        `max_prefetch` fetches ahead of the consumer (so a slow consumer holds back the fetching,
+        and memory stays bounded).
+
+        The IDs of activities the quota didn't allow are kept in `unfetched_activity_ids`, and
+        those that failed for good in `failed_activity_ids`.
+
+        Args:
+            activity_ids: The IDs of the activities
+
+        Returns:
+            an iterator of detailed Activity objects, in the order given
+        """
+        self.unfetched_activity_ids = []
+        self.failed_activity_ids = []
+        activity_ids = iter(activity_ids)
+        in_flight: deque[tuple[int, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def submit(count: int) -> None:
+                for activity_id in islice(activity_ids, count):
+                    in_flight.append(
+                        (activity_id, executor.submit(self.fetch_detailed_activity, activity_id=activity_id))
+                    )
+
+            submit(self.max_prefetch)
+            try:
+                while in_flight:
+                    activity_id, future = in_flight.popleft()
+                    submit(1)
+                    try:
+                        detailed_activity = future.result()
+                    except RetryError as e:
+                        self.logger.error(
+                            f"Failed to retrieve detailed activity [{activity_id}] on final retry attempt [{e.last_attempt.attempt_number}]: {e}"
+                        )
+                        self.failed_activity_ids.append(activity_id)
+                        continue
+                    except ActivityUnavailableException as e:
+                        self.logger.warning(e)
+                        self.failed_activity_ids.append(activity_id)
+                        continue
+                    if not detailed_activity:
+                        self.unfetched_activity_ids.append(activity_id)
+                        continue
+                    yield detailed_activity
+            finally:
+                # The consumer stopped early; don't start the queued fetches
+                for _, future in in_flight:
+                    future.cancel()
+
     def get_activities_this_week(self) -> list[Activity]:
         """
         Gets the atlete's activities for the current week.
@@ -0,0 +1,236 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import getenv
+from threading import Event, Lock, Thread
+from time import perf_counter, time
+
+from dao.strava_athlete import StravaAthleteDao
+from models.athlete import Athlete
+from services.activity_sync import ActivitySyncService
+from services.database import DatabaseService
+from services.metrics import (
+    strava_sync_activities,
+    strava_sync_duration,
+    strava_sync_lag,
+    strava_sync_round_athletes,
+    strava_sync_rounds,
+    strava_syncs,
+)
+from services.rate_limiter import StravaRateLimiter, strava_rate_limiter
+from services.strava import StravaAPI
+from services.token_cache import StravaTokenCache
+from utils.simple_logger import SimpleLogger
+
+
+class SyncScheduler:
+    """
+    Periodically syncs every athlete in `strava_api.athletes`, in rounds run on a worker pool.
+
+    The app-wide Strava budget (the daily quota left, shared with everything else through the
+    rate limiter) is split evenly among a round's athletes: each may detail-fetch at most its
+    share, and the rest of its backlog stays pending for the next round. The order rotates
+    every round, so no athlete is always last when the quota runs out. Access tokens come from
+    a `StravaTokenCache`, so most syncs don't need a token exchange.
+    """
+
+    def __init__(
+        self,
+        athlete_dao: StravaAthleteDao = None,
+        sync_service: ActivitySyncService = None,
+        token_cache: StravaTokenCache = None,
+        rate_limiter: StravaRateLimiter = strava_rate_limiter,
+        interval_s: float = None,
+        workers: int = None,
+        min_share: int = None,
+    ):
+        """
+        Initializes the sync scheduler.
+
+        :param athlete_dao: The athletes DAO.
+        :param sync_service: The activity sync service.
+        :param token_cache: The access token cache.
+        :param rate_limiter: The app-wide Strava rate limiter.
+        :param interval_s: The pause between the end of one round and the start of the next.
+        :param workers: The number of athletes synced concurrently.
+        :param min_share: The fewest detail fetches an athlete gets per round (even if the
+            daily quota left is smaller, since the rate limiter still enforces it).
+
+        :return: None
+        """
+        self.athlete_dao: StravaAthleteDao = (
+            StravaAthleteDao(db_service=DatabaseService())
+            if athlete_dao is None
+            else athlete_dao
+        )
+        self.sync_service: ActivitySyncService = (
+            ActivitySyncService() if sync_service is None else sync_service
+        )
+        self.token_cache: StravaTokenCache = (
+            StravaTokenCache(athlete_dao=self.athlete_dao)
+            if token_cache is None
+            else token_cache
+        )
+        self.rate_limiter: StravaRateLimiter = rate_limiter
+        self.interval_s: float = (
+            float(getenv("STRAVA_SYNC_INTERVAL_S", "3600"))
+            if interval_s is None
+            else interval_s
+        )
+        self.workers: int = (
+            int(getenv("STRAVA_SYNC_WORKERS", "4")) if workers is None else workers
+        )
+        self.min_share: int = (
+            int(getenv("STRAVA_SYNC_MIN_SHARE", "1"))
+            if min_share is None
+            else min_share
+        )
+        self.rounds: int = 0
+        self.started_at: float = time()
+        # Athlete ID -> when their last complete sync finished (epoch seconds)
+        self.last_synced: dict[int, float] = {}
+        self.athlete_ids: set[int] = set()  # The last round's athletes
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread: Thread | None = None
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+        # The latest scheduler is the one reported
+        strava_sync_lag.set_function(self.max_lag_s)
+
+    def max_lag_s(self) -> float:
+        """
+        The time since the least recently synced athlete's last complete sync (or since the
+        scheduler started, for athletes not yet synced).
+
+        :return: The lag in seconds.
+        """
+        with self.lock:
+            if not self.athlete_ids:
+                return 0.0
+            return time() - min(
+                self.last_synced.get(athlete_id, self.started_at)
+                for athlete_id in self.athlete_ids
+            )
+
+    def fetch_share(self, athletes: int) -> int:
+        """
+        Splits the daily quota left (less each athlete's list call) evenly among the athletes.
+
+        :param athletes: The number of athletes in the round.
+
+        :return: The most detail fetches each athlete may make this round.
+        """
+        budget = self.rate_limiter.daily_remaining() - athletes
+        return max(self.min_share, budget // max(athletes, 1))
+
+    def sync_one(self, athlete: Athlete, max_fetches: int) -> str:
+        """
+        Syncs a single athlete, recording the outcome's metrics.
+
+        :param athlete: The athlete.
+        :param max_fetches: The most detail fetches the athlete may make.
+
+        :return: The sync's status (complete, partial, or failed).
+        """
+        start = perf_counter()
+        try:
+            access_token = self.token_cache.get_access_token(
+                athlete_id=athlete.athlete_id, refresh_token=athlete.refresh_token
+            )
+            summary = self.sync_service.sync_athlete(
+                athlete_id=athlete.athlete_id,
+                strava_api=StravaAPI(
+                    access_token=access_token, rate_limiter=self.rate_limiter
+                ),
+                max_fetches=max_fetches,
+            )
+            status = summary["status"]
+            strava_sync_activities.labels(outcome="stored").inc(summary["stored"])
+            strava_sync_activities.labels(outcome="pending").inc(summary["pending"])
+        except Exception as e:
+            self.logger.error(f"Failed to sync athlete [{athlete.athlete_id}]: {e}")
+            status = "failed"
+
+        if status == "failed":
+            # The token may have been revoked or rejected; exchange it again next time
+            self.token_cache.invalidate(athlete.athlete_id)
+        elif status == "complete":
+            with self.lock:
+                self.last_synced[athlete.athlete_id] = time()
+        strava_syncs.labels(status=status).inc()
+        strava_sync_duration.observe(perf_counter() - start)
+        return status
+
+    def run_round(self) -> dict[str, int]:
+        """
+        Syncs every athlete once.
+
+        :return: The number of syncs by status.
+        """
+        start = perf_counter()
+        athletes = self.athlete_dao.get_athletes()
+        if athletes:
+            offset = self.rounds % len(athletes)
+            athletes = athletes[offset:] + athletes[:offset]
+        with self.lock:
+            self.athlete_ids = {athlete.athlete_id for athlete in athletes}
+        share = self.fetch_share(len(athletes))
+        strava_sync_round_athletes.labels(state="total").set(len(athletes))
+        strava_sync_round_athletes.labels(state="done").set(0)
+        self.logger.info(
+            f"Starting sync round {self.rounds + 1} for {len(athletes)} athletes "
+            f"(up to {share} detail fetches each)."
+        )
+
+        statuses: dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self.sync_one, athlete=athlete, max_fetches=share)
+                for athlete in athletes
+            ]
+            for future in as_completed(futures):
+                status = future.result()
+                statuses[status] = statuses.get(status, 0) + 1
+                strava_sync_round_athletes.labels(state="done").inc()
+
+        self.rounds += 1
+        strava_sync_rounds.inc()
+        self.logger.info(
+            f"Sync round {self.rounds} finished in {perf_counter() - start:.1f}s: {statuses}"
+        )
+        return statuses
+
+    def run(self) -> None:
+        """
+        Runs sync rounds until stopped.
+
+        :return: None
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.run_round()
+            except Exception as e:
+                self.logger.error(f"Sync round failed: {e}", exc_info=True)
+            self.stop_event.wait(timeout=self.interval_s)
+
+    def start(self) -> None:
+        """
+        Starts running sync rounds in a background thread.
+
+        :return: None
+        """
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = Thread(target=self.run, name="strava-sync-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout_s: float = None) -> None:
+        """
+        Stops the background thread (after the round in progress, if any).
+
+        :param timeout_s: How long to wait for the thread to finish.
+
+        :return: None
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout_s)
@@ -0,0 +1,51 @@
+from threading import Thread
+
+from services.webhooks import ActivityWork, CoalescingQueue
+
+
+def test_delete_then_create_stays_a_delete():
+    queue = CoalescingQueue()
+    queue.put(ActivityWork(activity_id=1, athlete_id=7, action="delete"))
+    merged = queue.put(ActivityWork(activity_id=1, athlete_id=7, action="fetch"))
+
+    work = queue.get(timeout_s=0)
+    assert merged
+    assert work.action == "delete"
+    assert len(queue) == 0
+
+
+def test_rename_then_fetch_becomes_a_fetch():
+    queue = CoalescingQueue()
+    queue.put(
+        ActivityWork(
+            activity_id=1, athlete_id=7, action="rename", updates={"title": "Tempo"}
+        )
+    )
+    queue.put(ActivityWork(activity_id=1, athlete_id=7, action="fetch"))
+
+    work = queue.get(timeout_s=0)
+    assert work.action == "fetch"
+    assert work.updates == {"title": "Tempo"}
+    assert queue.coalesced == 1
+
+
+def test_get_skips_an_activity_in_progress_until_done():
+    queue = CoalescingQueue()
+    queue.put(ActivityWork(activity_id=1, athlete_id=7, action="fetch"))
+    first = queue.get(timeout_s=0)
+    queue.put(ActivityWork(activity_id=1, athlete_id=7, action="rename"))
+    queue.put(ActivityWork(activity_id=2, athlete_id=7, action="fetch"))
+
+    # Activity 1 is still being processed, so its new event waits behind activity 2's
+    assert queue.get(timeout_s=0).activity_id == 2
+    assert queue.get(timeout_s=0.05) is None
+
+    waiter_got = []
+    waiter = Thread(target=lambda: waiter_got.append(queue.get(timeout_s=5)))
+    waiter.start()
+    queue.done(first.activity_id)
+    waiter.join(timeout=5)
+
+    assert waiter_got[0].activity_id == 1
+    assert waiter_got[0].action == "rename"
+    assert 1 in queue.in_progress
@@ -0,0 +1,128 @@
+from os import getenv
+from threading import Lock
+from time import time
+
+from dao.strava_athlete import StravaAthleteDao
+from services.metrics import strava_token_requests
+from services.strava import StravaAuthorization
+from utils.simple_logger import SimpleLogger
+
+
+class StravaTokenCache:
+    """
+    Caches athletes' Strava access tokens in memory until they (nearly) expire, so a sync only
+    pays for a token exchange every few hours instead of on every run.
+
+    Strava rotates refresh tokens, and only the newest one works, so a rotated token is kept in
+    memory (for the next exchange) and persisted through `StravaAthleteDao.update_athlete`.
+    """
+
+    def __init__(
+        self,
+        athlete_dao: StravaAthleteDao,
+        authorization: StravaAuthorization = None,
+        expiry_margin_s: float = None,
+    ):
+        """
+        Initializes the token cache.
+
+        :param athlete_dao: The athletes DAO (to persist rotated refresh tokens).
+        :param authorization: The Strava authorization client (for the token exchanges).
+        :param expiry_margin_s: How long before its expiry a cached access token is refreshed.
+
+        :return: None
+        """
+        self.athlete_dao: StravaAthleteDao = athlete_dao
+        self.authorization: StravaAuthorization = (
+            StravaAuthorization() if authorization is None else authorization
+        )
+        self.expiry_margin_s: float = (
+            float(getenv("STRAVA_TOKEN_EXPIRY_MARGIN_S", "300"))
+            if expiry_margin_s is None
+            else expiry_margin_s
+        )
+        # Athlete ID -> (access token, expires at (epoch seconds), refresh token)
+        self.tokens: dict[int, tuple[str, float, str]] = {}
+        self.locks: dict[int, Lock] = {}
+        self.lock = Lock()
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+
+    def get_access_token(self, athlete_id: int, refresh_token: str) -> str:
+        """
+        Gets a valid access token for the athlete, exchanging their refresh token if the cached
+        one has (nearly) expired.
+
+        :param athlete_id: The athlete's ID.
+        :param refresh_token: The athlete's stored refresh token (the cache's own rotated one
+            is tried first, in case persisting it failed, and this one if it's rejected).
+
+        :return: The access token.
+        """
+        with self.lock:
+            athlete_lock = self.locks.setdefault(athlete_id, Lock())
+        # One exchange per athlete at a time (a second one would use a rotated-out token)
+        with athlete_lock:
+            cached = self.tokens.get(athlete_id)
+            if cached and cached[1] - self.expiry_margin_s > time():
+                strava_token_requests.labels(result="hit").inc()
+                return cached[0]
+
+            # The stored token may be newer than the cached one (e.g., after re-authorization)
+            candidates = list(
+                dict.fromkeys([cached[2], refresh_token] if cached else [refresh_token])
+            )
+            for index, candidate in enumerate(candidates):
+                try:
+                    token_response = self.authorization.exchange_refresh_token(
+                        refresh_token=candidate
+                    )
+                    break
+                except Exception:
+                    if index == len(candidates) - 1:
+                        self.tokens.pop(athlete_id, None)
+                        strava_token_requests.labels(result="error").inc()
+                        raise
+                    self.logger.warning(
+                        f"Cached refresh token rejected for athlete [{athlete_id}]; "
+                        "trying the stored one."
+                    )
+            strava_token_requests.labels(result="exchange").inc()
+            access_token = token_response["access_token"]
+            rotated_token = token_response.get("refresh_token") or refresh_token
+            self.tokens[athlete_id] = (
+                access_token,
+                float(token_response.get("expires_at") or 0),
+                rotated_token,
+            )
+            if rotated_token != refresh_token:
+                self.logger.info(f"Refresh token rotated for athlete [{athlete_id}].")
+                self.athlete_dao.update_athlete(
+                    athlete_id=athlete_id, refresh_token=rotated_token
+                )
+            return access_token
+
+    def invalidate(self, athlete_id: int) -> None:
+        """
+        Drops an athlete's cached access token (e.g., after it was rejected).
+
+        :param athlete_id: The athlete's ID.
+
+        :return: None
+        """
+        with self.lock:
+            cached = self.tokens.get(athlete_id)
+            if cached:
+                # Keep the rotated refresh token; it's the only one that still works
+                self.tokens[athlete_id] = (cached[0], 0.0, cached[2])
+
+    def forget(self, athlete_id: int) -> None:
+        """
+        Drops everything cached for an athlete, rotated refresh token included (e.g., after
+        they deauthorized the app, which revokes it; re-authorizing stores a new one).
+
+        :param athlete_id: The athlete's ID.
+
+        :return: None
+        """
+        with self.lock:
+            self.tokens.pop(athlete_id, None)
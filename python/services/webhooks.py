@@ -0,0 +1,356 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from os import getenv
+from threading import Condition, Lock, Thread
+from time import monotonic
+
+from dao.strava_activities import StravaActivitiesDao
+from dao.strava_athlete import StravaAthleteDao
+from dao.strava_sync_state import StravaSyncStateDao
+from models.webhooks import StravaWebhookEvent
+from services.activity_transform import transform_activities
+from services.database import DatabaseService
+from services.metrics import (
+    strava_webhook_actions,
+    strava_webhook_events,
+    strava_webhook_latency,
+    strava_webhook_queue_depth,
+)
+from services.strava import ActivityUnavailableException, StravaAPI
+from services.token_cache import StravaTokenCache
+from utils.simple_logger import SimpleLogger
+
+# Activity updates to these fields only can be applied without fetching the activity
+LOCAL_UPDATES = {"title", "private"}
+
+
+@dataclass
+class ActivityWork:
+    """
+    The work queued for one activity, merged from all of its events not yet processed.
+
+    :param activity_id: The activity's ID.
+    :param athlete_id: The athlete's ID.
+    :param action: What to do: "fetch" (then upsert), "delete", or "rename" (no API call).
+    :param updates: The changed fields of the merged update events.
+    :param enqueued_at: When the activity's first unprocessed event arrived (monotonic).
+    """
+
+    activity_id: int
+    athlete_id: int
+    action: str
+    updates: dict = field(default_factory=dict)
+    enqueued_at: float = field(default_factory=monotonic)
+
+    def merge(self, other: "ActivityWork") -> None:
+        """
+        Merges a newer event's work into this one: a delete wins over anything else, queued
+        before or after it (Strava may deliver retried events out of order, and a deleted
+        activity can't be fetched or renamed), and a fetch absorbs renames (the fetched
+        activity has the new title anyway).
+
+        :param other: The newer event's work.
+
+        :return: None
+        """
+        self.updates.update(other.updates)
+        if "delete" in (self.action, other.action):
+            self.action = "delete"
+        elif "fetch" in (self.action, other.action):
+            self.action = "fetch"
+
+
+class CoalescingQueue:
+    """
+    A FIFO queue of per-activity work, where events for an activity that's already queued are
+    merged into its entry instead of queued again (so a burst of updates costs one fetch).
+
+    An activity being processed isn't handed to a second worker: new events for it are queued,
+    and become available once the first worker is done.
+    """
+
+    def __init__(self):
+        self.items: OrderedDict[int, ActivityWork] = OrderedDict()
+        self.in_progress: set[int] = set()
+        self.condition = Condition()
+        self.received: int = 0
+        self.coalesced: int = 0
+        self.closed: bool = False
+
+    def put(self, work: ActivityWork) -> bool:
+        """
+        Queues an activity's work, merging it into the activity's queued work if there is any.
+
+        :param work: The work.
+
+        :return: Whether the work was merged into already-queued work.
+        """
+        with self.condition:
+            self.received += 1
+            queued = self.items.get(work.activity_id)
+            if queued is not None:
+                queued.merge(work)
+                self.coalesced += 1
+                return True
+            self.items[work.activity_id] = work
+            self.condition.notify()
+            return False
+
+    def get(self, timeout_s: float = None) -> ActivityWork | None:
+        """
+        Takes the oldest work whose activity isn't being processed, waiting for some if needed.
+        The caller must call `done` with the activity ID afterward.
+
+        :param timeout_s: How long to wait (indefinitely, if not given).
+
+        :return: The work (None on timeout, or once the queue is closed).
+        """
+        deadline = None if timeout_s is None else monotonic() + timeout_s
+        with self.condition:
+            while not self.closed:
+                for activity_id in self.items:
+                    if activity_id not in self.in_progress:
+                        self.in_progress.add(activity_id)
+                        return self.items.pop(activity_id)
+                remaining = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(timeout=remaining)
+            return None
+
+    def done(self, activity_id: int) -> None:
+        """
+        Marks an activity's work as processed.
+
+        :param activity_id: The activity's ID.
+
+        :return: None
+        """
+        with self.condition:
+            self.in_progress.discard(activity_id)
+            if activity_id in self.items:
+                self.condition.notify()
+
+    def close(self) -> None:
+        """
+        Wakes and releases every waiting worker.
+
+        :return: None
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self) -> int:
+        with self.condition:
+            return len(self.items)
+
+
+class StravaWebhookProcessor:
+    """
+    Turns Strava push events into the minimum of API calls: each affected activity is fetched
+    once (however many events it got while queued), deletions and title changes are applied
+    without any call, and a worker pool processes the queue as events arrive.
+    """
+
+    def __init__(
+        self,
+        athlete_dao: StravaAthleteDao = None,
+        activities_dao: StravaActivitiesDao = None,
+        sync_state_dao: StravaSyncStateDao = None,
+        token_cache: StravaTokenCache = None,
+        workers: int = None,
+    ):
+        """
+        Initializes the webhook processor.
+
+        :param athlete_dao: The athletes DAO.
+        :param activities_dao: The activities DAO.
+        :param sync_state_dao: The sync state DAO (unfetched activities are left pending).
+        :param token_cache: The access token cache.
+        :param workers: The number of worker threads.
+
+        :return: None
+        """
+        self.athlete_dao: StravaAthleteDao = (
+            StravaAthleteDao(db_service=DatabaseService())
+            if athlete_dao is None
+            else athlete_dao
+        )
+        self.activities_dao: StravaActivitiesDao = (
+            StravaActivitiesDao() if activities_dao is None else activities_dao
+        )
+        self.sync_state_dao: StravaSyncStateDao = (
+            StravaSyncStateDao() if sync_state_dao is None else sync_state_dao
+        )
+        self.token_cache: StravaTokenCache = (
+            StravaTokenCache(athlete_dao=self.athlete_dao)
+            if token_cache is None
+            else token_cache
+        )
+        self.workers: int = (
+            int(getenv("STRAVA_WEBHOOK_WORKERS", "4")) if workers is None else workers
+        )
+        self.queue = CoalescingQueue()
+        self.processed: dict[str, int] = {}  # Outcome -> activities
+        self.lock = Lock()
+        self.threads: list[Thread] = []
+        self.logger = SimpleLogger(log_level="INFO", class_name=__name__).logger
+        # The latest processor is the one reported
+        strava_webhook_queue_depth.set_function(lambda: len(self.queue))
+
+    def receive(self, event: StravaWebhookEvent) -> None:
+        """
+        Queues the work for a push event (returning right away, as Strava expects a response
+        within two seconds).
+
+        :param event: The event.
+
+        :return: None
+        """
+        strava_webhook_events.labels(
+            object_type=event.object_type, aspect_type=event.aspect_type
+        ).inc()
+        if event.object_type == "athlete":
+            if str(event.updates.get("authorized", "")).lower() == "false":
+                # The athlete revoked access; their tokens no longer work
+                self.logger.info(f"Athlete [{event.owner_id}] deauthorized the app.")
+                self.token_cache.forget(event.owner_id)
+            return
+
+        if event.aspect_type == "delete":
+            action = "delete"
+        elif event.aspect_type == "update" and set(event.updates) <= LOCAL_UPDATES:
+            action = "rename"
+        else:
+            action = "fetch"
+        self.queue.put(
+            ActivityWork(
+                activity_id=event.object_id,
+                athlete_id=event.owner_id,
+                action=action,
+                updates=dict(event.updates),
+            )
+        )
+
+    def process(self, work: ActivityWork) -> str:
+        """
+        Applies an activity's work to the database.
+
+        :param work: The work.
+
+        :return: The outcome (e.g., "upserted", "deleted", "renamed", or "pending").
+        """
+        if work.action == "delete":
+            self.activities_dao.delete_activity(
+                work.activity_id, athlete_id=work.athlete_id
+            )
+            return "deleted"
+        if work.action == "rename":
+            if "title" not in work.updates:
+                return "skipped"
+            # Only the owner's stored runs can be renamed; anything else is a no-op
+            self.activities_dao.update_activity(
+                work.activity_id, athlete_id=work.athlete_id, name=work.updates["title"]
+            )
+            return "renamed"
+
+        athlete = self.athlete_dao.get_athlete(work.athlete_id)
+        if athlete is None:
+            return "skipped"  # Not one of our athletes
+        access_token = self.token_cache.get_access_token(
+            athlete_id=athlete.athlete_id, refresh_token=athlete.refresh_token
+        )
+        strava_api = StravaAPI(access_token=access_token)
+        try:
+            activity = strava_api.fetch_detailed_activity(activity_id=work.activity_id)
+        except ActivityUnavailableException as e:
+            # Deleted or made private since the event; there's nothing to store
+            self.logger.warning(e)
+            return "skipped"
+        if activity is None:
+            # The quota ran out; the athlete's next sync picks it up
+            self.sync_state_dao.add_pending_activity_ids(
+                athlete_id=work.athlete_id, activity_ids=[work.activity_id]
+            )
+            return "pending"
+        if activity.type != "Run":
+            # Only runs are stored (and a run may have been changed to another type)
+            self.activities_dao.delete_activity(
+                work.activity_id, athlete_id=work.athlete_id
+            )
+            return "skipped"
+        counts = self.activities_dao.upsert_activities(
+            transform_activities(activities=[activity], athlete_id=work.athlete_id)
+        )
+        return "upserted" if counts is not None else "failed"
+
+    def run_worker(self) -> None:
+        """
+        Processes queued work until the queue is closed.
+
+        :return: None
+        """
+        while (work := self.queue.get()) is not None:
+            try:
+                outcome = self.process(work)
+            except Exception as e:
+                self.logger.error(
+                    f"Failed to process activity [{work.activity_id}]: {e}",
+                    exc_info=True,
+                )
+                outcome = "failed"
+            finally:
+                self.queue.done(work.activity_id)
+            with self.lock:
+                self.processed[outcome] = self.processed.get(outcome, 0) + 1
+            strava_webhook_actions.labels(outcome=outcome).inc()
+            strava_webhook_latency.observe(monotonic() - work.enqueued_at)
+            self.logger.info(
+                f"Processed pushed activity [{work.activity_id}] ({work.action}): {outcome}."
+            )
+
+    def start(self) -> None:
+        """
+        Starts the worker threads.
+
+        :return: None
+        """
+        if self.threads:
+            return
+        self.threads = [
+            Thread(target=self.run_worker, name=f"strava-webhook-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout_s: float = None) -> None:
+        """
+        Stops the worker threads (after the work in progress).
+
+        :param timeout_s: How long to wait for each thread to finish.
+
+        :return: None
+        """
+        self.queue.close()
+        for thread in self.threads:
+            thread.join(timeout=timeout_s)
+        self.threads = []
+
+    def stats(self) -> dict:
+        """
+        The queue's counters.
+
+        :return: The number of activities queued and in progress, events received and
+            coalesced, and activities processed (by outcome).
+        """
+        with self.lock:
+            processed = dict(self.processed)
+        return {
+            "queued": len(self.queue),
+            "in_progress": len(self.queue.in_progress),
+            "received": self.queue.received,
+            "coalesced": self.queue.coalesced,
+            "processed": processed,
+        }
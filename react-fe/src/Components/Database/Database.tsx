@@ -16,6 +16,12 @@ const StatsContainer = styled.div`
     height: 100vh;
 `;
 
+const LoadMoreButton = styled.button`
+    margin-top: 1rem;
+    padding: 0.5rem 1rem;
+    cursor: pointer;
+`;
+
 const ATHLETE_DATA_FIELDNAMES = [
     "ATHLETE",
     "ACTIVITY ID",
@@ -70,64 +76,103 @@ const MAPPED_FIELDNAMES = {
     athlete_count: ATHLETE_DATA_FIELDNAMES[23],
     full_datetime: ATHLETE_DATA_FIELDNAMES[24],
 };
-const ATHLETE_DATA_FILTERED_FIELDNAMES = [
-    ATHLETE_DATA_FIELDNAMES[0], // "ATHLETE"
-    ATHLETE_DATA_FIELDNAMES[2], // "RUN"
-    ATHLETE_DATA_FIELDNAMES[3], // "MOVING TIME"
-    ATHLETE_DATA_FIELDNAMES[4], // "DISTANCE (MI)"
-    ATHLETE_DATA_FIELDNAMES[5], // "PACE (MIN/MI)"
-    ATHLETE_DATA_FIELDNAMES[12], // "SPM AVG"
-    ATHLETE_DATA_FIELDNAMES[13], // "HR AVG"
-    ATHLETE_DATA_FIELDNAMES[14], // "WKT TYPE"
-    ATHLETE_DATA_FIELDNAMES[15], // "DESCRIPTION"
-    ATHLETE_DATA_FIELDNAMES[16], // "TOTAL ELEV GAIN (FT)"
-    ATHLETE_DATA_FIELDNAMES[24], // "FULL DATETIME"
+// The columns shown in the table (sorted and filtered by the server)
+const TABLE_COLUMNS: (keyof typeof MAPPED_FIELDNAMES)[] = [
+    "athlete_id", // "ATHLETE"
+    "moving_time", // "MOVING TIME"
+    "distance_mi", // "DISTANCE (MI)"
+    "pace_min_mi", // "PACE (MIN/MI)"
+    "spm_avg", // "SPM AVG"
+    "hr_avg", // "HR AVG"
+    "wkt_type", // "WKT TYPE"
+    "description", // "DESCRIPTION"
+    "total_elev_gain_ft", // "TOTAL ELEV GAIN (FT)"
+    "full_datetime", // "FULL DATETIME"
 ];
+const PAGE_SIZE = 100;
+const FILTER_DEBOUNCE_MS = 300;
 
 export default function Database() {
-    const [headerStats, setHeaderStats] = useState<string[]>([]);
     const [rowData, setRowData] = useState<string[][]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [sortConfig, setSortConfig] = useState<{
         key: string;
         direction: "ascending" | "descending";
     } | null>(null);
-    const [filters, setFilters] = useState<string[]>([]);
-
-    const filterHeaderStats = useCallback((headerStats: string[]) => {
-        return headerStats.filter((header) =>
-            Object.keys(MAPPED_FIELDNAMES).includes(header)
-        );
-    }, []);
+    const [filters, setFilters] = useState<string[]>(
+        new Array(TABLE_COLUMNS.length).fill("")
+    );
 
     /**
-     * Filter out the columns from each record that we don't want to display in the table.
-     * @param rowData The data to filter.
-     * @returns The filtered data.
+     * Fetch a page of activities, sorted and filtered by the server.
+     * @param cursor The previous page's next cursor (null for the first page).
+     * @returns The page's rows (in the order of TABLE_COLUMNS) and the next cursor.
      */
-    const filterRowData = useCallback((rowData: Record<string, any>[]) => {
-        return rowData.map((row) =>
-            ATHLETE_DATA_FILTERED_FIELDNAMES.map((field) => row[field])
-        );
-    }, []);
+    const fetchPage = useCallback(
+        async (cursor: string | null) => {
+            const params = new URLSearchParams({
+                columns: TABLE_COLUMNS.join(","),
+                page_size: String(PAGE_SIZE),
+            });
+            if (sortConfig) {
+                params.append("sort_by", sortConfig.key);
+                params.append(
+                    "descending",
+                    String(sortConfig.direction === "descending")
+                );
+            }
+            filters.forEach((value, index) => {
+                if (value) {
+                    params.append("filter", `${TABLE_COLUMNS[index]}:${value}`);
+                }
+            });
+            if (cursor) {
+                params.append("cursor", cursor);
+            }
+            const response = await axios.get(
+                "http://localhost:5001/api/activities/detailed-stats",
+                { params }
+            );
+            // The rows' values come in the order of the requested columns
+            return {
+                rows: response.data.data.rows as string[][],
+                nextCursor: response.data.meta.next_cursor as string | null,
+            };
+        },
+        [sortConfig, filters]
+    );
 
+    // Refetch the first page whenever the sort order or the filters change
     useEffect(() => {
-        axios
-            .get("http://localhost:5001/api/activities/detailed-stats")
-            .then((response) => {
-                const headersStats = filterHeaderStats(
-                    response.data.data.headers
-                );
-                const rowData = filterRowData(response.data.data.activities);
-                setHeaderStats(headersStats);
-                setRowData(rowData);
-                setFilters(
-                    new Array(response.data.data.headers.length).fill("")
-                );
+        let cancelled = false;
+        const timeout = setTimeout(() => {
+            fetchPage(null)
+                .then((page) => {
+                    if (!cancelled) {
+                        setRowData(page.rows);
+                        setNextCursor(page.nextCursor);
+                    }
+                })
+                .catch((error) => {
+                    console.error("There was an error fetching the data!", error);
+                });
+        }, FILTER_DEBOUNCE_MS);
+        return () => {
+            cancelled = true;
+            clearTimeout(timeout);
+        };
+    }, [fetchPage]);
+
+    const handleLoadMore = useCallback(() => {
+        fetchPage(nextCursor)
+            .then((page) => {
+                setRowData((rows) => [...rows, ...page.rows]);
+                setNextCursor(page.nextCursor);
             })
             .catch((error) => {
                 console.error("There was an error fetching the data!", error);
             });
-    }, [filterHeaderStats, filterRowData]);
+    }, [fetchPage, nextCursor]);
 
     const handleSort = useCallback(
         (key: string) => {
@@ -157,13 +202,16 @@ export default function Database() {
         <StatsContainer>
             <SectionHeader>Database</SectionHeader>
             <Table
-                headers={headerStats}
+                headers={TABLE_COLUMNS}
                 rowData={rowData}
                 sortConfig={sortConfig}
                 handleSort={handleSort}
                 filters={filters}
                 handleFilterChange={handleFilterChange}
             />
+            {nextCursor && (
+                <LoadMoreButton onClick={handleLoadMore}>Load more</LoadMoreButton>
+            )}
         </StatsContainer>
     );
 }
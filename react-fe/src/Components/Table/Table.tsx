@@ -1,4 +1,3 @@
-import { useMemo } from "react";
 import styled from "styled-components";
 import { TableHeader } from "Components/TableHeader";
 
@@ -42,6 +41,7 @@ const TableData = styled.div`
     }
 `;
 
+// Rows come sorted and filtered by the server; the headers only report the changes
 interface TableProps {
     headers: string[];
     rowData: string[][];
@@ -59,32 +59,6 @@ export default function Table({
     filters,
     handleFilterChange,
 }: TableProps) {
-    const sortedData = useMemo(() => {
-        if (sortConfig !== null) {
-            const sorted = [...rowData].sort((a, b) => {
-                const aKey = a[headers.indexOf(sortConfig.key)];
-                const bKey = b[headers.indexOf(sortConfig.key)];
-                if (aKey < bKey) {
-                    return sortConfig.direction === "ascending" ? -1 : 1;
-                }
-                if (aKey > bKey) {
-                    return sortConfig.direction === "ascending" ? 1 : -1;
-                }
-                return 0;
-            });
-            return sorted;
-        }
-        return rowData;
-    }, [rowData, sortConfig, headers]);
-
-    const filteredData = sortedData.filter((row) =>
-        row.every((cell, index) => {
-            const cellValue = cell?.toString() || "";
-            const filterValue = filters[index]?.toString() || "";
-            return cellValue.toLowerCase().includes(filterValue.toLowerCase());
-        })
-    );
-
     return (
         <TableStyled>
             <TableHeaders>
@@ -104,7 +78,7 @@ export default function Table({
                 ))}
             </TableHeaders>
             <TableBody>
-                {filteredData.map((row, rowIndex) => (
+                {rowData.map((row, rowIndex) => (
                     <TableRow key={rowIndex}>
                         {row.map((cell, cellIndex) => (
                             <TableData key={cellIndex}>{cell}</TableData>